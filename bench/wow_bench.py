@@ -0,0 +1,274 @@
+"""Offline benchmark komend WoW.
+
+Uruchamia lokalny serwer HTTP udający Raider.io i Warcraft Logs (odpowiedzi z bench/fixtures),
+tworzy WowCommands z fałszywym botem i interakcjami, a następnie mierzy opóźnienia komend
+przy zadanej współbieżności.
+
+    python -m bench.wow_bench --concurrency 20 --iterations 200 --upstream-latency 80
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+from collections import Counter, defaultdict
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+COMMANDS = ("ce", "weekly", "weekly_multi", "solemnity", "logs", "logs_multi")
+
+if "config" not in sys.modules:
+    try:
+        import config  # noqa: F401
+    except ImportError:
+        # Benchmark nie łączy się z prawdziwymi API, więc wystarczą wartości zastępcze
+        sys.modules["config"] = types.SimpleNamespace(
+            TOKEN="", TELEGRAM_BOT_TOKEN="", TELEGRAM_CHAT_ID="",
+            WCL_CLIENT_ID="bench", WCL_CLIENT_SECRET="bench"
+        )
+
+from cogs import wow  # noqa: E402
+from utils import wcl  # noqa: E402
+from utils.ratelimit import TokenBucketScheduler  # noqa: E402
+from utils.store import ResponseStore  # noqa: E402
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FakeUpstream:
+    """Lokalny zastępca Raider.io i Warcraft Logs serwujący nagrane odpowiedzi"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = Counter()
+        self.profile = load_fixture("raiderio_character_profile.json")
+        self.guild = load_fixture("raiderio_guild_profile.json")
+        self.raid_rankings = load_fixture("raiderio_raid_rankings.json")
+        self.token = load_fixture("wcl_oauth_token.json")
+        self.character_rankings = load_fixture("wcl_character_rankings.json")
+        self.runner = None
+        self.base_url = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/api/v1/characters/profile", self.handle_profile)
+        app.router.add_get("/api/v1/guilds/profile", self.handle_guild)
+        app.router.add_get("/api/v1/raiding/raid-rankings", self.handle_raid_rankings)
+        app.router.add_post("/oauth/token", self.handle_token)
+        app.router.add_post("/api/v2/client", self.handle_graphql)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def respond(self, request, payload):
+        self.requests[request.path] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        return web.json_response(payload)
+
+    async def handle_profile(self, request):
+        return await self.respond(request, dict(self.profile, name=request.query.get("name", "")))
+
+    async def handle_guild(self, request):
+        return await self.respond(request, self.guild)
+
+    async def handle_raid_rankings(self, request):
+        return await self.respond(request, self.raid_rankings)
+
+    async def handle_token(self, request):
+        return await self.respond(request, self.token)
+
+    async def handle_graphql(self, request):
+        body = await request.json()
+        variables = body.get("variables", {})
+        characters = {}
+        for key, name in variables.items():
+            if not key.startswith("n"):
+                continue
+            index = key[1:]
+            character = {
+                "name": name,
+                "classID": self.character_rankings["classID"],
+                "server": self.character_rankings["server"]
+            }
+            for difficulty in (4, 5):
+                character[f"d{difficulty}"] = dict(self.character_rankings["zoneRankings"], difficulty=difficulty)
+            characters[f"c{index}"] = character
+        return await self.respond(request, {"data": {"characterData": characters}})
+
+
+class FakeMessage:
+    def __init__(self, embed=None):
+        self.embeds = [embed] if embed else []
+
+    async def edit(self, **kwargs):
+        return self
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content=None, *, embed=None, wait=False, **kwargs):
+        self.messages.append(content if content is not None else embed)
+        return FakeMessage(embed)
+
+
+class FakeResponse:
+    async def defer(self, **kwargs):
+        pass
+
+
+class FakeInteraction:
+    """Minimalny zamiennik discord.Interaction wystarczający komendom WowCommands"""
+
+    def __init__(self):
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+        self.guild = types.SimpleNamespace(name="Benchmark")
+
+    @property
+    def failed(self):
+        return any(isinstance(message, str) and message.startswith("❌") for message in self.followup.messages)
+
+
+class FakeBot:
+    user = types.SimpleNamespace(name="Benchmark Bot")
+
+    async def wait_until_ready(self):
+        # Pętle w tle nie są częścią pomiaru
+        await asyncio.Event().wait()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+async def run_command(cog, command, names):
+    interaction = FakeInteraction()
+    character = random.choice(names)
+
+    if command == "ce":
+        await wow.WowCommands.ce.callback(cog, interaction, character)
+    elif command == "weekly":
+        await wow.WowCommands.weekly.callback(cog, interaction, character)
+    elif command == "weekly_multi":
+        await wow.WowCommands.weekly.callback(cog, interaction, " ".join(random.sample(names, min(20, len(names)))))
+    elif command == "solemnity":
+        await wow.WowCommands.solemnity.callback(cog, interaction, 0)
+    elif command == "logs":
+        await wow.WowCommands.logs.callback(cog, interaction, character)
+    elif command == "logs_multi":
+        await wow.WowCommands.logs.callback(cog, interaction, " ".join(random.sample(names, min(10, len(names)))))
+    return interaction
+
+
+async def reset_caches(cog):
+    cog.profile_cache = wow.TTLCache(max_size=wow.PROFILE_CACHE_SIZE, name="profiles")
+    # Bez czyszczenia tabeli odpowiedzi zapisane przez flush() trafiałyby z SQLite zamiast z upstream
+    await cog.store.clear()
+    cog.guild_snapshot = None
+
+
+async def benchmark(args):
+    upstream = FakeUpstream(args.upstream_latency / 1000)
+    await upstream.start()
+
+    wow.RIO_API_URL = f"{upstream.base_url}/api/v1"
+    wcl.WCL_TOKEN_URL = f"{upstream.base_url}/oauth/token"
+    wcl.WCL_GRAPHQL_URL = f"{upstream.base_url}/api/v2/client"
+    wow.GUILD_THUMBNAIL_FILE = os.path.join(FIXTURES_DIR, "solemnity.png")
+
+    store_dir = tempfile.TemporaryDirectory()
+    cog = wow.WowCommands(FakeBot())
+    cog.store = ResponseStore(path=os.path.join(store_dir.name, "api_cache.sqlite3"))
+    if args.rate_limit:
+        rate, burst = wow.RATE_LIMITS["raider.io"]
+        cog.limiters["127.0.0.1"] = TokenBucketScheduler("127.0.0.1", rate, burst)
+    await cog.cog_load()
+
+    names = [f"Postac{index}" for index in range(args.characters)]
+    commands = [command for command in args.commands.split(",") if command]
+    latencies = defaultdict(list)
+    failures = Counter()
+    queue = asyncio.Queue()
+    for index in range(args.iterations):
+        queue.put_nowait(commands[index % len(commands)])
+
+    async def worker():
+        while not queue.empty():
+            command = queue.get_nowait()
+            if args.cold:
+                await reset_caches(cog)
+            started = time.perf_counter()
+            interaction = await run_command(cog, command, names)
+            latencies[command].append(time.perf_counter() - started)
+            if interaction.failed:
+                failures[command] += 1
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    finally:
+        elapsed = time.perf_counter() - started
+        await cog.cog_unload()
+        await upstream.stop()
+        store_dir.cleanup()
+
+    print(f"Iteracje: {args.iterations}, współbieżność: {args.concurrency}, "
+          f"opóźnienie upstream: {args.upstream_latency} ms, czas: {elapsed:.2f}s")
+    print(f"{'komenda':<14}{'n':>6}{'błędy':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for command in commands:
+        samples = latencies[command]
+        if not samples:
+            continue
+        print(f"{command:<14}{len(samples):>6}{failures[command]:>7}"
+              f"{percentile(samples, 0.50) * 1000:>10.1f}"
+              f"{percentile(samples, 0.95) * 1000:>10.1f}"
+              f"{percentile(samples, 0.99) * 1000:>10.1f}"
+              f"{max(samples) * 1000:>10.1f}")
+
+    print("\nZapytania do upstream:")
+    for path, count in sorted(upstream.requests.items()):
+        print(f"  {path:<32}{count:>8}")
+    print(f"  {'razem':<32}{sum(upstream.requests.values()):>8}")
+    print(f"\nCache profili: {cog.profile_cache.stats()}")
+    print(f"Łączenie zapytań: {cog.in_flight.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark komend WoW")
+    parser.add_argument("--concurrency", type=int, default=10, help="liczba równoczesnych komend")
+    parser.add_argument("--iterations", type=int, default=100, help="łączna liczba wywołań komend")
+    parser.add_argument("--characters", type=int, default=50, help="liczba różnych postaci w puli")
+    parser.add_argument("--upstream-latency", type=float, default=50, help="średnie opóźnienie API w ms")
+    parser.add_argument("--commands", default=",".join(COMMANDS), help=f"komendy oddzielone przecinkami: {COMMANDS}")
+    parser.add_argument("--cold", action="store_true", help="czyści cache przed każdą komendą")
+    parser.add_argument("--rate-limit", action="store_true", help="stosuje limit zapytań Raider.io do serwera lokalnego")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
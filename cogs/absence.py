@@ -5,32 +5,51 @@ import os
 import datetime
 from discord.ext import commands, tasks
 from discord import app_commands, ui
+from utils.metrics import TASK_DURATION
+from utils.sharding import in_process, owns_guild, process_data_path
 
-ABSENCE_CHANNEL_ID = 1375491731989987370
 ABSENCE_FILE = "data/nieobecnosci.json"
+NOT_CONFIGURED = "❌ Ten serwer nie ma skonfigurowanego kanału nieobecności."
 
 
 class NieobecnosciSystem(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.data_file = process_data_path(bot, ABSENCE_FILE)
         self.absences = self.load_data()
+        self.panel_ready = False
         self.cleanup_task.start()
 
     def load_data(self):
         os.makedirs(os.path.dirname(ABSENCE_FILE), exist_ok=True)
+        # Proces z częścią shardów (SHARD_IDS) bez własnego pliku zaczyna od wspólnego
+        path = self.data_file if os.path.exists(self.data_file) else ABSENCE_FILE
         try:
-            with open(ABSENCE_FILE, 'r') as f:
-                return json.load(f)
+            with open(path, 'r') as f:
+                data = json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
-            return {
-                'message_id': None,
-                'absences': []
-            }
+            return {'guilds': {}}
+
+        if 'guilds' not in data:
+            # Stary format z jednym panelem dla jednego serwera
+            return {'guilds': {}, 'legacy': data}
+        data['guilds'] = {key: guild for key, guild in data['guilds'].items() if in_process(self.bot, int(key))}
+        return data
 
     def save_data(self):
-        with open(ABSENCE_FILE, 'w') as f:
+        with open(self.data_file, 'w') as f:
             json.dump(self.absences, f, indent=4)
 
+    def guild_data(self, guild_id):
+        """Panel serwera: {'message_id': ..., 'absences': [...]}"""
+        guilds = self.absences['guilds']
+        key = str(guild_id)
+        if key not in guilds:
+            # Dane ze starego formatu należą do jedynego serwera, który miał wtedy skonfigurowany kanał
+            legacy = self.absences.pop('legacy', None) if self.absence_channel(guild_id) else None
+            guilds[key] = legacy or {'message_id': None, 'absences': []}
+        return guilds[key]
+
     def is_valid_date(self, day, month, year=None):
         """Sprawdza czy data jest poprawna"""
         try:
@@ -61,38 +80,39 @@ class NieobecnosciSystem(commands.Cog):
 
     @tasks.loop(hours=1)
     async def cleanup_task(self):
-        await self.check_expired_absences()
-        await self.cleanup_old_messages()
+        with TASK_DURATION.time(task="absence_cleanup"):
+            await self.check_expired_absences()
+            await self.cleanup_old_messages()
 
     @cleanup_task.before_loop
     async def before_cleanup(self):
        await self.bot.wait_until_ready()
 
     async def check_expired_absences(self):
-        changed = False
-        new_absences = []
-        removed_count = 0
+        for channel in self.absence_channels():
+            data = self.guild_data(channel.guild.id)
+            changed = False
+            new_absences = []
+            removed_count = 0
 
-        for absence in self.absences['absences']:
-            try:
-                if not self.is_absence_expired(absence['end_date']):
-                    new_absences.append(absence)
-                else:
+            for absence in data['absences']:
+                try:
+                    if not self.is_absence_expired(absence['end_date']):
+                        new_absences.append(absence)
+                    else:
+                        removed_count += 1
+                        changed = True
+                except Exception as e:
+                    print(f"Błąd podczas sprawdzania nieobecności {absence}: {e}")
                     removed_count += 1
                     changed = True
-            except Exception as e:
-                print(f"Błąd podczas sprawdzania nieobecności {absence}: {e}")
-                removed_count += 1
-                changed = True
 
-        self.absences['absences'] = new_absences
+            data['absences'] = new_absences
 
-        for abs in self.absences['absences']:
-            print(f"User: {abs['user_id']}, Typ: {abs['type']}, Data: {abs['end_date']}")
+            for abs in data['absences']:
+                print(f"User: {abs['user_id']}, Typ: {abs['type']}, Data: {abs['end_date']}")
 
-        if changed or removed_count > 0:
-            channel = self.bot.get_channel(ABSENCE_CHANNEL_ID)
-            if channel:
+            if changed or removed_count > 0:
                 try:
                     await self.update_absence_embed(channel)
                     self.save_data()
@@ -108,17 +128,29 @@ class NieobecnosciSystem(commands.Cog):
             print(f"[BŁĄD DATY] Nie można przetworzyć daty '{end_date_str}': {e} - wpis zostanie usunięty")
             return True
 
+    def absence_channel(self, guild_id):
+        channel_id = self.bot.guild_config.get(guild_id, "absence_channel_id")
+        return self.bot.get_channel(channel_id) if channel_id else None
+
+    def absence_channels(self):
+        """Kanały nieobecności skonfigurowanych serwerów obsługiwanych przez shardy tego procesu"""
+        for channel_id in self.bot.guild_config.values("absence_channel_id"):
+            channel = self.bot.get_channel(channel_id)
+            if channel and owns_guild(self.bot, channel.guild.id):
+                yield channel
+
     async def cleanup_old_messages(self):
-        channel = self.bot.get_channel(ABSENCE_CHANNEL_ID)
-        if not channel:
-            return
+        for channel in self.absence_channels():
+            await self.cleanup_channel_messages(channel)
 
+    async def cleanup_channel_messages(self, channel):
         try:
             now = datetime.datetime.now(datetime.timezone.utc)
             cutoff = now - datetime.timedelta(hours=24)
 
+            panel_id = self.guild_data(channel.guild.id)['message_id']
             async for message in channel.history(limit=None):
-                if (message.id == self.absences['message_id'] or
+                if (message.id == panel_id or
                         (message.interaction_metadata is not None and message.created_at > now - datetime.timedelta(
                             hours=24))):
                     continue
@@ -147,10 +179,11 @@ class NieobecnosciSystem(commands.Cog):
             color=discord.Color.orange()
         )
 
+        data = self.guild_data(channel.guild.id)
         valid_absences = []
         invalid_count = 0
 
-        for absence in self.absences['absences']:
+        for absence in data['absences']:
             try:
                 start_date = absence['start_date']
                 end_date = absence['end_date']
@@ -231,9 +264,9 @@ class NieobecnosciSystem(commands.Cog):
             print(f"Błąd podczas tworzenia menu: {e}")
 
         try:
-            if self.absences.get('message_id'):
+            if data.get('message_id'):
                 try:
-                    message = await channel.fetch_message(self.absences['message_id'])
+                    message = await channel.fetch_message(data['message_id'])
                     await message.edit(embed=embed, view=view)
                     return
                 except discord.NotFound:
@@ -242,7 +275,7 @@ class NieobecnosciSystem(commands.Cog):
                     print(f"Błąd podczas edycji wiadomości: {e}")
 
             message = await channel.send(embed=embed, view=view)
-            self.absences['message_id'] = message.id
+            data['message_id'] = message.id
             self.save_data()
 
         except Exception as e:
@@ -254,17 +287,32 @@ class NieobecnosciSystem(commands.Cog):
             except:
                 pass
 
+    async def cog_load(self):
+        # Widok trwały obsługuje menu na już wysłanym embedzie także po restarcie bota
+        view = discord.ui.View(timeout=None)
+        view.add_item(NieobecnosciSelectMenu())
+        self.bot.add_view(view)
+
     @commands.Cog.listener()
     async def on_ready(self):
+        # on_ready przychodzi po każdym ponownym połączeniu; embed odświeżamy tylko raz na proces
+        if self.panel_ready:
+            return
+        self.panel_ready = True
+
         print("System nieobecności gotowy!")
-        channel = self.bot.get_channel(ABSENCE_CHANNEL_ID)
-        if channel:
+        for channel in self.absence_channels():
             await self.update_absence_embed(channel)
 
     @app_commands.command(name="update_absences", description="Aktualizuje embeda z nieobecnościami")
     async def update_absences(self, interaction: discord.Interaction):
+        channel = self.absence_channel(interaction.guild_id)
+        if channel is None:
+            await interaction.response.send_message(NOT_CONFIGURED, ephemeral=True)
+            return
+
         await interaction.response.defer(ephemeral=True)
-        await self.update_absence_embed(interaction.channel)
+        await self.update_absence_embed(channel)
         await interaction.followup.send("✅ Embed z nieobecnościami został zaktualizowany!", ephemeral=True)
 
     def cog_unload(self):
@@ -308,16 +356,21 @@ class NieobecnosciSelectMenu(discord.ui.Select):
 
     async def callback(self, interaction: discord.Interaction):
         cog = interaction.client.get_cog("NieobecnosciSystem")
+        channel = cog.absence_channel(interaction.guild_id)
+        if channel is None:
+            # Panel mógł zostać po usunięciu kanału z konfiguracji serwera
+            await interaction.response.send_message(NOT_CONFIGURED, ephemeral=True)
+            return
 
         if self.values[0] == "clear":
-            initial_count = len(cog.absences['absences'])
-            cog.absences['absences'] = [
-                abs for abs in cog.absences['absences']
+            data = cog.guild_data(interaction.guild_id)
+            initial_count = len(data['absences'])
+            data['absences'] = [
+                abs for abs in data['absences']
                 if abs['user_id'] != str(interaction.user.id)
             ]
-            removed_count = initial_count - len(cog.absences['absences'])
+            removed_count = initial_count - len(data['absences'])
 
-            channel = interaction.client.get_channel(ABSENCE_CHANNEL_ID)
             await cog.update_absence_embed(channel)
             cog.save_data()
 
@@ -354,6 +407,11 @@ class DailyAbsenceModal(ui.Modal, title="Zgłoś jednodniową nieobecność"):
 
     async def on_submit(self, interaction: discord.Interaction):
         cog = interaction.client.get_cog("NieobecnosciSystem")
+        channel = cog.absence_channel(interaction.guild_id)
+        if channel is None:
+            # Panel mógł zostać po usunięciu kanału z konfiguracji serwera
+            await interaction.response.send_message(NOT_CONFIGURED, ephemeral=True)
+            return
         today = datetime.date.today()
 
         try:
@@ -381,14 +439,13 @@ class DailyAbsenceModal(ui.Modal, title="Zgłoś jednodniową nieobecność"):
             start_date = f"{year}-{month:02d}-{day:02d}"
             datetime.datetime.strptime(start_date, "%Y-%m-%d")  # Rzuca ValueError jeśli data nie istnieje
 
-            cog.absences['absences'].append({
+            cog.guild_data(interaction.guild_id)['absences'].append({
                 'user_id': str(interaction.user.id),
                 'type': 'daily',
                 'start_date': start_date,
                 'end_date': start_date
             })
 
-            channel = interaction.client.get_channel(ABSENCE_CHANNEL_ID)
             await cog.update_absence_embed(channel)
             cog.save_data()
 
@@ -456,6 +513,11 @@ class PeriodAbsenceModal(ui.Modal, title="Zgłoś dłuższą nieobecność"):
 
     async def on_submit(self, interaction: discord.Interaction):
         cog = interaction.client.get_cog("NieobecnosciSystem")
+        channel = cog.absence_channel(interaction.guild_id)
+        if channel is None:
+            # Panel mógł zostać po usunięciu kanału z konfiguracji serwera
+            await interaction.response.send_message(NOT_CONFIGURED, ephemeral=True)
+            return
 
         try:
             start_date = await self.parse_and_validate_date(self.start_date.value)
@@ -467,14 +529,13 @@ class PeriodAbsenceModal(ui.Modal, title="Zgłoś dłuższą nieobecność"):
             if end_obj < start_obj:
                 raise ValueError("Data końcowa nie może być wcześniejsza niż początkowa!")
 
-            cog.absences['absences'].append({
+            cog.guild_data(interaction.guild_id)['absences'].append({
                 'user_id': str(interaction.user.id),
                 'type': 'period',
                 'start_date': start_date,
                 'end_date': end_date
             })
 
-            channel = interaction.client.get_channel(ABSENCE_CHANNEL_ID)
             await cog.update_absence_embed(channel)
             cog.save_data()
 
@@ -509,6 +570,11 @@ class LateAbsenceModal(ui.Modal, title="Zgłoś spóźnienie"):
 
     async def on_submit(self, interaction: discord.Interaction):
         cog = interaction.client.get_cog("NieobecnosciSystem")
+        channel = cog.absence_channel(interaction.guild_id)
+        if channel is None:
+            # Panel mógł zostać po usunięciu kanału z konfiguracji serwera
+            await interaction.response.send_message(NOT_CONFIGURED, ephemeral=True)
+            return
         today = datetime.date.today()
 
         try:
@@ -536,14 +602,13 @@ class LateAbsenceModal(ui.Modal, title="Zgłoś spóźnienie"):
             start_date = f"{year}-{month:02d}-{day:02d}"
             datetime.datetime.strptime(start_date, "%Y-%m-%d")
 
-            cog.absences['absences'].append({
+            cog.guild_data(interaction.guild_id)['absences'].append({
                 'user_id': str(interaction.user.id),
                 'type': 'late',
                 'start_date': start_date,
                 'end_date': start_date
             })
 
-            channel = interaction.client.get_channel(ABSENCE_CHANNEL_ID)
             await cog.update_absence_embed(channel)
             cog.save_data()
 
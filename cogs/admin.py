@@ -0,0 +1,77 @@
+import discord
+from typing import Optional
+from discord.ext import commands
+from discord import app_commands
+
+
+class AdminCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="shards", description="Pokazuje opóźnienie i liczbę zdarzeń każdego sharda.")
+    async def shards(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ Nie masz uprawnień do użycia tej komendy.", ephemeral=True)
+            return
+
+        stats = self.bot.shard_events.stats(self.bot)
+        embed = discord.Embed(
+            title="🛰️ Shardy",
+            description=f"Shardów łącznie: {self.bot.shard_count or 1}, w tym procesie: {len(stats)}",
+            color=discord.Color.blurple()
+        )
+        for shard_id, shard in stats.items():
+            top_events = ", ".join(f"{name} {count}" for name, count in shard["top_events"]) or "-"
+            embed.add_field(
+                name=f"Shard {shard_id}" + (" (ten serwer)" if interaction.guild.shard_id == shard_id else ""),
+                value=(
+                    f"Opóźnienie: {shard['latency_ms']:.0f} ms\n"
+                    f"Serwery: {shard['guilds']}\n"
+                    f"Zdarzenia: {shard['events']}\n"
+                    f"-# {top_events}"
+                ),
+                inline=True
+            )
+        embed.set_footer(text=f"Zdarzenia bez serwera: {self.bot.shard_events.unassigned()}")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="watchdog", description="Włącza, wyłącza lub pokazuje stan watchdoga pętli zdarzeń.")
+    @app_commands.describe(
+        wlacz="Włącz (True) lub wyłącz (False) watchdoga; bez wartości pokazuje tylko stan",
+        prog_ms="Próg blokady pętli w milisekundach"
+    )
+    async def watchdog(self, interaction: discord.Interaction, wlacz: Optional[bool] = None,
+                       prog_ms: Optional[app_commands.Range[int, 10, 60000]] = None):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ Nie masz uprawnień do użycia tej komendy.", ephemeral=True)
+            return
+
+        watchdog = self.bot.loop_watchdog
+        if prog_ms is not None:
+            watchdog.threshold = prog_ms / 1000
+        if wlacz is True:
+            watchdog.start()
+        elif wlacz is False:
+            watchdog.stop()
+
+        stats = watchdog.stats()
+        lines = [
+            f"Stan: {'✅ włączony' if stats['running'] else '⏸️ wyłączony'}, próg {stats['threshold_ms']:.0f} ms",
+            f"Pomiary: {stats['checks']}, średnie opóźnienie {stats['avg_lag_ms']:.2f} ms, "
+            f"maksymalne {stats['max_lag_ms']:.0f} ms",
+            f"Blokady: {stats['stalls']}",
+            "```",
+            *(f"≤ {'∞' if bound == float('inf') else f'{bound * 1000:g} ms':>9}  {count}"
+              for bound, count in stats["histogram"] if count),
+            "```"
+        ]
+        if watchdog.stalls:
+            _, lag, stack = watchdog.stalls[-1]
+            # Ostatnie ramki stosu wskazują miejsce blokady; cały stos jest w logu
+            tail = stack[-900:]
+            lines.append(f"Ostatnia blokada ({lag * 1000:.0f} ms):\n```{tail}```")
+        await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(AdminCommands(bot))
@@ -6,9 +6,13 @@ class ModerationCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    def is_moderator(self, member):
+        role_id = self.bot.guild_config.get(member.guild.id, "moderator_role_id")
+        return role_id is not None and member.get_role(role_id) is not None
+
     @app_commands.command(name="muteall", description="Wycisza wszystkich użytkowników na kanale głosowym.")
     async def muteall(self, interaction: discord.Interaction):
-        if 1212783011305889822 not in [role.id for role in interaction.user.roles]:
+        if not self.is_moderator(interaction.user):
             await interaction.response.send_message("❌ Nie masz uprawnień do użycia tej komendy.", ephemeral=True)
             return
 
@@ -18,14 +22,14 @@ class ModerationCommands(commands.Cog):
 
         channel = interaction.user.voice.channel
         for member in channel.members:
-            if 1212783011305889822 not in [role.id for role in member.roles]:
+            if not self.is_moderator(member):
                 await member.edit(mute=True)
         await interaction.response.send_message("✅ Wyciszono wszystkich użytkowników na kanale.")
 
     @app_commands.command(name="unmuteall", description="Wyłącza wyciszenie wszystkim użytkownikom na kanale głosowym.")
     async def unmuteall(self, interaction: discord.Interaction):
         try:
-            if 1212783011305889822 not in [role.id for role in interaction.user.roles]:
+            if not self.is_moderator(interaction.user):
                 await interaction.response.send_message("❌ Nie masz uprawnień do użycia tej komendy.", ephemeral=True)
                 return
 
@@ -44,5 +48,28 @@ class ModerationCommands(commands.Cog):
         except Exception as e:
             await interaction.followup.send(f"❌ Wystąpił błąd: {e}")
 
+    @app_commands.command(name="reload_config", description="Wczytuje ponownie konfigurację kanałów i ról serwerów.")
+    async def reload_config(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ Nie masz uprawnień do użycia tej komendy.", ephemeral=True)
+            return
+
+        error = self.bot.guild_config.reload()
+        if error:
+            await interaction.response.send_message(
+                f"❌ Nie udało się wczytać konfiguracji, obowiązuje poprzednia: {error}", ephemeral=True
+            )
+            return
+
+        # Roboty mają własną kopię konfiguracji; wczytają plik, który właśnie okazał się poprawny
+        worker_pool = getattr(self.bot, "worker_pool", None)
+        if worker_pool:
+            worker_pool.broadcast(("reload_config", None))
+
+        stats = self.bot.guild_config.stats()
+        await interaction.response.send_message(
+            f"✅ Wczytano konfigurację: {stats['guilds']} serwerów, {stats['channels']} kanałów.", ephemeral=True
+        )
+
 async def setup(bot):
     await bot.add_cog(ModerationCommands(bot))
\ No newline at end of file
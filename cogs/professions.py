@@ -5,9 +5,11 @@ import json
 import os
 from discord.ext import commands, tasks
 from discord import app_commands, ui
+from utils.metrics import TASK_DURATION
+from utils.sharding import in_process, owns_guild, process_data_path
 
-PROFESJE_CHANNEL_ID = 1375441476154298458
 DATA_FILE = "data/profesje.json"
+NOT_CONFIGURED = "❌ Ten serwer nie ma skonfigurowanego kanału profesji."
 PROFESJE = {
     "Blacksmithing": "<:bs:1375428094864654409>",
     "Enchanting": "<:ench:1375428108823560202>",
@@ -22,47 +24,76 @@ PROFESJE = {
 class ProfesjeSystem(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.data_file = process_data_path(bot, DATA_FILE)
         self.data = self.load_data()
+        self.panel_ready = False
         self.cleanup_task.start()
 
     def load_data(self):
         os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
+        # Proces z częścią shardów (SHARD_IDS) bez własnego pliku zaczyna od wspólnego
+        path = self.data_file if os.path.exists(self.data_file) else DATA_FILE
         try:
-            with open(DATA_FILE, 'r') as f:
+            with open(path, 'r') as f:
                 data = json.load(f)
-                for prof in PROFESJE:
-                    if prof not in data.get('crafters', {}):
-                        data['crafters'][prof] = []
-                return data
         except (FileNotFoundError, json.JSONDecodeError):
-            return {
-                'message_id': None,
-                'crafters': {prof: [] for prof in PROFESJE}
-            }
+            return {'guilds': {}}
+
+        if 'guilds' not in data:
+            # Stary format z jednym panelem dla jednego serwera
+            return {'guilds': {}, 'legacy': data}
+        data['guilds'] = {key: guild for key, guild in data['guilds'].items() if in_process(self.bot, int(key))}
+        return data
 
     def save_data(self):
-        with open(DATA_FILE, 'w') as f:
+        with open(self.data_file, 'w') as f:
             json.dump(self.data, f, indent=4)
 
+    def guild_data(self, guild_id):
+        """Panel serwera: {'message_id': ..., 'crafters': {profesja: [user_id, ...]}}"""
+        guilds = self.data['guilds']
+        key = str(guild_id)
+        if key not in guilds:
+            # Dane ze starego formatu należą do jedynego serwera, który miał wtedy skonfigurowany kanał
+            legacy = self.data.pop('legacy', None) if self.profesje_channel(guild_id) else None
+            guilds[key] = legacy or {'message_id': None, 'crafters': {}}
+        crafters = guilds[key].setdefault('crafters', {})
+        for prof in PROFESJE:
+            crafters.setdefault(prof, [])
+        return guilds[key]
+
     @tasks.loop(hours=1)
     async def cleanup_task(self):
-        await self.cleanup_old_messages()
+        with TASK_DURATION.time(task="profesje_cleanup"):
+            await self.cleanup_old_messages()
 
     @cleanup_task.before_loop
     async def before_cleanup(self):
         await self.bot.wait_until_ready()
 
+    def profesje_channel(self, guild_id):
+        channel_id = self.bot.guild_config.get(guild_id, "profesje_channel_id")
+        return self.bot.get_channel(channel_id) if channel_id else None
+
+    def profesje_channels(self):
+        """Kanały profesji skonfigurowanych serwerów obsługiwanych przez shardy tego procesu"""
+        for channel_id in self.bot.guild_config.values("profesje_channel_id"):
+            channel = self.bot.get_channel(channel_id)
+            if channel and owns_guild(self.bot, channel.guild.id):
+                yield channel
+
     async def cleanup_old_messages(self):
-        channel = self.bot.get_channel(PROFESJE_CHANNEL_ID)
-        if not channel:
-            return
+        for channel in self.profesje_channels():
+            await self.cleanup_channel_messages(channel)
 
+    async def cleanup_channel_messages(self, channel):
         try:
             now = datetime.datetime.now(datetime.timezone.utc)
             cutoff = now - datetime.timedelta(hours=24)
 
+            panel_id = self.guild_data(channel.guild.id)['message_id']
             async for message in channel.history(limit=None):
-                if message.id == self.data['message_id']:
+                if message.id == panel_id:
                     continue
 
                 if message.created_at < cutoff:
@@ -88,8 +119,9 @@ class ProfesjeSystem(commands.Cog):
             color=discord.Color.dark_gold()
         )
 
+        data = self.guild_data(channel.guild.id)
         for prof, emoji in PROFESJE.items():
-            crafters = self.data['crafters'].get(prof, [])
+            crafters = data['crafters'].get(prof, [])
             crafters_list = "\n".join([f"<@{cid}>" for cid in crafters]) if crafters else "-# Brak crafterów"
             embed.add_field(
                 name=f"{emoji} {prof}",
@@ -105,9 +137,9 @@ class ProfesjeSystem(commands.Cog):
         view = discord.ui.View(timeout=None)
         view.add_item(ProfesjeSelectMenu())
 
-        if self.data['message_id']:
+        if data['message_id']:
             try:
-                message = await channel.fetch_message(self.data['message_id'])
+                message = await channel.fetch_message(data['message_id'])
                 await message.edit(embed=embed, view=view)
                 return
             except discord.NotFound:
@@ -115,20 +147,35 @@ class ProfesjeSystem(commands.Cog):
 
         embed.set_footer(text=f"Wybierz profesję z menu poniżej aby zostać dodanym/usuniętym")
         message = await channel.send(embed=embed, view=view)
-        self.data['message_id'] = message.id
+        data['message_id'] = message.id
         self.save_data()
 
+    async def cog_load(self):
+        # Widok trwały obsługuje menu na już wysłanym embedzie także po restarcie bota
+        view = discord.ui.View(timeout=None)
+        view.add_item(ProfesjeSelectMenu())
+        self.bot.add_view(view)
+
     @commands.Cog.listener()
     async def on_ready(self):
+        # on_ready przychodzi po każdym ponownym połączeniu; embed odświeżamy tylko raz na proces
+        if self.panel_ready:
+            return
+        self.panel_ready = True
+
         print("System profesji gotowy!")
-        channel = self.bot.get_channel(PROFESJE_CHANNEL_ID)
-        if channel:
+        for channel in self.profesje_channels():
             await self.update_profesje_embed(channel)
 
     @app_commands.command(name="update_profesje", description="Aktualizuje embeda z profesjami")
     async def update_profesje(self, interaction: discord.Interaction):
+        channel = self.profesje_channel(interaction.guild_id)
+        if channel is None:
+            await interaction.response.send_message(NOT_CONFIGURED, ephemeral=True)
+            return
+
         await interaction.response.defer(ephemeral=True)
-        await self.update_profesje_embed(interaction.channel)
+        await self.update_profesje_embed(channel)
         await interaction.followup.send("✅ Embed z profesjami został zaktualizowany!", ephemeral=True)
 
 
@@ -154,15 +201,21 @@ class ProfesjeSelectMenu(discord.ui.Select):
         selected_prof = self.values[0]
         user_id = interaction.user.id
         cog = interaction.client.get_cog("ProfesjeSystem")
+        channel = cog.profesje_channel(interaction.guild_id)
+        if channel is None:
+            # Panel mógł zostać po usunięciu kanału z konfiguracji serwera
+            await interaction.response.send_message(NOT_CONFIGURED, ephemeral=True)
+            return
+
+        crafters = cog.guild_data(interaction.guild_id)['crafters'][selected_prof]
 
-        if user_id in cog.data['crafters'][selected_prof]:
-            cog.data['crafters'][selected_prof].remove(user_id)
+        if user_id in crafters:
+            crafters.remove(user_id)
             action = "usunięty"
         else:
-            cog.data['crafters'][selected_prof].append(user_id)
+            crafters.append(user_id)
             action = "dodany"
 
-        channel = interaction.client.get_channel(PROFESJE_CHANNEL_ID)
         await cog.update_profesje_embed(channel)
         cog.save_data()
 
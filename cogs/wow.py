@@ -1,15 +1,263 @@
+import asyncio
+import aiohttp
+import datetime
 import discord
-import requests
+import io
+import json
 import math
+import os
+import time
 import urllib.parse
-from discord.ext import commands
+from urllib.parse import urlsplit
+from discord.ext import commands, tasks
 from discord import app_commands, Embed
-from config import WCL_API_KEY
+from config import WCL_CLIENT_ID, WCL_CLIENT_SECRET
+from utils.cache import TTLCache, FRESH, STALE, MISS
+from utils.metrics import HTTP_LATENCY, TASK_DURATION
+from utils.raids import RaidCatalog
+from utils.ratelimit import TokenBucketScheduler, PRIORITY_INTERACTIVE, PRIORITY_BULK, parse_retry_after
+from utils.singleflight import SingleFlight
+from utils.store import ResponseStore
+from utils.wcl import WarcraftLogsClient, WarcraftLogsError
+
+RIO_API_URL = "https://raider.io/api/v1"
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=15, connect=5)
+HTTP_LIMIT = 32
+HTTP_LIMIT_PER_HOST = 8
+HTTP_KEEPALIVE = 60
+HTTP_MAX_RETRIES = 2
+HTTP_MAX_RETRY_WAIT = 30
+
+# Limity zapytań (zapytania na sekundę, maksymalny burst) dla każdego zewnętrznego API;
+# w procesach roboczych każdy robot dostaje część limitu (bot.rate_limit_share)
+RATE_LIMITS = {
+    "raider.io": (3, 10),
+    "www.warcraftlogs.com": (2, 5)
+}
+
+PROFILE_CACHE_SIZE = 1024
+PROFILE_DEFAULT_TTL = 10 * 60
+# Czas życia wpisu w cache zależy od najbardziej zmiennego pola w zapytaniu
+PROFILE_FIELD_TTLS = {
+    "thumbnail_url": 6 * 60 * 60,
+    "raid_achievement_curve": 6 * 60 * 60,
+    "mythic_plus_weekly_highest_level_runs": 5 * 60
+}
+RATE_LIMITED_MESSAGE = "⏳ Zewnętrzne API ogranicza liczbę zapytań. Spróbuj ponownie za chwilę."
+
+GUILD_NAME = "Solemnity"
+GUILD_REALM = "burning-legion"
+GUILD_ID = "2011892"
+GUILD_REFRESH_MINUTES = 10
+GUILD_THUMBNAIL_FILE = "data/solemnity.png"
+GUILD_THUMBNAIL_URL_TTL = 12 * 60 * 60
+
+PROFILE_ENDPOINT = "characters/profile"
+GUILD_SNAPSHOT_ENDPOINT = "guilds/snapshot"
+STORE_FLUSH_SECONDS = 30
+
+WEEKLY_FIELDS = "mythic_plus_weekly_highest_level_runs,thumbnail_url"
+WEEKLY_CONCURRENCY = HTTP_LIMIT_PER_HOST
+WEEKLY_EDIT_INTERVAL = 1.5
 
 
 class WowCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.session = None
+        self.profile_cache = TTLCache(max_size=PROFILE_CACHE_SIZE, name="profiles")
+        self._refresh_tasks = {}
+        self.in_flight = SingleFlight("upstream")
+        share = getattr(bot, "rate_limit_share", 1)
+        self.limiters = {
+            host: TokenBucketScheduler(host, rate * share, max(1, burst * share))
+            for host, (rate, burst) in RATE_LIMITS.items()
+        }
+        self.raids = RaidCatalog()
+        self.raids.reload_if_changed()
+        self.guild_snapshot = None
+        self._guild_thumbnail_bytes = None
+        self._guild_thumbnail_url = (None, 0)
+        self.wcl = WarcraftLogsClient(self._request_json, WCL_CLIENT_ID, WCL_CLIENT_SECRET)
+        self.store = ResponseStore()
+
+    async def cog_load(self):
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_LIMIT,
+            limit_per_host=HTTP_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE,
+            ttl_dns_cache=300
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=HTTP_TIMEOUT)
+
+        try:
+            await self.store.open()
+            await self.warm_start()
+        except Exception as e:
+            print(f"❌ Błąd podczas otwierania cache odpowiedzi API: {e}")
+
+        self.raids_watcher.start()
+        self.guild_refresher.start()
+        self.store_flusher.start()
+        self.store_pruner.start()
+
+    async def cog_unload(self):
+        self.raids_watcher.cancel()
+        self.guild_refresher.cancel()
+        self.store_flusher.cancel()
+        self.store_pruner.cancel()
+        for task in self._refresh_tasks.values():
+            task.cancel()
+        await self.store.close()
+        if self.session:
+            await self.session.close()
+
+    async def warm_start(self):
+        """Wypełnia cache w pamięci zapisanymi odpowiedziami, żeby pierwsze komendy po restarcie nie szły do API"""
+        rows = await self.store.load(PROFILE_ENDPOINT, PROFILE_CACHE_SIZE)
+        # Najstarsze najpierw, żeby najświeższe wpisy były na końcu kolejki LRU
+        for params, data, expires_at, stale_until in reversed(rows):
+            region, realm, name, fields = json.loads(params)
+            self._restore_profile((region, realm, name, tuple(fields)), data, expires_at, stale_until)
+
+        snapshot = await self.store.get(GUILD_SNAPSHOT_ENDPOINT, GUILD_NAME)
+        if snapshot:
+            data = snapshot[0]
+            data["updated_at"] = datetime.datetime.fromisoformat(data["updated_at"])
+            self.guild_snapshot = data
+
+        print(f"✅ Wczytano {len(rows)} profili postaci z cache na dysku.")
+
+    @tasks.loop(seconds=STORE_FLUSH_SECONDS)
+    async def store_flusher(self):
+        try:
+            with TASK_DURATION.time(task="store_flusher"):
+                await self.store.flush()
+        except Exception as e:
+            print(f"❌ Błąd zapisu cache odpowiedzi API: {e}")
+
+    @tasks.loop(hours=1)
+    async def store_pruner(self):
+        try:
+            with TASK_DURATION.time(task="store_pruner"):
+                removed = await self.store.prune()
+            if removed:
+                print(f"🧹 Usunięto {removed} wygasłych wpisów z cache odpowiedzi API.")
+        except Exception as e:
+            print(f"❌ Błąd czyszczenia cache odpowiedzi API: {e}")
+
+    async def get_json(self, url, params=None, priority=PRIORITY_INTERACTIVE):
+        """Pobiera JSON przez współdzieloną sesję HTTP, rzuca ClientResponseError przy błędnym statusie.
+
+        Identyczne zapytania wysłane w tym samym czasie czekają na jedną wspólną odpowiedź."""
+        key = (url, tuple(sorted((params or {}).items())))
+        return await self.in_flight.do(key, lambda: self._request_json("GET", url, priority, params=params))
+
+    async def _request_json(self, method, url, priority, **kwargs):
+        host = urlsplit(url).hostname
+        limiter = self.limiters.get(host)
+
+        for attempt in range(HTTP_MAX_RETRIES + 1):
+            if limiter:
+                await limiter.acquire(priority)
+
+            started = time.perf_counter()
+            try:
+                response = await self.session.request(method, url, **kwargs)
+            except Exception:
+                HTTP_LATENCY.observe(time.perf_counter() - started, host=host, status="error")
+                raise
+            HTTP_LATENCY.observe(time.perf_counter() - started, host=host, status=response.status)
+
+            async with response:
+                if response.status == 429 and limiter:
+                    delay = parse_retry_after(response.headers.get("Retry-After"), 2 ** attempt)
+                    limiter.retry_after(delay)
+                    print(f"⚠️ {limiter.name} zwrócił 429, wstrzymuję zapytania na {delay:.1f}s")
+                    if attempt < HTTP_MAX_RETRIES and delay <= HTTP_MAX_RETRY_WAIT:
+                        continue
+
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+    async def get_wcl_rankings(self, characters, difficulties, priority=PRIORITY_INTERACTIVE):
+        """Rankingi WCL dla listy par (nick, serwer) pobrane jednym zapytaniem GraphQL"""
+        key = ("wcl_rankings",
+               tuple((name.lower(), server.lower()) for name, server in characters),
+               tuple(difficulties))
+        return await self.in_flight.do(
+            key, lambda: self.wcl.character_rankings(characters, difficulties, priority))
+
+    @tasks.loop(seconds=60)
+    async def raids_watcher(self):
+        try:
+            with TASK_DURATION.time(task="raids_watcher"):
+                self.raids.reload_if_changed()
+        except Exception as e:
+            print(f"❌ Błąd podczas przeładowania listy raidów: {e}")
+
+    @staticmethod
+    def profile_ttl(fields):
+        ttls = [PROFILE_FIELD_TTLS.get(field.split(":")[0], PROFILE_DEFAULT_TTL) for field in fields]
+        return min(ttls, default=PROFILE_DEFAULT_TTL)
+
+    async def get_character_profile(self, realm, name, fields, priority=PRIORITY_INTERACTIVE):
+        """Pobiera profil postaci z Raider.io przez cache; przeterminowane wpisy są odświeżane w tle"""
+        normalized_fields = tuple(sorted(field.strip() for field in fields.split(",") if field.strip()))
+        key = ("eu", realm.lower(), name.lower(), normalized_fields)
+
+        data, state = self.profile_cache.get(key)
+        if state == MISS:
+            data, state = await self._read_stored_profile(key)
+
+        if state == FRESH:
+            return data
+        if state == STALE:
+            if key not in self._refresh_tasks:
+                task = asyncio.create_task(self._refresh_profile_in_background(key))
+                self._refresh_tasks[key] = task
+                task.add_done_callback(lambda _: self._refresh_tasks.pop(key, None))
+            return data
+
+        return await self._refresh_profile(key, priority)
+
+    async def _read_stored_profile(self, key):
+        try:
+            stored = await self.store.get(PROFILE_ENDPOINT, json.dumps(key))
+        except Exception as e:
+            print(f"❌ Błąd odczytu cache odpowiedzi API: {e}")
+            return None, MISS
+
+        if stored is None:
+            return None, MISS
+        return self._restore_profile(key, *stored)
+
+    def _restore_profile(self, key, data, expires_at, stale_until):
+        now = time.time()
+        fresh_for = max(0.0, expires_at - now)
+        self.profile_cache.set(key, data, fresh_for, stale_ttl=stale_until - now - fresh_for)
+        return data, FRESH if fresh_for > 0 else STALE
+
+    async def _refresh_profile(self, key, priority=PRIORITY_INTERACTIVE):
+        region, realm, name, fields = key
+        params = {
+            "region": region,
+            "realm": realm,
+            "name": name,
+            "fields": ",".join(fields)
+        }
+        data = await self.get_json(f"{RIO_API_URL}/characters/profile", params, priority)
+
+        ttl = self.profile_ttl(fields)
+        self.profile_cache.set(key, data, ttl, stale_ttl=ttl)
+        self.store.put(PROFILE_ENDPOINT, json.dumps(key), data, ttl, stale_ttl=ttl)
+        return data
+
+    async def _refresh_profile_in_background(self, key):
+        try:
+            await self._refresh_profile(key, PRIORITY_BULK)
+        except Exception as e:
+            print(f"❌ Błąd odświeżania profilu {key[2]}-{key[1]} w tle: {e}")
 
     @app_commands.command(name="ce", description="Pokazuje ilość CE postaci")
     @app_commands.describe(
@@ -20,27 +268,15 @@ class WowCommands(commands.Cog):
         await interaction.response.defer()
 
         try:
-            with open('data/raids.txt', 'r') as f:
-                raids_line = f.readline().strip()
-                raids_list = raids_line.split(':')[1:]
+            if self.raids.mtime is None:
+                await interaction.followup.send("❌ Brak pliku raids.txt z listą raidów")
+                return
 
-            if not raids_list:
+            if not self.raids.slugs:
                 await interaction.followup.send("❌ Brak danych o raidach w pliku raids.txt")
                 return
 
-            fields_value = "raid_achievement_curve:" + ":".join(raids_list)
-
-            url = "https://raider.io/api/v1/characters/profile"
-            params = {
-                "region": "eu",
-                "realm": serwer.lower(),
-                "name": nick,
-                "fields": fields_value + ",thumbnail_url"
-            }
-
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            data = await self.get_character_profile(serwer, nick, self.raids.curve_fields + ",thumbnail_url")
 
             character_name = data.get("name", nick)
             realm = data.get("realm", serwer)
@@ -51,7 +287,7 @@ class WowCommands(commands.Cog):
 
             for raid in achievements:
                 if raid.get("cutting_edge"):
-                    raid_name = raid["raid"].replace("-", " ").title()
+                    raid_name = self.raids.display_name(raid["raid"])
                     ce_date = raid["cutting_edge"].split("T")[0]
                     ce_list.append(f"🔹 `{raid_name:<25}` {ce_date}")
 
@@ -84,39 +320,117 @@ class WowCommands(commands.Cog):
             embed.set_footer(text=f"{interaction.guild.name} • {self.bot.user.name}")
             await interaction.followup.send(embed=embed, view=view)
 
-        except FileNotFoundError:
-            await interaction.followup.send("❌ Brak pliku raids.txt z listą raidów")
-        except requests.exceptions.HTTPError as e:
-            if hasattr(e, 'response') and e.response.status_code == 404:
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
                 await interaction.followup.send(f"❌ Nie znaleziono postaci {nick} na serwerze {serwer}")
+            elif e.status == 429:
+                await interaction.followup.send(RATE_LIMITED_MESSAGE)
             else:
                 await interaction.followup.send(f"❌ Błąd podczas pobierania danych z Raider.io. Sprawdź poprawność nicku i serwera.")
         except Exception as e:
             await interaction.followup.send(f"❌ Wystąpił nieoczekiwany błąd: {e}")
 
-    @app_commands.command(name="solemnity", description="Wyświetla informacje o gildii Solemnity.")
-    @app_commands.describe(raid_index="Indeks raidu")
-    async def solemnity(self, interaction: discord.Interaction, raid_index: int = 1):
-        await interaction.response.defer()
+    @tasks.loop(minutes=GUILD_REFRESH_MINUTES)
+    async def guild_refresher(self):
+        try:
+            with TASK_DURATION.time(task="guild_refresher"):
+                await self.refresh_guild_snapshot(PRIORITY_BULK)
+        except Exception as e:
+            print(f"❌ Błąd odświeżania danych gildii {GUILD_NAME}: {e}")
+
+    @guild_refresher.before_loop
+    async def before_guild_refresher(self):
+        await self.bot.wait_until_ready()
+
+    async def refresh_guild_snapshot(self, priority=PRIORITY_INTERACTIVE):
+        """Pobiera progres gildii i pull count wszystkich raidów; równoczesne odświeżenia są łączone"""
+        return await self.in_flight.do("guild_snapshot", lambda: self._build_guild_snapshot(priority))
 
-        url_guild = "https://raider.io/api/v1/guilds/profile"
+    async def _build_guild_snapshot(self, priority):
         params_guild = {
             "region": "eu",
-            "realm": "burning-legion",
-            "name": "Solemnity",
+            "realm": GUILD_REALM,
+            "name": GUILD_NAME,
             "fields": "raid_progression,raid_rankings"
         }
+        data_guild = await self.get_json(f"{RIO_API_URL}/guilds/profile", params_guild, priority)
+
+        raid_list = list(data_guild.get("raid_progression", {}).keys())
+        responses = await asyncio.gather(
+            *[self.get_json(f"{RIO_API_URL}/raiding/raid-rankings", {
+                "raid": raid,
+                "difficulty": "mythic",
+                "region": "eu",
+                "realm": GUILD_REALM,
+                "guilds": GUILD_ID,
+                "limit": 1,
+                "page": 0
+            }, priority) for raid in raid_list],
+            return_exceptions=True
+        )
+
+        previous_pulls = self.guild_snapshot["pulls"] if self.guild_snapshot else {}
+        pulls = {}
+        for raid, response in zip(raid_list, responses):
+            if isinstance(response, Exception):
+                print(f"❌ Błąd pobierania pull countu dla {raid}: {response}")
+                pulls[raid] = previous_pulls.get(raid)
+            else:
+                pulls[raid] = response
+
+        self.guild_snapshot = {
+            "guild": data_guild,
+            "raids": raid_list,
+            "pulls": pulls,
+            "updated_at": datetime.datetime.now(datetime.timezone.utc)
+        }
+        self.store.put(GUILD_SNAPSHOT_ENDPOINT, GUILD_NAME,
+                       dict(self.guild_snapshot, updated_at=self.guild_snapshot["updated_at"].isoformat()),
+                       ttl=24 * 60 * 60)
+        return self.guild_snapshot
+
+    def guild_thumbnail(self):
+        """Zwraca (url, plik) miniatury gildii; plik jest dołączany tylko gdy nie mamy aktualnego adresu z CDN"""
+        url, expires_at = self._guild_thumbnail_url
+        if url and time.time() < expires_at:
+            return url, None
+
+        if self._guild_thumbnail_bytes is None:
+            with open(GUILD_THUMBNAIL_FILE, 'rb') as f:
+                self._guild_thumbnail_bytes = f.read()
+
+        filename = os.path.basename(GUILD_THUMBNAIL_FILE)
+        return f"attachment://{filename}", discord.File(io.BytesIO(self._guild_thumbnail_bytes), filename=filename)
+
+    def remember_guild_thumbnail(self, message):
+        if not message.embeds or not message.embeds[0].thumbnail.url:
+            return
+
+        url = message.embeds[0].thumbnail.url
+        expires_at = time.time() + GUILD_THUMBNAIL_URL_TTL
+        # Podpisane adresy CDN Discorda wygasają; czas wygaśnięcia jest w parametrze "ex" (hex, unix)
+        expiry = urllib.parse.parse_qs(urlsplit(url).query).get("ex")
+        if expiry:
+            try:
+                expires_at = min(expires_at, int(expiry[0], 16) - 60 * 60)
+            except ValueError:
+                pass
+        self._guild_thumbnail_url = (url, expires_at)
+
+    @app_commands.command(name="solemnity", description="Wyświetla informacje o gildii Solemnity.")
+    @app_commands.describe(raid_index="Indeks raidu")
+    async def solemnity(self, interaction: discord.Interaction, raid_index: int = 1):
+        await interaction.response.defer()
 
         try:
-            response_guild = requests.get(url_guild, params=params_guild)
-            response_guild.raise_for_status()
-            data_guild = response_guild.json()
+            snapshot = self.guild_snapshot or await self.refresh_guild_snapshot()
 
-            guild_name = data_guild.get("name", "Solemnity")
+            data_guild = snapshot["guild"]
+            guild_name = data_guild.get("name", GUILD_NAME)
             raid_progression = data_guild.get("raid_progression", {})
             raid_rankings = data_guild.get("raid_rankings", {})
 
-            raid_list = list(raid_progression.keys())
+            raid_list = snapshot["raids"]
             if not raid_list:
                 await interaction.followup.send("❌ Brak danych o raidach.")
                 return
@@ -138,23 +452,12 @@ class WowCommands(commands.Cog):
             else:
                 world_rank = region_rank = realm_rank = "Brak danych"
 
-            url_pulls = "https://raider.io/api/v1/raiding/raid-rankings"
-            params_pulls = {
-                "raid": current_raid,
-                "difficulty": "mythic",
-                "region": "eu",
-                "realm": "burning-legion",
-                "guilds": "2011892",
-                "limit": 1,
-                "page": 0
-            }
-
-            response_pulls = requests.get(url_pulls, params=params_pulls)
-            response_pulls.raise_for_status()
-            data_pulls = response_pulls.json()
+            data_pulls = snapshot["pulls"].get(current_raid)
 
             boss_list = []
-            if "raidRankings" in data_pulls and data_pulls["raidRankings"]:
+            if data_pulls is None:
+                boss_list.append("⚠️ Nie udało się pobrać pull countu z Raider.io")
+            elif "raidRankings" in data_pulls and data_pulls["raidRankings"]:
                 ranking_data = data_pulls["raidRankings"][0]
                 encounters_pulled = ranking_data.get("encountersPulled", [])
                 for boss in encounters_pulled:
@@ -182,27 +485,41 @@ class WowCommands(commands.Cog):
                             f"🗺️ Region: {region_rank}\n"
                             f"🏞️ Realm: {realm_rank}\n\n"
                             f"**Pull count:**\n{boss_list_message}",
-                color=discord.Color.gold()
+                color=discord.Color.gold(),
+                timestamp=snapshot["updated_at"]
             )
 
-            file = discord.File("data/solemnity.png", filename="solemnity.png")
-            embed.set_thumbnail(url="attachment://solemnity.png")
+            thumbnail_url, file = self.guild_thumbnail()
+            embed.set_thumbnail(url=thumbnail_url)
 
             view = discord.ui.View()
-            raiderio_url = f"https://raider.io/guilds/eu/burning-legion/Solemnity"
+            raiderio_url = f"https://raider.io/guilds/eu/{GUILD_REALM}/{GUILD_NAME}"
             view.add_item(
                 discord.ui.Button(
                     label="Raider.io",
                     url=raiderio_url,
-                    style=discord.ButtonStyle,
+                    style=discord.ButtonStyle.link,
                     emoji="🌐"
                 )
             )
 
-            embed.set_footer(text=f"{interaction.guild.name} • {self.bot.user.name}")
-            await interaction.followup.send(embed=embed, file=file, view=view)
+            age = datetime.datetime.now(datetime.timezone.utc) - snapshot["updated_at"]
+            embed.set_footer(
+                text=f"{interaction.guild.name} • {self.bot.user.name} • "
+                     f"dane sprzed {int(age.total_seconds() // 60)} min")
+
+            if file:
+                message = await interaction.followup.send(embed=embed, file=file, view=view, wait=True)
+                self.remember_guild_thumbnail(message)
+            else:
+                await interaction.followup.send(embed=embed, view=view)
 
-        except requests.exceptions.RequestException as e:
+        except aiohttp.ClientResponseError as e:
+            if e.status == 429:
+                await interaction.followup.send(RATE_LIMITED_MESSAGE)
+            else:
+                await interaction.followup.send(f"❌ Błąd podczas pobierania danych z Raider.io: {e}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             await interaction.followup.send(f"❌ Błąd podczas pobierania danych z Raider.io: {e}")
         except Exception as e:
             await interaction.followup.send(f"❌ Wystąpił nieoczekiwany błąd: {e}")
@@ -221,74 +538,85 @@ class WowCommands(commands.Cog):
             return
 
         try:
-            results = []
-            thumbnails = []
-
-            for character in characters:
-                url = "https://raider.io/api/v1/characters/profile"
-                params = {
-                    "region": "eu",
-                    "realm": realm.lower(),
-                    "name": character,
-                    "fields": "mythic_plus_weekly_highest_level_runs,name,thumbnail_url"
-                }
-
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+            results = [f"⏳ `{character:<10}` ..." for character in characters]
+            thumbnails = [None] * len(characters)
+            semaphore = asyncio.Semaphore(WEEKLY_CONCURRENCY)
+
+            async def fetch_character(index, character):
+                async with semaphore:
+                    try:
+                        data = await self.get_character_profile(realm, character, WEEKLY_FIELDS, PRIORITY_BULK)
+                    except aiohttp.ClientResponseError as e:
+                        if e.status == 404:
+                            return index, f"❓ `{character:<10}` nie znaleziono postaci", None
+                        if e.status == 429:
+                            return index, f"⏳ `{character:<10}` limit zapytań Raider.io, spróbuj później", None
+                        return index, f"⚠️ `{character:<10}` błąd Raider.io ({e.status})", None
+                    except (aiohttp.ClientError, asyncio.TimeoutError):
+                        return index, f"⚠️ `{character:<10}` brak odpowiedzi z Raider.io", None
+                    except Exception as e:
+                        return index, f"⚠️ `{character:<10}` błąd: {e}", None
 
                 character_name = data.get("name", character)
-                weekly_runs = data.get("mythic_plus_weekly_highest_level_runs", [])
-                num_runs = len(weekly_runs)
-                thumbnail_url = data.get("thumbnail_url", "")
-
-                if num_runs == 0:
-                    results.append(f"💀 `{character_name:<10}` **0** dungów")
-                elif num_runs == 1:
-                    results.append(f"😂 `{character_name:<10}` **1** dung")
-                elif 2 <= num_runs <= 4:
-                    results.append(f"😐 `{character_name:<10}` **{num_runs}** dungi")
-                elif 5 <= num_runs <= 7:
-                    results.append(f"🤨 `{character_name:<10}` **{num_runs}** dungów")
-                else:
-                    results.append(f"😎 `{character_name:<10}` **{num_runs}** dungów")
-
-                if thumbnail_url and not thumbnails:
-                    thumbnails.append(thumbnail_url)
+                num_runs = len(data.get("mythic_plus_weekly_highest_level_runs", []))
+                return index, self.format_weekly_line(character_name, num_runs), data.get("thumbnail_url", "")
+
+            def build_embed(done):
+                embed = Embed(
+                    title=f"Weekly 🔻 Multisearch",
+                    description="\n".join(results),
+                    color=discord.Color.purple()
+                )
 
-            embed = Embed(
-                title=f"Weekly 🔻 Multisearch",
-                description="\n".join(results),
-                color=discord.Color.purple()
-            )
+                thumbnail_url = next((thumbnail for thumbnail in thumbnails if thumbnail), None)
+                if thumbnail_url:
+                    embed.set_thumbnail(url=thumbnail_url)
 
-            if thumbnails:
-                embed.set_thumbnail(url=thumbnails[0])
+                footer = f"{interaction.guild.name} • {self.bot.user.name}"
+                if done < len(characters):
+                    footer = f"Pobrano {done}/{len(characters)} • " + footer
+                embed.set_footer(text=footer)
+                return embed
 
-            embed.set_footer(text=f"{interaction.guild.name} • {self.bot.user.name}")
-            await interaction.followup.send(embed=embed)
+            fetches = [asyncio.create_task(fetch_character(index, character))
+                     for index, character in enumerate(characters)]
+            message = await interaction.followup.send(embed=build_embed(0), wait=True)
+
+            loop = asyncio.get_running_loop()
+            last_edit = loop.time()
+            done = 0
+            for finished in asyncio.as_completed(fetches):
+                index, line, thumbnail_url = await finished
+                results[index] = line
+                thumbnails[index] = thumbnail_url
+                done += 1
+
+                # Edycje wiadomości są limitowane przez Discorda, więc odświeżamy embed co najwyżej raz na interwał
+                if done < len(characters) and loop.time() - last_edit >= WEEKLY_EDIT_INTERVAL:
+                    await message.edit(embed=build_embed(done))
+                    last_edit = loop.time()
+
+            await message.edit(embed=build_embed(done))
 
-        except requests.exceptions.HTTPError as e:
-            if hasattr(e, 'response') and e.response.status_code == 404:
-                await interaction.followup.send(f"❌ Nie znaleziono jednej z postaci na serwerze {realm}.")
-            else:
-                await interaction.followup.send(f"❌ Błąd podczas pobierania danych z Raider.io: {e}")
         except Exception as e:
             await interaction.followup.send(f"❌ Wystąpił nieoczekiwany błąd: {e}")
 
-    async def process_single_character(self, interaction: discord.Interaction, nick: str, realm: str):
-        url = "https://raider.io/api/v1/characters/profile"
-        params = {
-            "region": "eu",
-            "realm": realm.lower(),
-            "name": nick,
-            "fields": "mythic_plus_weekly_highest_level_runs"
-        }
+    @staticmethod
+    def format_weekly_line(character_name, num_runs):
+        if num_runs == 0:
+            return f"💀 `{character_name:<10}` **0** dungów"
+        elif num_runs == 1:
+            return f"😂 `{character_name:<10}` **1** dung"
+        elif 2 <= num_runs <= 4:
+            return f"😐 `{character_name:<10}` **{num_runs}** dungi"
+        elif 5 <= num_runs <= 7:
+            return f"🤨 `{character_name:<10}` **{num_runs}** dungów"
+        else:
+            return f"😎 `{character_name:<10}` **{num_runs}** dungów"
 
+    async def process_single_character(self, interaction: discord.Interaction, nick: str, realm: str):
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            data = await self.get_character_profile(realm, nick, WEEKLY_FIELDS)
 
             nick = data.get("name", nick)
             realm = data.get("realm", realm)
@@ -331,9 +659,11 @@ class WowCommands(commands.Cog):
             embed.set_footer(text=f"{interaction.guild.name} • {self.bot.user.name}")
             await interaction.followup.send(embed=embed, view=view)
 
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 404:
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
                 await interaction.followup.send(f"❌ Nie znaleziono postaci {nick} na serwerze {realm}.")
+            elif e.status == 429:
+                await interaction.followup.send(RATE_LIMITED_MESSAGE)
             else:
                 await interaction.followup.send(f"❌ Błąd podczas pobierania danych z Raider.io: {e}")
         except Exception as e:
@@ -341,16 +671,13 @@ class WowCommands(commands.Cog):
 
     @app_commands.command(name="logs", description="Pokazuje statystyki postaci z Warcraft Logs")
     @app_commands.describe(
-        nick="Nazwa postaci",
+        nick="Nazwy postaci (oddzielone spacjami)",
         serwer="Serwer postaci (domyślnie burning-legion)",
         tryb="Tryb raidu: M (Mythic) lub HC (Heroic) (domyślnie M)"
     )
     async def logs(self, interaction: discord.Interaction, nick: str, serwer: str = "burning-legion", tryb: str = "M"):
         await interaction.response.defer()
 
-        WCL_BASE_URL = "https://www.warcraftlogs.com/v1/rankings/character"
-        RIO_BASE_URL = "https://raider.io/api/v1/characters/profile"
-
         difficulty_map = {
             "M": 5,
             "HC": 4
@@ -362,63 +689,48 @@ class WowCommands(commands.Cog):
             return
 
         target_difficulty = difficulty_map[tryb]
+        difficulty_name = 'Mythic' if tryb == 'M' else 'Heroic'
+        characters = nick.split()
+
+        if len(characters) > 1:
+            await self.process_multiple_logs(interaction, characters, serwer, target_difficulty, difficulty_name)
+            return
+
+        nick = characters[0] if characters else nick
+        formatted_nick = nick.capitalize()
 
         try:
-            rio_params = {
-                "region": "eu",
-                "realm": serwer.lower(),
-                "name": nick,
-                "fields": "thumbnail_url"
-            }
-            rio_response = requests.get(RIO_BASE_URL, params=rio_params)
-            rio_response.raise_for_status()
-            rio_data = rio_response.json()
+            rio_data, (character,) = await asyncio.gather(
+                self.get_character_profile(serwer, nick, "thumbnail_url"),
+                self.get_wcl_rankings([(nick, serwer)], (target_difficulty,))
+            )
             thumbnail_url = rio_data.get("thumbnail_url", "")
 
-            wcl_url = f"{WCL_BASE_URL}/{nick}/{serwer}/EU?timeframe=historical&api_key={WCL_API_KEY}"
-            wcl_response = requests.get(wcl_url)
-            wcl_response.raise_for_status()
-            logs_data = wcl_response.json()
-
-            if not logs_data:
-                await interaction.followup.send(f"❌ Brak danych logów dla postaci {nick} na serwerze {serwer}")
+            if character is None:
+                await interaction.followup.send(f"❌ Nie znaleziono postaci {formatted_nick} na serwerze {serwer}")
                 return
 
-            character_class = logs_data[0].get("class", "Nieznana klasa")
-            character_spec = logs_data[0].get("spec", "")
-            server_name = logs_data[0].get("server", serwer)
-            formatted_nick = nick.capitalize()
+            rankings = character["rankings"][target_difficulty].get("rankings") or []
+            character_class = character["class"]
+            character_spec = next((ranking["spec"] for ranking in rankings if ranking.get("spec")), "")
+            server_name = character["server"] or serwer
 
             results = []
-            for encounter in logs_data:
-                if encounter.get("difficulty") != target_difficulty:
+            for ranking in rankings:
+                if ranking.get("rankPercent") is None:
                     continue
 
-                boss_name = encounter.get("encounterName", "Nieznany boss")
-                percentile = math.floor(encounter.get("percentile", 0))
-
-                if percentile < 25:
-                    results.append(f"🔸 `{boss_name:<30}` <:gagaga:1276850810587840512> **{percentile}**")
-                elif 25 <= percentile < 50:
-                    results.append(f"🔸 `{boss_name:<30}` 🟩 **{percentile}**")
-                elif 50 <= percentile < 75:
-                    results.append(f"🔸 `{boss_name:<30}` 🟦 **{percentile}**")
-                elif 75 <= percentile < 95:
-                    results.append(f"🔸 `{boss_name:<30}` 🟪 **{percentile}**")
-                elif 95 <= percentile < 99:
-                    results.append(f"🔸 `{boss_name:<30}` 🟧 **{percentile}**")
-                elif 99 <= percentile < 100:
-                    results.append(f"🔸 `{boss_name:<30}` 🩷 **{percentile}**")
-                else:
-                    results.append(f"🔸 `{boss_name:<30}` 💛 **{percentile}**")
+                boss_name = (ranking.get("encounter") or {}).get("name", "Nieznany boss")
+                percentile = math.floor(ranking["rankPercent"])
+                results.append(f"🔸 `{boss_name:<30}` {self.percentile_badge(percentile)} **{percentile}**")
 
             if not results:
                 await interaction.followup.send(
-                    f"❌ Brak logów na difficulty {'Mythic' if tryb == 'M' else 'Heroic'} dla postaci {formatted_nick}")
+                    f"❌ Brak logów na difficulty {difficulty_name} dla postaci {formatted_nick}")
                 return
 
             embed = discord.Embed(
-                title=f"Logi 🔻 {formatted_nick} | {server_name} | {'Mythic' if tryb == 'M' else 'Heroic'}",
+                title=f"Logi 🔻 {formatted_nick} | {server_name} | {difficulty_name}",
                 description=f"{character_class} | {character_spec}\n\n" + "\n".join(results[:15]),
                 color=discord.Color.purple()
             )
@@ -441,14 +753,78 @@ class WowCommands(commands.Cog):
             embed.set_footer(text=f"{interaction.guild.name} • {self.bot.user.name}")
             await interaction.followup.send(embed=embed, view=view)
 
-        except requests.exceptions.HTTPError as e:
-            if hasattr(e, 'response') and e.response.status_code == 404:
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
                 await interaction.followup.send(f"❌ Nie znaleziono postaci {formatted_nick} na serwerze {serwer}")
+            elif e.status == 429:
+                await interaction.followup.send(RATE_LIMITED_MESSAGE)
+            else:
+                await interaction.followup.send(f"❌ Błąd podczas pobierania danych: {e}")
+        except WarcraftLogsError as e:
+            await interaction.followup.send(f"❌ Błąd Warcraft Logs: {e}")
+        except Exception as e:
+            await interaction.followup.send(f"❌ Wystąpił nieoczekiwany błąd: {e}")
+
+    async def process_multiple_logs(self, interaction: discord.Interaction, characters, serwer, target_difficulty,
+                                    difficulty_name):
+        try:
+            rankings = await self.get_wcl_rankings([(character, serwer) for character in characters],
+                                                   (target_difficulty,))
+
+            results = []
+            for character, data in zip(characters, rankings):
+                if data is None:
+                    results.append(f"❓ `{character:<12}` nie znaleziono postaci")
+                    continue
+
+                character_name = data["name"] or character
+                zone = data["rankings"][target_difficulty]
+                average = zone.get("bestPerformanceAverage")
+                if average is None:
+                    results.append(f"➖ `{character_name:<12}` brak logów")
+                    continue
+
+                percentile = math.floor(average)
+                spec = next((ranking["spec"] for ranking in zone.get("rankings") or [] if ranking.get("spec")), "")
+                results.append(
+                    f"🔸 `{character_name:<12}` {self.percentile_badge(percentile)} **{percentile}** "
+                    f"{spec} {data['class']}".rstrip())
+
+            embed = discord.Embed(
+                title=f"Logi 🔻 Multisearch | {difficulty_name}",
+                description="\n".join(results),
+                color=discord.Color.purple()
+            )
+            embed.set_footer(text=f"{interaction.guild.name} • {self.bot.user.name}")
+            await interaction.followup.send(embed=embed)
+
+        except aiohttp.ClientResponseError as e:
+            if e.status == 429:
+                await interaction.followup.send(RATE_LIMITED_MESSAGE)
             else:
                 await interaction.followup.send(f"❌ Błąd podczas pobierania danych: {e}")
+        except WarcraftLogsError as e:
+            await interaction.followup.send(f"❌ Błąd Warcraft Logs: {e}")
         except Exception as e:
             await interaction.followup.send(f"❌ Wystąpił nieoczekiwany błąd: {e}")
 
+    @staticmethod
+    def percentile_badge(percentile):
+        if percentile < 25:
+            return "<:gagaga:1276850810587840512>"
+        elif 25 <= percentile < 50:
+            return "🟩"
+        elif 50 <= percentile < 75:
+            return "🟦"
+        elif 75 <= percentile < 95:
+            return "🟪"
+        elif 95 <= percentile < 99:
+            return "🟧"
+        elif 99 <= percentile < 100:
+            return "🩷"
+        else:
+            return "💛"
+
 
 async def setup(bot):
     await bot.add_cog(WowCommands(bot))
\ No newline at end of file
@@ -1,454 +1,424 @@
+import config
 import discord
-import requests
-import math
-import urllib.parse
-from discord.ext import commands
+import time
+from typing import Optional
+from discord.ext import commands, tasks
 from discord import app_commands, Embed
-from config import WCL_API_KEY
+from utils.activity import ActivitySeries, DAY, HOUR
+from utils.backfill import HistoryBackfill
+from utils.leaderboard import GuildLeaderboard, LEADERBOARD_WINDOWS
+from utils.message_counts import COUNTS_FILE, MessageCountStore
+from utils.metrics import TASK_DURATION
+from utils.sharding import process_data_path, shard_for_guild
+from utils.sketches import GuildSketches, CMS_DEPTH, CMS_WIDTH, HEAVY_HITTERS, HLL_PRECISION
+
+YAPPING_FLUSH_SECONDS = 60
+YAPPING_TOP_SIZE = 10
+YAPPING_NEIGHBOURS = 2
+YAPPING_TOP_CHANNELS = 3
+# Tryb przybliżony: zamiast serii aktywności i rankingów okien per użytkownik - szkice o stałym rozmiarze
+YAPPING_APPROXIMATE = getattr(config, "YAPPING_APPROXIMATE", False)
+YAPPING_HLL_PRECISION = getattr(config, "YAPPING_HLL_PRECISION", HLL_PRECISION)
+YAPPING_CMS_WIDTH = getattr(config, "YAPPING_CMS_WIDTH", CMS_WIDTH)
+YAPPING_CMS_DEPTH = getattr(config, "YAPPING_CMS_DEPTH", CMS_DEPTH)
+YAPPING_HEAVY_HITTERS = getattr(config, "YAPPING_HEAVY_HITTERS", HEAVY_HITTERS)
+ACTIVITY_LEVELS = [
+    (0, "🔇 Cisza w eterze"),
+    (1000, "💬 Pogaduszki"),
+    (10000, "🗣️ Gadatliwy serwer"),
+    (100000, "📢 Jazgot"),
+    (1000000, "🌋 Erupcja yappingu"),
+]
+ACTIVITY_WINDOWS = [("1h", HOUR), ("24h", DAY), ("7d", 7 * DAY)]
+if YAPPING_APPROXIMATE:
+    LEADERBOARD_SCOPES = {"all": "cały czas", "day": "dziś", "week": "ten tydzień"}
+else:
+    LEADERBOARD_SCOPES = {"all": "cały czas", "24h": "24h", "7d": "7 dni"}
+# Wersja danych w bazie; inna wartość wymusza przeliczenie całej historii (np. po dodaniu serii aktywności)
+YAPPING_DATA_VERSION = 2
+# Tryb i parametry szkiców zapisywane w meta; szkice z innymi parametrami są odrzucane, więc ich zmiana też wymusza przeliczenie
+YAPPING_MODE = {"approximate": int(YAPPING_APPROXIMATE)}
+if YAPPING_APPROXIMATE:
+    YAPPING_MODE.update(
+        hll_precision=YAPPING_HLL_PRECISION, cms_width=YAPPING_CMS_WIDTH, cms_depth=YAPPING_CMS_DEPTH)
+
+
+class YappingCommands(commands.Cog):
+    """Liczniki wiadomości użytkowników.
+
+    increment_message_count() zmienia tylko słowniki w pamięci i oznacza licznik jako zmieniony.
+    Zmienione liczniki są zapisywane do SQLite paczką co YAPPING_FLUSH_SECONDS i przy wyładowaniu coga,
+    a komendy czytają wyłącznie z pamięci. Razem z licznikami zapisywany jest ID wiadomości "live_until",
+    do którego liczniki na żywo są już trwałe - od niego zaczyna się przeliczanie historii po restarcie.
+    Każda nowa sesja gateway (nie RESUME) dodaje lukę od ostatniej wiadomości policzonej na żywo do początku
+    sesji; w trybie shardów sesje, live_until i luki są osobne dla każdego sharda.
+    Obok liczników każdy serwer i użytkownik ma ActivitySeries z wiadomościami w czasie, a każdy serwer
+    GuildLeaderboard - rankingi aktualizowane przy każdej wiadomości zamiast sortowania przy komendzie.
+    W trybie przybliżonym (YAPPING_APPROXIMATE) serie i rankingi okien per użytkownik zastępuje GuildSketches
+    dla bieżącego dnia i tygodnia, więc pamięć nie rośnie z liczbą użytkowników."""
 
-
-class WowCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-
-    @app_commands.command(name="ce", description="Pokazuje ilość CE postaci")
-    @app_commands.describe(
-        nick="Nazwa postaci",
-        serwer="Serwer postaci (domyślnie burning-legion)"
-    )
-    async def ce(self, interaction: discord.Interaction, nick: str, serwer: str = "burning-legion"):
-        await interaction.response.defer()
-
-        try:
-            with open('data/raids.txt', 'r') as f:
-                raids_line = f.readline().strip()
-                raids_list = raids_line.split(':')[1:]
-
-            if not raids_list:
-                await interaction.followup.send("❌ Brak danych o raidach w pliku raids.txt")
-                return
-
-            fields_value = "raid_achievement_curve:" + ":".join(raids_list)
-
-            url = "https://raider.io/api/v1/characters/profile"
-            params = {
-                "region": "eu",
-                "realm": serwer.lower(),
-                "name": nick,
-                "fields": fields_value + ",thumbnail_url"
-            }
-
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            character_name = data.get("name", nick)
-            realm = data.get("realm", serwer)
-            thumbnail_url = data.get("thumbnail_url", "")
-            achievements = data.get("raid_achievement_curve", [])
-
-            ce_list = []
-
-            for raid in achievements:
-                if raid.get("cutting_edge"):
-                    raid_name = raid["raid"].replace("-", " ").title()
-                    ce_date = raid["cutting_edge"].split("T")[0]
-                    ce_list.append(f"🔹 `{raid_name:<25}` {ce_date}")
-
-            embed = discord.Embed(
-                title=f"Cutting Edge 🔻 {character_name} | {realm}",
-                color=discord.Color.dark_gold()
-            )
-
-            if len(ce_list) == 0:
-                embed.description = f"{character_name} nie ma żadnego achievementu Cutting Edge 😢"
-            else:
-                embed.description = f"**Łącznie Cutting Edge:** {len(ce_list)}\n\n" + "\n".join(ce_list)
-
-            if thumbnail_url:
-                embed.set_thumbnail(url=thumbnail_url)
-
-            view = discord.ui.View()
-            encoded_name = urllib.parse.quote(character_name)
-            encoded_realm = urllib.parse.quote(realm)
-            raiderio_url = f"https://raider.io/characters/eu/{encoded_realm}/{encoded_name}"
-            view.add_item(
-                discord.ui.Button(
-                    label="Raider.io",
-                    url=raiderio_url,
-                    style=discord.ButtonStyle.link,
-                    emoji="📈"
-                )
-            )
-
-            embed.set_footer(text=f"{interaction.guild.name} • {self.bot.user.name}")
-            await interaction.followup.send(embed=embed, view=view)
-
-        except FileNotFoundError:
-            await interaction.followup.send("❌ Brak pliku raids.txt z listą raidów")
-        except requests.exceptions.HTTPError as e:
-            if hasattr(e, 'response') and e.response.status_code == 404:
-                await interaction.followup.send(f"❌ Nie znaleziono postaci {nick} na serwerze {serwer}")
-            else:
-                await interaction.followup.send(f"❌ Błąd podczas pobierania danych z Raider.io. Sprawdź poprawność nicku i serwera.")
-        except Exception as e:
-            await interaction.followup.send(f"❌ Wystąpił nieoczekiwany błąd: {e}")
-
-    @app_commands.command(name="solemnity", description="Wyświetla informacje o gildii Solemnity.")
-    @app_commands.describe(raid_index="Indeks raidu")
-    async def solemnity(self, interaction: discord.Interaction, raid_index: int = 1):
-        await interaction.response.defer()
-
-        url_guild = "https://raider.io/api/v1/guilds/profile"
-        params_guild = {
-            "region": "eu",
-            "realm": "burning-legion",
-            "name": "Solemnity",
-            "fields": "raid_progression,raid_rankings"
+        self.counts = {}
+        self.totals = {}
+        self.guild_activity = {}
+        self.user_activity = {}
+        self.leaderboards = {}
+        self.sketches = {}
+        # Procesy z różnymi SHARD_IDS mają osobne bazy: luki, live_until i liczniki dotyczą tylko ich serwerów
+        self.store = MessageCountStore(process_data_path(bot, COUNTS_FILE))
+        self.backfill = HistoryBackfill(bot, self.count_historical_message)
+        # Klucz sesji to numer sharda albo None bez shardów; ID wiadomości jako snowflake
+        self.live_since = {}
+        self.last_live = {}
+        self.connected = set()
+        self.stored_live_until = {}
+        self._dirty = set()
+
+    async def cog_load(self):
+        await self.store.open()
+        meta = await self.store.load_meta()
+        if (meta.get("version") != YAPPING_DATA_VERSION
+                or any((meta.get(key) or 0) != value for key, value in YAPPING_MODE.items())):
+            # Zmiana trybu lub parametrów szkiców też wymaga przeliczenia, bo każdy tryb przechowuje inne dane o czasie
+            # Pierwsze przeliczanie obejmuje całą historię, więc wcześniejsze liczniki zostałyby policzone podwójnie
+            await self.store.reset_counts()
+        else:
+            self.stored_live_until = {
+                self._session_of(key): value for key, value in meta.items() if key.startswith("live_until")}
+            for guild_id, user_id, count in await self.store.load_counts():
+                self.counts.setdefault(guild_id, {})[user_id] = count
+                self.totals[guild_id] = self.totals.get(guild_id, 0) + count
+            for guild_id, user_id, series in await self.store.load_series():
+                if user_id:
+                    self.user_activity.setdefault(guild_id, {})[user_id] = series
+                else:
+                    self.guild_activity[guild_id] = series
+            for guild_id, channel_id, kind, period, data in await self.store.load_sketches():
+                self.guild_sketches(guild_id).load(channel_id, kind, period, data)
+            self.backfill.load(await self.store.load_gaps())
+            now = time.time()
+            for guild_id, guild_counts in self.counts.items():
+                self.leaderboard(guild_id).load(guild_counts, self.user_activity.get(guild_id, {}), now)
+        # Luka do początku pierwszej sesji powstaje dopiero przy połączeniu z gateway (on_connect)
+        self.flusher.start()
+
+    async def cog_unload(self):
+        self.flusher.cancel()
+        await self.backfill.stop()
+        await self.flush()
+        await self.store.close()
+
+    @staticmethod
+    def _meta_key(session):
+        return "live_until" if session is None else f"live_until_{session}"
+
+    @staticmethod
+    def _session_of(meta_key):
+        suffix = meta_key[len("live_until_"):]
+        return int(suffix) if suffix else None
+
+    @property
+    def sharded(self):
+        return isinstance(self.bot, discord.AutoShardedClient)
+
+    def start_session(self, session):
+        """Nowa sesja gateway: wiadomości od ostatniej policzonej na żywo (albo od live_until z bazy) do teraz
+        nie dotarły przez gateway, więc trafiają do luki przeliczania historii"""
+        now = discord.utils.time_snowflake(discord.utils.utcnow())
+        if session in self.live_since:
+            since = self.last_live[session]
+        else:
+            # Baza sprzed włączenia shardów ma tylko wspólne live_until
+            since = self.stored_live_until.get(session, self.stored_live_until.get(None, 0))
+        if session is None:
+            self.backfill.add_pending(since, now)
+        else:
+            for guild in self.bot.guilds:
+                if guild.shard_id == session:
+                    self.backfill.add_pending(since, now, guild.id)
+        self.live_since[session] = self.last_live[session] = now
+        self.connected.add(session)
+
+    @commands.Cog.listener()
+    async def on_connect(self):
+        if not self.sharded:
+            self.start_session(None)
+
+    @commands.Cog.listener()
+    async def on_shard_connect(self, shard_id):
+        self.start_session(shard_id)
+
+    @commands.Cog.listener()
+    async def on_disconnect(self):
+        if not self.sharded:
+            self.connected.discard(None)
+
+    @commands.Cog.listener()
+    async def on_shard_disconnect(self, shard_id):
+        self.connected.discard(shard_id)
+
+    @commands.Cog.listener()
+    async def on_resumed(self):
+        # RESUME odtwarza zdarzenia z czasu rozłączenia, więc nie ma luki
+        if not self.sharded:
+            self.connected.add(None)
+
+    @commands.Cog.listener()
+    async def on_shard_resumed(self, shard_id):
+        self.connected.add(shard_id)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if self.live_since:
+            self.backfill.start()
+
+    @commands.Cog.listener()
+    async def on_shard_ready(self, shard_id):
+        if self.live_since:
+            self.backfill.start()
+
+    async def increment_message_count(self, guild_id, user_id, created_at=None, channel_id=None):
+        created_at = created_at or discord.utils.utcnow()
+        session = shard_for_guild(guild_id, self.bot.shard_count) if self.sharded else None
+        if session in self.last_live:
+            self.last_live[session] = max(self.last_live[session], discord.utils.time_snowflake(created_at, high=True))
+        self._increment(guild_id, user_id, created_at.timestamp(), channel_id)
+
+    def count_historical_message(self, message):
+        self._increment(message.guild.id, message.author.id, message.created_at.timestamp(), message.channel.id)
+
+    def _increment(self, guild_id, user_id, timestamp, channel_id):
+        guild_counts = self.counts.get(guild_id)
+        if guild_counts is None:
+            guild_counts = self.counts[guild_id] = {}
+        guild_counts[user_id] = guild_counts.get(user_id, 0) + 1
+        self.totals[guild_id] = self.totals.get(guild_id, 0) + 1
+        self._dirty.add((guild_id, user_id))
+
+        guild_series = self.guild_activity.get(guild_id)
+        if guild_series is None:
+            guild_series = self.guild_activity[guild_id] = ActivitySeries()
+        guild_series.add(timestamp)
+        now = time.time()
+        if YAPPING_APPROXIMATE:
+            if channel_id:
+                self.guild_sketches(guild_id).add(channel_id, user_id, timestamp, now)
+        else:
+            user_series = self.user_activity.setdefault(guild_id, {}).get(user_id)
+            if user_series is None:
+                user_series = self.user_activity[guild_id][user_id] = ActivitySeries()
+            user_series.add(timestamp)
+        self.leaderboard(guild_id).add_message(user_id, timestamp, now)
+
+    def leaderboard(self, guild_id):
+        leaderboard = self.leaderboards.get(guild_id)
+        if leaderboard is None:
+            leaderboard = self.leaderboards[guild_id] = GuildLeaderboard({} if YAPPING_APPROXIMATE else LEADERBOARD_WINDOWS)
+        return leaderboard
+
+    def guild_sketches(self, guild_id):
+        sketches = self.sketches.get(guild_id)
+        if sketches is None:
+            sketches = self.sketches[guild_id] = GuildSketches(
+                YAPPING_HLL_PRECISION, YAPPING_CMS_WIDTH, YAPPING_CMS_DEPTH, YAPPING_HEAVY_HITTERS)
+        return sketches
+
+    async def initialize_message_counts(self):
+        """Raportuje wczytane liczniki; przeliczanie historii uruchamia w tle on_ready cogu i nie blokuje READY"""
+        users = sum(len(guild_counts) for guild_counts in self.counts.values())
+        print(f"✅ Liczniki wiadomości: {users} użytkowników na {len(self.counts)} serwerach.")
+
+    async def flush(self):
+        # Migawka liczników, luk i live_until w jednej chwili, zapisana jedną transakcją
+        dirty, self._dirty = self._dirty, set()
+        rows = [(guild_id, user_id, self.counts[guild_id][user_id]) for guild_id, user_id in dirty]
+        series = [(guild_id, 0, self.guild_activity[guild_id].snapshot()) for guild_id in {g for g, _ in dirty}]
+        if not YAPPING_APPROXIMATE:
+            series.extend(
+                (guild_id, user_id, self.user_activity[guild_id][user_id].snapshot()) for guild_id, user_id in dirty)
+        sketches = [(guild_id, *row) for guild_id, guild_sketches in self.sketches.items() for row in guild_sketches.rows()]
+        gaps = self.backfill.rows() if self.backfill.dirty else None
+        now = discord.utils.time_snowflake(discord.utils.utcnow())
+        meta = {
+            "version": YAPPING_DATA_VERSION,
+            **YAPPING_MODE
         }
-
+        # Rozłączona sesja jest trwała tylko do ostatniej wiadomości policzonej na żywo; sesje,
+        # które jeszcze się nie połączyły, zostawiają live_until z bazy
+        for session in self.live_since:
+            meta[self._meta_key(session)] = now if session in self.connected else self.last_live[session]
         try:
-            response_guild = requests.get(url_guild, params=params_guild)
-            response_guild.raise_for_status()
-            data_guild = response_guild.json()
-
-            guild_name = data_guild.get("name", "Solemnity")
-            raid_progression = data_guild.get("raid_progression", {})
-            raid_rankings = data_guild.get("raid_rankings", {})
-
-            raid_list = list(raid_progression.keys())
-            if not raid_list:
-                await interaction.followup.send("❌ Brak danych o raidach.")
-                return
-
-            if raid_index < 0 or raid_index >= len(raid_list):
-                await interaction.followup.send(
-                    f"❌ Nieprawidłowy indeks raidu. Dostępne raidy: 0-{len(raid_list) - 1}.")
-                return
-
-            current_raid = raid_list[raid_index]
-            current_raid_data = raid_progression.get(current_raid, {})
-            raid_summary = current_raid_data.get("summary", "Brak danych")
-
-            if current_raid in raid_rankings:
-                mythic_rankings = raid_rankings[current_raid].get("mythic", {})
-                world_rank = mythic_rankings.get("world", "Brak danych")
-                region_rank = mythic_rankings.get("region", "Brak danych")
-                realm_rank = mythic_rankings.get("realm", "Brak danych")
-            else:
-                world_rank = region_rank = realm_rank = "Brak danych"
-
-            url_pulls = "https://raider.io/api/v1/raiding/raid-rankings"
-            params_pulls = {
-                "raid": current_raid,
-                "difficulty": "mythic",
-                "region": "eu",
-                "realm": "burning-legion",
-                "guilds": "2011892",
-                "limit": 1,
-                "page": 0
-            }
-
-            response_pulls = requests.get(url_pulls, params=params_pulls)
-            response_pulls.raise_for_status()
-            data_pulls = response_pulls.json()
-
-            boss_list = []
-            if "raidRankings" in data_pulls and data_pulls["raidRankings"]:
-                ranking_data = data_pulls["raidRankings"][0]
-                encounters_pulled = ranking_data.get("encountersPulled", [])
-                for boss in encounters_pulled:
-                    boss_name = boss.get("slug", "Unknown Boss").replace("-", " ").title()
-                    num_pulls = boss.get("numPulls", "Brak danych")
-                    is_defeated = boss.get("isDefeated", False)
-                    best_percent = boss.get("bestPercent", 0)
-
-                    if is_defeated:
-                        boss_list.append(f"🔹 `{boss_name:<30}` {num_pulls} pulli")
-                    else:
-                        boss_list.append(f"❌ `{boss_name:<30}` {num_pulls} pulli (Najlepsza pullka: {best_percent}%)")
-
-            if not boss_list:
-                boss_list_message = "❌ Nie pulnięto żadnego bossa na Mythicu"
-            else:
-                boss_list_message = "\n".join(boss_list)
-
-            embed = Embed(
-                title=f"Informacje o {guild_name} 🔥",
-                description=f"**Raid:** {current_raid}\n"
-                            f"**Progress:** {raid_summary}\n\n"
-                            f"**Rankingi:**\n"
-                            f"🌍 Świat: {world_rank}\n"
-                            f"🗺️ Region: {region_rank}\n"
-                            f"🏞️ Realm: {realm_rank}\n\n"
-                            f"**Pull count:**\n{boss_list_message}",
-                color=discord.Color.gold()
-            )
-
-            file = discord.File("data/solemnity.png", filename="solemnity.png")
-            embed.set_thumbnail(url="attachment://solemnity.png")
-
-            view = discord.ui.View()
-            raiderio_url = f"https://raider.io/guilds/eu/burning-legion/Solemnity"
-            view.add_item(
-                discord.ui.Button(
-                    label="Raider.io",
-                    url=raiderio_url,
-                    style=discord.ButtonStyle,
-                    emoji="🌐"
-                )
-            )
-
-            embed.set_footer(text=f"{interaction.guild.name} • {self.bot.user.name}")
-            await interaction.followup.send(embed=embed, file=file, view=view)
-
-        except requests.exceptions.RequestException as e:
-            await interaction.followup.send(f"❌ Błąd podczas pobierania danych z Raider.io: {e}")
+            await self.store.save(rows, gaps, meta, series, sketches)
         except Exception as e:
-            await interaction.followup.send(f"❌ Wystąpił nieoczekiwany błąd: {e}")
-
-    @app_commands.command(name="weekly", description="Pokazuje ile dungeonów Mythic+ postać zagrała w tym tygodniu.")
-    @app_commands.describe(
-        nick="Nazwy postaci (oddzielone spacjami)",
-        realm="Serwer postaci (domyślnie burning-legion)"
-    )
-    async def weekly(self, interaction: discord.Interaction, nick: str, realm: str = "burning-legion"):
-        await interaction.response.defer()
-        characters = nick.split()
-
-        if len(characters) == 1:
-            await self.process_single_character(interaction, characters[0], realm)
-            return
-
-        try:
-            results = []
-            thumbnails = []
-
-            for character in characters:
-                url = "https://raider.io/api/v1/characters/profile"
-                params = {
-                    "region": "eu",
-                    "realm": realm.lower(),
-                    "name": character,
-                    "fields": "mythic_plus_weekly_highest_level_runs,name,thumbnail_url"
-                }
-
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                character_name = data.get("name", character)
-                weekly_runs = data.get("mythic_plus_weekly_highest_level_runs", [])
-                num_runs = len(weekly_runs)
-                thumbnail_url = data.get("thumbnail_url", "")
-
-                if num_runs == 0:
-                    results.append(f"💀 `{character_name:<10}` **0** dungów")
-                elif num_runs == 1:
-                    results.append(f"😂 `{character_name:<10}` **1** dung")
-                elif 2 <= num_runs <= 4:
-                    results.append(f"😐 `{character_name:<10}` **{num_runs}** dungi")
-                elif 5 <= num_runs <= 7:
-                    results.append(f"🤨 `{character_name:<10}` **{num_runs}** dungów")
-                else:
-                    results.append(f"😎 `{character_name:<10}` **{num_runs}** dungów")
-
-                if thumbnail_url and not thumbnails:
-                    thumbnails.append(thumbnail_url)
-
-            embed = Embed(
-                title=f"Weekly 🔻 Multisearch",
-                description="\n".join(results),
-                color=discord.Color.purple()
+            # Niezapisane liczniki wracają do kolejki i trafią do następnego zapisu
+            self._dirty |= dirty
+            for guild_id, channel_id, kind, *_ in sketches:
+                self.sketches[guild_id].dirty.add((channel_id, kind))
+            if gaps is not None:
+                self.backfill.dirty = True
+            print(f"❌ Błąd zapisu liczników wiadomości: {e}")
+
+    @tasks.loop(seconds=YAPPING_FLUSH_SECONDS)
+    async def flusher(self):
+        with TASK_DURATION.time(task="yapping_flush"):
+            await self.flush()
+
+    @staticmethod
+    def activity_level(total):
+        return next(label for threshold, label in reversed(ACTIVITY_LEVELS) if total >= threshold)
+
+    @staticmethod
+    def activity_summary(series):
+        """Wiadomości w oknach ACTIVITY_WINDOWS i najaktywniejsza godzina z ostatniego miesiąca"""
+        if series is None:
+            return "Brak wiadomości"
+        now = time.time()
+        lines = [" • ".join(f"{label}: **{series.last(seconds, now)}**" for label, seconds in ACTIVITY_WINDOWS)]
+        peak = series.peak_hour(now)
+        if peak:
+            hour, count = peak
+            # Znacznik czasu Discorda pokazuje godzinę w strefie czasowej czytającego
+            start = int(now) // DAY * DAY + hour * HOUR
+            lines.append(f"Najaktywniejsza godzina: <t:{start}:t>-<t:{start + HOUR}:t> ({count} w ostatnim miesiącu)")
+        return "\n".join(lines)
+
+    @staticmethod
+    def sketch_bounds(sketch):
+        """Gwarancja błędu CountMinSketch dla bieżącej liczby wiadomości"""
+        return (f"≈ zawyżone najwyżej o {sketch.epsilon * sketch.total:.0f} z prawdopodobieństwem "
+                f"{1 - sketch.delta:.1%} (ε = e/{sketch.width}, δ = e^-{sketch.depth})")
+
+    def approximate_top(self, guild_id, scope, now):
+        """Lista (miejsce, user_id, oszacowanie) z heavy hitters szkicu okresu scope i opis błędu"""
+        sketch = self.guild_sketches(guild_id).users(scope, now)
+        if sketch is None:
+            return [], None
+        top = [(place, user_id, estimate) for place, (user_id, estimate) in enumerate(sketch.top(YAPPING_TOP_SIZE), 1)]
+        return top, self.sketch_bounds(sketch)
+
+    def distinct_summary(self, guild_id, now):
+        """Przybliżona liczba różnych piszących dziś i w tym tygodniu oraz najbardziej zatłoczone kanały"""
+        sketches = self.guild_sketches(guild_id)
+        lines = []
+        for kind, label in (("day", "Dziś"), ("week", "Ten tydzień")):
+            distinct, channels = sketches.distinct(kind, now)
+            line = f"{label}: **≈{distinct}**"
+            if channels:
+                line += " (" + ", ".join(f"<#{channel_id}> ≈{count}" for channel_id, count in channels[:YAPPING_TOP_CHANNELS]) + ")"
+            lines.append(line)
+        error = 1.04 / (1 << YAPPING_HLL_PRECISION) ** 0.5
+        lines.append(f"-# Błąd standardowy ±{error:.1%} (1.04/√{1 << YAPPING_HLL_PRECISION})")
+        return "\n".join(lines)
+
+    @app_commands.command(name="yapping", description="Pokazuje poziom aktywności serwera")
+    @app_commands.describe(okres="Okres rankingu (domyślnie cały czas)")
+    @app_commands.choices(okres=[
+        app_commands.Choice(name=label, value=scope) for scope, label in LEADERBOARD_SCOPES.items()
+    ])
+    async def yapping(self, interaction: discord.Interaction, okres: Optional[app_commands.Choice[str]] = None):
+        scope = okres.value if okres else "all"
+        guild_counts = self.counts.get(interaction.guild_id, {})
+        total = self.totals.get(interaction.guild_id, 0)
+
+        embed = Embed(
+            title=f"🗣️ Yapping na {interaction.guild.name}",
+            description=f"**{self.activity_level(total)}**\nWiadomości: **{total}**, aktywni: **{len(guild_counts)}**",
+            color=discord.Color.purple()
+        )
+
+        embed.add_field(
+            name="📈 Aktywność",
+            value=self.activity_summary(self.guild_activity.get(interaction.guild_id)),
+            inline=False
+        )
+
+        now = time.time()
+        leaderboard = self.leaderboard(interaction.guild_id)
+        if YAPPING_APPROXIMATE:
+            embed.add_field(
+                name="👥 Aktywni piszący",
+                value=self.distinct_summary(interaction.guild_id, now),
+                inline=False
             )
 
-            if thumbnails:
-                embed.set_thumbnail(url=thumbnails[0])
-
-            embed.set_footer(text=f"{interaction.guild.name} • {self.bot.user.name}")
-            await interaction.followup.send(embed=embed)
-
-        except requests.exceptions.HTTPError as e:
-            if hasattr(e, 'response') and e.response.status_code == 404:
-                await interaction.followup.send(f"❌ Nie znaleziono jednej z postaci na serwerze {realm}.")
-            else:
-                await interaction.followup.send(f"❌ Błąd podczas pobierania danych z Raider.io: {e}")
-        except Exception as e:
-            await interaction.followup.send(f"❌ Wystąpił nieoczekiwany błąd: {e}")
-
-    async def process_single_character(self, interaction: discord.Interaction, nick: str, realm: str):
-        url = "https://raider.io/api/v1/characters/profile"
-        params = {
-            "region": "eu",
-            "realm": realm.lower(),
-            "name": nick,
-            "fields": "mythic_plus_weekly_highest_level_runs"
-        }
-
-        try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            nick = data.get("name", nick)
-            realm = data.get("realm", realm)
-            weekly_runs = data.get("mythic_plus_weekly_highest_level_runs", [])
-            num_runs = len(weekly_runs)
-            thumbnail_url = data.get("thumbnail_url", "")
-
-            if num_runs == 0:
-                message = f"{nick} nie zagrał **żadnego** dunga w tym tygodniu 💀"
-            elif num_runs == 1:
-                message = f"{nick} zagrał **{num_runs}** dunga w tym tygodniu 😂"
-            elif 2 <= num_runs <= 4:
-                message = f"{nick} zagrał **{num_runs}** dungi w tym tygodniu 😐"
-            elif 5 <= num_runs <= 7:
-                message = f"{nick} zagrał **{num_runs}** dungów w tym tygodniu 🤨"
-            else:
-                message = f"{nick} zagrał **{num_runs}** dungów w tym tygodniu 😎👍"
-
-            embed = Embed(
-                title=f"Weekly 🔻 {nick} | {realm}",
-                description=message,
-                color=discord.Color.purple()
+        if scope in leaderboard.scopes:
+            top, bounds = leaderboard.scope(scope, now).top(YAPPING_TOP_SIZE), None
+        else:
+            top, bounds = self.approximate_top(interaction.guild_id, scope, now)
+        if top:
+            approximate = "≈" if bounds else ""
+            embed.add_field(
+                name=f"🏆 Top {len(top)} ({LEADERBOARD_SCOPES[scope]})",
+                value="\n".join(f"{place}. <@{user_id}> - {approximate}{count}" for place, user_id, count in top)
+                      + (f"\n-# {bounds}" if bounds else ""),
+                inline=False
             )
-
-            if thumbnail_url:
-                embed.set_thumbnail(url=thumbnail_url)
-
-            view = discord.ui.View()
-            encoded_name = urllib.parse.quote(nick)
-            encoded_realm = urllib.parse.quote(realm)
-            view.add_item(
-                discord.ui.Button(
-                    label="Raider.io",
-                    url=f"https://raider.io/characters/eu/{encoded_realm}/{encoded_name}",
-                    style=discord.ButtonStyle.link,
-                    emoji="📈"
-                )
+        progress = self.backfill.progress()
+        if progress["running"]:
+            embed.set_footer(
+                text=f"⏳ Przeliczanie historii: {progress['channels_done']}/{progress['channels_total']} kanałów, "
+                     f"{progress['messages']} wiadomości - wyniki mogą jeszcze rosnąć"
             )
-
-            embed.set_footer(text=f"{interaction.guild.name} • {self.bot.user.name}")
-            await interaction.followup.send(embed=embed, view=view)
-
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 404:
-                await interaction.followup.send(f"❌ Nie znaleziono postaci {nick} na serwerze {realm}.")
+        if interaction.guild.icon:
+            embed.set_thumbnail(url=interaction.guild.icon.url)
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="yapping_user", description="Pokazuje liczbę wiadomości użytkownika")
+    @app_commands.describe(user="Użytkownik do sprawdzenia (domyślnie Ty)")
+    async def yapping_user(self, interaction: discord.Interaction, user: Optional[discord.Member] = None):
+        user = user or interaction.user
+        count = self.counts.get(interaction.guild_id, {}).get(user.id, 0)
+        total = self.totals.get(interaction.guild_id, 0)
+        share = count / total * 100 if total else 0.0
+
+        embed = Embed(
+            title=f"🗣️ Yapping: {user.display_name}",
+            description=f"Wiadomości: **{count}** ({share:.1f}% serwera)",
+            color=discord.Color.purple()
+        )
+        leaderboard = self.leaderboard(interaction.guild_id)
+        now = time.time()
+        if YAPPING_APPROXIMATE:
+            sketches = self.guild_sketches(interaction.guild_id)
+            lines, bounds = [], None
+            for kind in ("day", "week"):
+                sketch = sketches.users(kind, now)
+                lines.append(f"{LEADERBOARD_SCOPES[kind].capitalize()}: **≈{sketch.estimate(user.id) if sketch else 0}**")
+                if sketch:
+                    # Szkic tygodnia ma największą sumę, więc jego granica błędu obejmuje też dzień
+                    bounds = self.sketch_bounds(sketch)
+            activity = " • ".join(lines) + (f"\n-# {bounds}" if bounds else "")
+        else:
+            activity = self.activity_summary(self.user_activity.get(interaction.guild_id, {}).get(user.id))
+        embed.add_field(name="📈 Aktywność", value=activity, inline=False)
+
+        ranks = []
+        for scope, label in LEADERBOARD_SCOPES.items():
+            if scope in leaderboard.scopes:
+                index = leaderboard.scope(scope, now)
+                rank = index.rank(user.id)
+                ranks.append(f"{label}: **#{rank}** z {len(index)}" if rank else f"{label}: -")
             else:
-                await interaction.followup.send(f"❌ Błąd podczas pobierania danych z Raider.io: {e}")
-        except Exception as e:
-            await interaction.followup.send(f"❌ Wystąpił nieoczekiwany błąd: {e}")
-
-    @app_commands.command(name="logs", description="Pokazuje statystyki postaci z Warcraft Logs")
-    @app_commands.describe(
-        nick="Nazwa postaci",
-        serwer="Serwer postaci (domyślnie burning-legion)",
-        tryb="Tryb raidu: M (Mythic) lub HC (Heroic) (domyślnie M)"
-    )
-    async def logs(self, interaction: discord.Interaction, nick: str, serwer: str = "burning-legion", tryb: str = "M"):
-        await interaction.response.defer()
-
-        WCL_BASE_URL = "https://www.warcraftlogs.com/v1/rankings/character"
-        RIO_BASE_URL = "https://raider.io/api/v1/characters/profile"
-
-        difficulty_map = {
-            "M": 5,
-            "HC": 4
-        }
-
-        tryb = tryb.upper()
-        if tryb not in difficulty_map:
-            await interaction.followup.send("❌ Nieprawidłowy tryb. Dostępne opcje: M (Mythic) lub HC (Heroic)")
-            return
-
-        target_difficulty = difficulty_map[tryb]
-
-        try:
-            rio_params = {
-                "region": "eu",
-                "realm": serwer.lower(),
-                "name": nick,
-                "fields": "thumbnail_url"
-            }
-            rio_response = requests.get(RIO_BASE_URL, params=rio_params)
-            rio_response.raise_for_status()
-            rio_data = rio_response.json()
-            thumbnail_url = rio_data.get("thumbnail_url", "")
-
-            wcl_url = f"{WCL_BASE_URL}/{nick}/{serwer}/EU?timeframe=historical&api_key={WCL_API_KEY}"
-            wcl_response = requests.get(wcl_url)
-            wcl_response.raise_for_status()
-            logs_data = wcl_response.json()
-
-            if not logs_data:
-                await interaction.followup.send(f"❌ Brak danych logów dla postaci {nick} na serwerze {serwer}")
-                return
-
-            character_class = logs_data[0].get("class", "Nieznana klasa")
-            character_spec = logs_data[0].get("spec", "")
-            server_name = logs_data[0].get("server", serwer)
-            formatted_nick = nick.capitalize()
-
-            results = []
-            for encounter in logs_data:
-                if encounter.get("difficulty") != target_difficulty:
-                    continue
-
-                boss_name = encounter.get("encounterName", "Nieznany boss")
-                percentile = math.floor(encounter.get("percentile", 0))
-
-                if percentile < 25:
-                    results.append(f"🔸 `{boss_name:<30}` <:gagaga:1276850810587840512> **{percentile}**")
-                elif 25 <= percentile < 50:
-                    results.append(f"🔸 `{boss_name:<30}` 🟩 **{percentile}**")
-                elif 50 <= percentile < 75:
-                    results.append(f"🔸 `{boss_name:<30}` 🟦 **{percentile}**")
-                elif 75 <= percentile < 95:
-                    results.append(f"🔸 `{boss_name:<30}` 🟪 **{percentile}**")
-                elif 95 <= percentile < 99:
-                    results.append(f"🔸 `{boss_name:<30}` 🟧 **{percentile}**")
-                elif 99 <= percentile < 100:
-                    results.append(f"🔸 `{boss_name:<30}` 🩷 **{percentile}**")
-                else:
-                    results.append(f"🔸 `{boss_name:<30}` 💛 **{percentile}**")
-
-            if not results:
-                await interaction.followup.send(
-                    f"❌ Brak logów na difficulty {'Mythic' if tryb == 'M' else 'Heroic'} dla postaci {formatted_nick}")
-                return
-
-            embed = discord.Embed(
-                title=f"Logi 🔻 {formatted_nick} | {server_name} | {'Mythic' if tryb == 'M' else 'Heroic'}",
-                description=f"{character_class} | {character_spec}\n\n" + "\n".join(results[:15]),
-                color=discord.Color.purple()
+                # Tryb przybliżony: miejsce znane tylko wśród śledzonych heavy hitters
+                top, _ = self.approximate_top(interaction.guild_id, scope, now)
+                place = next((place for place, user_id, _ in top if user_id == user.id), None)
+                ranks.append(f"{label}: **≈#{place}**" if place else f"{label}: poza top {YAPPING_TOP_SIZE}")
+        embed.add_field(name="🏆 Miejsce w rankingu", value="\n".join(ranks), inline=False)
+
+        neighbours = leaderboard.scope("all", now).around(user.id, YAPPING_NEIGHBOURS)
+        if len(neighbours) > 1:
+            embed.add_field(
+                name="👥 Sąsiedzi w rankingu",
+                value="\n".join(
+                    f"{'**' if other == user.id else ''}{place}. <@{other}> - {count}{'**' if other == user.id else ''}"
+                    for place, other, count in neighbours
+                ),
+                inline=False
             )
-
-            if thumbnail_url:
-                embed.set_thumbnail(url=thumbnail_url)
-
-            view = discord.ui.View()
-            encoded_name = urllib.parse.quote(nick)
-            encoded_realm = urllib.parse.quote(serwer)
-            view.add_item(
-                discord.ui.Button(
-                    label="Warcraft Logs",
-                    url=f"https://www.warcraftlogs.com/character/eu/{encoded_realm}/{encoded_name}",
-                    style=discord.ButtonStyle.link,
-                    emoji="🔗"
-                )
-            )
-
-            embed.set_footer(text=f"{interaction.guild.name} • {self.bot.user.name}")
-            await interaction.followup.send(embed=embed, view=view)
-
-        except requests.exceptions.HTTPError as e:
-            if hasattr(e, 'response') and e.response.status_code == 404:
-                await interaction.followup.send(f"❌ Nie znaleziono postaci {formatted_nick} na serwerze {serwer}")
-            else:
-                await interaction.followup.send(f"❌ Błąd podczas pobierania danych: {e}")
-        except Exception as e:
-            await interaction.followup.send(f"❌ Wystąpił nieoczekiwany błąd: {e}")
+        embed.set_thumbnail(url=user.display_avatar.url)
+        await interaction.response.send_message(embed=embed)
 
 
 async def setup(bot):
-    await bot.add_cog(WowCommands(bot))
\ No newline at end of file
+    await bot.add_cog(YappingCommands(bot))
@@ -1,15 +1,62 @@
+import time
+
+# Początek pomiaru zimnego startu - przed importem discord.py i reszty zależności
+PROCESS_STARTED = time.perf_counter()
+
+import config
 import discord
-import requests
+import hashlib
+import json
+import os
 import random
 from discord.ext import commands
-from cogs.wow import WowCommands
-from cogs.fun import FunCommands
-from cogs.moderation import ModerationCommands
-from cogs.yapping import YappingCommands
-from cogs.professions import ProfesjeSystem
-from cogs.absence import NieobecnosciSystem
+from utils.dispatcher import MessageDispatcher
+from utils.extensions import ExtensionLoader
+from utils.guild_config import GuildConfigStore
+from utils.message_index import MessageIdIndex
+from utils.metrics import InstrumentedCommandTree, MetricsServer, MESSAGES
+from utils.sharding import ShardEventCounter
+from utils.telegram import TelegramBridge
+from utils.watchdog import LoopWatchdog
+from utils.workers import WorkerPool, WorkerTelegramBridge
 from config import TOKEN, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
+COMMAND_TREE_HASH_FILE = "data/command_tree.hash"
+DEFAULT_EXTENSIONS = [
+    "cogs.admin",
+    "cogs.yapping",
+    "cogs.wow",
+    "cogs.moderation",
+    "cogs.professions",
+    "cogs.absence",
+]
+DEFAULT_LAZY_EXTENSIONS = [
+    "cogs.fun",
+]
+
+# Listy rozszerzeń można nadpisać w config.py; rozszerzenie leniwe nie może polegać na listenerach ani pętlach w tle,
+# bo ładuje się dopiero przy pierwszym użyciu jego komendy
+EXTENSIONS = getattr(config, "EXTENSIONS", DEFAULT_EXTENSIONS)
+LAZY_EXTENSIONS = getattr(config, "LAZY_EXTENSIONS", DEFAULT_LAZY_EXTENSIONS)
+
+# Tryb shardów: SHARD_COUNT None = liczba zalecana przez Discorda; SHARD_IDS pozwala podzielić shardy między procesy
+SHARDED = getattr(config, "SHARDED", False)
+SHARD_COUNT = getattr(config, "SHARD_COUNT", None)
+SHARD_IDS = getattr(config, "SHARD_IDS", None)
+
+# Tryb z procesami roboczymi: gateway tylko przekazuje komendy WORKER_EXTENSIONS (i wiadomości Telegram) do robotów
+WORKER_PROCESSES = getattr(config, "WORKER_PROCESSES", 0)
+WORKER_EXTENSIONS = getattr(config, "WORKER_EXTENSIONS", ["cogs.wow"])
+WORKER_TELEGRAM = getattr(config, "WORKER_TELEGRAM", True)
+WORKER_MESSAGES = getattr(config, "WORKER_MESSAGES", False)
+
+# Lokalny endpoint Prometheusa; procesy robocze używają kolejnych portów, None wyłącza metryki
+METRICS_PORT = getattr(config, "METRICS_PORT", 9108)
+
+# Watchdog blokad pętli zdarzeń; można go też włączać i wyłączać komendą /watchdog
+LOOP_WATCHDOG = getattr(config, "LOOP_WATCHDOG", True)
+LOOP_WATCHDOG_THRESHOLD_MS = getattr(config, "LOOP_WATCHDOG_THRESHOLD_MS", 250)
+
 intents = discord.Intents.default()
 intents.guilds = True
 intents.messages = True
@@ -17,7 +64,6 @@ intents.members = True
 intents.message_content = True
 intents.voice_states = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
 
 def load_responses():
     try:
@@ -28,79 +74,202 @@ def load_responses():
         return []
 
 
-responses = load_responses()
+class SolemnityTree(InstrumentedCommandTree):
+    async def interaction_check(self, interaction):
+        await super().interaction_check(interaction)
+        await self.client.extension_loader.load_for_interaction(interaction)
+        return True
+
 
+class SolemnityBot(commands.AutoShardedBot if SHARDED else commands.Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Kanały i role serwerów; cogi czytają je przez bot.guild_config
+        self.guild_config = GuildConfigStore()
+        self.shard_events = ShardEventCounter()
+        self.loop_watchdog = LoopWatchdog(threshold=LOOP_WATCHDOG_THRESHOLD_MS / 1000)
 
-async def load_cogs():
-    await bot.add_cog(YappingCommands(bot))
-    await bot.add_cog(WowCommands(bot))
-    await bot.add_cog(FunCommands(bot))
-    await bot.add_cog(ModerationCommands(bot))
-    await bot.add_cog(ProfesjeSystem(bot))
-    await bot.add_cog(NieobecnosciSystem(bot))
+        extensions, lazy_extensions = EXTENSIONS, LAZY_EXTENSIONS
+        if WORKER_PROCESSES:
+            self.worker_pool = WorkerPool(WORKER_PROCESSES, WORKER_EXTENSIONS, WORKER_TELEGRAM, WORKER_MESSAGES,
+                                          METRICS_PORT)
+            extensions = [name for name in extensions if name not in WORKER_EXTENSIONS]
+            lazy_extensions = [name for name in lazy_extensions if name not in WORKER_EXTENSIONS]
+        else:
+            self.worker_pool = None
 
+        if self.worker_pool and WORKER_TELEGRAM:
+            self.telegram_bridge = WorkerTelegramBridge(self.worker_pool)
+        else:
+            self.telegram_bridge = TelegramBridge(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
+        self.extension_loader = ExtensionLoader(self, extensions, lazy_extensions)
+        self.metrics_server = MetricsServer(METRICS_PORT) if METRICS_PORT else None
+        self.bot_messages = MessageIdIndex()
+        self.dispatcher = MessageDispatcher()
+        self.responses = load_responses()
+        self.startup_times = {}
+        self.message_counts_initialized = False
 
-@bot.event
-async def on_ready():
-    print(f"✅ Bot {bot.user} jest online!")
-    await load_cogs()
+        self.dispatcher.handler()(self.count_message)
+        self.dispatcher.handler(mentions_bot=True)(self.reply_to_mention)
+        self.dispatcher.handler(is_reply=True)(self.reply_to_bot_reply)
+        self.dispatcher.handler(has_attachments=True)(self.forward_videos)
+        self.dispatcher.handler(channels=())(self.bridge_to_telegram)
+        # Filtry kanałów handlerów pochodzą z konfiguracji serwerów i są aktualizowane przy każdym jej przeładowaniu
+        self.guild_config.add_listener(
+            lambda config: self.dispatcher.set_channels("bridge_to_telegram", config.values("telegram_source_channel_id"))
+        )
 
-    yapping_cog = bot.get_cog("YappingCommands")
-    if yapping_cog:
-        await yapping_cog.initialize_message_counts()
+    def dispatch(self, event_name, /, *args, **kwargs):
+        self.shard_events.record(self, event_name, args)
+        if event_name == "ready" and self.guild_config.legacy:
+            # Przed listenerami on_ready, żeby panele od razu widziały kanały pod ID serwera
+            self.adopt_legacy_guild_config()
+        super().dispatch(event_name, *args, **kwargs)
 
-    activity = discord.Streaming(name="via halori__", url="https://www.twitch.tv/halori__")
-    await bot.change_presence(activity=activity)
+    def adopt_legacy_guild_config(self):
+        """Kanały i role ze starej sekcji "default" należą do serwera, na którym są te kanały"""
+        for key, channel_id in self.guild_config.legacy.items():
+            channel = self.get_channel(channel_id) if key.endswith("_channel_id") else None
+            if channel is not None:
+                try:
+                    self.guild_config.adopt_legacy(channel.guild.id)
+                except (OSError, ValueError) as e:
+                    print(f"❌ Nie udało się przenieść sekcji \"default\" konfiguracji serwerów: {e}")
+                return
+        print("⚠️ Kanały z sekcji \"default\" konfiguracji serwerów nie są widoczne; wpisz je pod ID serwera.")
 
-    try:
-        synced = await bot.tree.sync()
-        print(f"✅ Zsynchronizowano {len(synced)} globalnych komend.")
-    except Exception as e:
-        print(f"❌ Błąd synchronizacji komend: {e}")
-
-
-def send_telegram_message(message):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": TELEGRAM_CHAT_ID,
-        "text": message,
-    }
-    try:
-        response = requests.post(url, json=payload)
-        if response.status_code == 200:
-            print(f"✅ Wiadomość wysłana na Telegram: {message}")
-        else:
-            print(f"❌ Błąd podczas wysyłania wiadomości na Telegram: {response.text}")
-    except Exception as e:
-        print(f"❌ Błąd połączenia z Telegram API: {e}")
+    async def setup_hook(self):
+        # setup_hook wykonuje się raz na proces, przed połączeniem z gateway - w przeciwieństwie do on_ready
+        self.startup_times["before_setup"] = time.perf_counter() - PROCESS_STARTED
+        started = time.perf_counter()
+        self.guild_config.reload()
+        if LOOP_WATCHDOG:
+            self.loop_watchdog.start()
+        if self.metrics_server:
+            await self.metrics_server.start()
+        if self.worker_pool:
+            await self.worker_pool.start()
+            self.worker_pool.attach(self)
+        await self.telegram_bridge.start()
+        await self.extension_loader.load_all()
+        self.extension_loader.report()
+        await self.sync_command_tree()
+        if self.worker_pool and not self.worker_pool.ready:
+            # Komendy robotów trafią do Discorda, gdy pierwszy robot w końcu się zgłosi
+            self.worker_pool.on_late_ready = self.sync_command_tree
+        self.startup_times["setup_hook"] = time.perf_counter() - started
 
+    async def close(self):
+        await self.telegram_bridge.close()
+        await super().close()
+        if self.worker_pool:
+            await self.worker_pool.close()
+        if self.metrics_server:
+            await self.metrics_server.close()
+        self.loop_watchdog.stop()
 
-@bot.event
-async def on_message(message):
-    if message.author == bot.user or message.guild is None:
-        return
+    def command_tree_payload(self):
+        # Komendy niezaładowanych jeszcze leniwych rozszerzeń muszą zostać w Discordzie, więc trafiają do payloadu z manifestu
+        payload = [command.to_dict(self.tree) for command in self.tree.get_commands()]
+        payload.extend(self.extension_loader.pending_commands())
+        if self.worker_pool:
+            payload.extend(self.worker_pool.commands.values())
+        return sorted(payload, key=lambda command: (command.get("type", 1), command["name"]))
 
-    yapping_cog = bot.get_cog("YappingCommands")
-    if yapping_cog:
-        await yapping_cog.increment_message_count(message.guild.id, message.author.id)
+    async def sync_command_tree(self):
+        """Synchronizuje globalne komendy tylko wtedy, gdy ich definicje zmieniły się od ostatniej synchronizacji"""
+        if self.worker_pool and not self.worker_pool.ready:
+            # Bez definicji komend robotów bulk upsert usunąłby je z Discorda, a zapisany skrót utrwaliłby ten stan
+            print("⚠️ Procesy robocze nie są gotowe, pomijam synchronizację komend.")
+            return
 
-    if str(bot.user.id) in message.content and responses:
-        await message.reply(random.choice(responses))
+        payload = self.command_tree_payload()
+        # Skrót obejmuje ID aplikacji, więc zmiana tokenu na inną aplikację (np. testową) wymusza synchronizację
+        digest = hashlib.sha256(json.dumps([self.application_id, payload], sort_keys=True).encode()).hexdigest()
+        try:
+            with open(COMMAND_TREE_HASH_FILE, 'r') as f:
+                if f.read().strip() == digest:
+                    print("✅ Komendy bez zmian, pomijam synchronizację.")
+                    return
+        except FileNotFoundError:
+            pass
 
-    if message.reference:
         try:
-            replied_message = await message.channel.fetch_message(message.reference.message_id)
-            if replied_message.author == bot.user and responses:
-                await message.reply(random.choice(responses))
+            synced = await self.http.bulk_upsert_global_commands(self.application_id, payload=payload)
+            print(f"✅ Zsynchronizowano {len(synced)} globalnych komend.")
+        except Exception as e:
+            print(f"❌ Błąd synchronizacji komend: {e}")
+            return
+
+        os.makedirs(os.path.dirname(COMMAND_TREE_HASH_FILE), exist_ok=True)
+        with open(COMMAND_TREE_HASH_FILE, 'w') as f:
+            f.write(digest)
+
+    async def on_ready(self):
+        print(f"✅ Bot {self.user} jest online!")
+        self.bot_messages.mark_gap()
+
+        if not self.message_counts_initialized:
+            self.message_counts_initialized = True
+            cold_start = time.perf_counter() - PROCESS_STARTED
+            print(f"⏱️ Zimny start do READY: {cold_start:.2f}s "
+                  f"(do setup_hook {self.startup_times.get('before_setup', 0):.2f}s, "
+                  f"setup_hook {self.startup_times.get('setup_hook', 0):.2f}s)")
+
+            yapping_cog = self.get_cog("YappingCommands")
+            if yapping_cog:
+                await yapping_cog.initialize_message_counts()
+
+    async def on_shard_ready(self, shard_id):
+        print(f"✅ Shard {shard_id} gotowy.")
+
+    async def is_reply_to_bot(self, message):
+        """Sprawdza, czy wiadomość odpowiada na wiadomość bota; REST tylko gdy nie ma danych w cache ani indeksie"""
+        reference = message.reference
+        if reference.message_id is None:
+            return False
+
+        replied_message = reference.resolved or reference.cached_message
+        if isinstance(replied_message, discord.Message):
+            return replied_message.author == self.user
+        if isinstance(replied_message, discord.DeletedReferencedMessage):
+            return False
+
+        if reference.message_id in self.bot_messages:
+            return True
+        if self.bot_messages.covers(reference.message_id):
+            return False
+
+        try:
+            replied_message = await message.channel.fetch_message(reference.message_id)
+            return replied_message.author == self.user
         except Exception as e:
             print(f"Błąd podczas pobierania wiadomości: {e}")
+            return False
+
+    async def count_message(self, message):
+        yapping_cog = self.get_cog("YappingCommands")
+        if yapping_cog:
+            await yapping_cog.increment_message_count(
+                message.guild.id, message.author.id, message.created_at, message.channel.id)
 
-    for attachment in message.attachments:
-        if attachment.filename.endswith('.mp4'):
-            target_channel_id = 1233783179370823700
+    async def reply_to_mention(self, message):
+        if self.responses:
+            await message.reply(random.choice(self.responses))
 
-            if message.channel.id != target_channel_id:
-                target_channel = bot.get_channel(target_channel_id)
+    async def reply_to_bot_reply(self, message):
+        if self.responses and await self.is_reply_to_bot(message):
+            await message.reply(random.choice(self.responses))
+
+    async def forward_videos(self, message):
+        target_channel_id = self.guild_config.get(message.guild.id, "mp4_target_channel_id")
+        if target_channel_id is None or message.channel.id == target_channel_id:
+            return
+
+        for attachment in message.attachments:
+            if attachment.filename.endswith('.mp4'):
+                target_channel = self.get_channel(target_channel_id)
                 if target_channel:
                     try:
                         await message.forward(target_channel)
@@ -108,9 +277,36 @@ async def on_message(message):
                     except discord.HTTPException as e:
                         print(f"❌ Błąd podczas przekazywania wiadomości: {e}")
 
-    if message.channel.id == 1212808961061949542:
-        send_telegram_message(f"{message.author.display_name} napisał na Discordzie:\n{message.content}")
+    async def bridge_to_telegram(self, message):
+        self.telegram_bridge.enqueue(f"{message.author.display_name} napisał na Discordzie:\n{message.content}")
+
+    async def on_message(self, message):
+        if message.author == self.user:
+            self.bot_messages.add(message.id)
+            return
+
+        if message.guild is None:
+            return
+
+        MESSAGES.inc()
+        await self.dispatcher.dispatch(message, self.user)
+
+        await self.process_commands(message)
+
+
+def main():
+    shard_options = {"shard_count": SHARD_COUNT, "shard_ids": SHARD_IDS} if SHARDED else {}
+    bot = SolemnityBot(
+        command_prefix="!",
+        intents=intents,
+        tree_cls=SolemnityTree,
+        activity=discord.Streaming(name="via halori__", url="https://www.twitch.tv/halori__"),
+        **shard_options
+    )
+    bot.run(TOKEN)
 
-    await bot.process_commands(message)
 
-bot.run(TOKEN)
\ No newline at end of file
+# Procesy robocze startują metodą spawn i importują ten moduł ponownie jako __mp_main__, więc na poziomie modułu
+# są tylko definicje - bot, pula robotów i most Telegram powstają dopiero w main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import random
+
+from utils.activity import DAY, HOUR, MINUTE, ActivitySeries, RingSeries
+
+
+def test_ring_series_window_matches_brute_force():
+    rng = random.Random(11)
+    ring = RingSeries(MINUTE, 30)
+    messages = []
+    now = 1_700_000_000
+    for _ in range(4000):
+        now += rng.choice((0, 3, 20, 61, 400)) if rng.random() > 0.005 else 40 * MINUTE
+        timestamp = now - rng.randrange(0, 45 * MINUTE) if rng.random() < 0.1 else now
+        messages.append(timestamp)
+        ring.add(timestamp)
+
+        count = rng.randrange(1, 31)
+        current = now // MINUTE
+        # Kubełki sprzed bieżącego okna bufora są już nadpisane
+        oldest = max(current - count + 1, ring.head - ring.size + 1)
+        expected = sum(1 for sent in messages if oldest <= sent // MINUTE <= current)
+        assert ring.window(count, now) == expected
+
+    items = list(ring.items(now))
+    assert len(items) == ring.size
+    assert sum(count for _, count in items) == ring.window(ring.size, now)
+
+
+def test_activity_series_round_trip():
+    rng = random.Random(5)
+    series = ActivitySeries()
+    now = 1_700_000_000
+    for _ in range(5000):
+        now += rng.randrange(0, 900)
+        series.add(now, rng.randrange(1, 4))
+
+    restored = ActivitySeries.unpack(ActivitySeries.pack(series.snapshot()))
+    assert restored.snapshot() == series.snapshot()
+    for seconds in (MINUTE, HOUR, DAY, 7 * DAY, 30 * DAY, 365 * DAY):
+        assert restored.last(seconds, now) == series.last(seconds, now)
+    assert restored.peak_hour(now) == series.peak_hour(now)
+
+    restored.add(now + 1)
+    series.add(now + 1)
+    assert restored.snapshot() == series.snapshot()
@@ -0,0 +1,65 @@
+import pytest
+
+from utils import cache
+from utils.cache import FRESH, MISS, STALE, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_fresh_stale_and_expired_entries(clock):
+    profiles = TTLCache(max_size=10, name="test")
+    assert profiles.get("a") == (None, MISS)
+
+    profiles.set("a", 1, ttl=60, stale_ttl=30)
+    assert profiles.get("a") == (1, FRESH)
+    clock.now += 60
+    assert profiles.get("a") == (1, STALE)
+    clock.now += 29
+    assert profiles.get("a") == (1, STALE)
+    clock.now += 1
+    # Po oknie stale wpis znika z cache
+    assert profiles.get("a") == (None, MISS)
+    assert len(profiles) == 0
+
+    stats = profiles.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (1, 2, 2)
+    assert stats["hit_rate"] == 3 / 5
+
+
+def test_set_replaces_entry_and_ttl(clock):
+    profiles = TTLCache(max_size=10, name="test")
+    profiles.set("a", 1, ttl=10)
+    clock.now += 5
+    profiles.set("a", 2, ttl=10)
+    clock.now += 9
+    assert profiles.get("a") == (2, FRESH)
+    clock.now += 1
+    # Bez stale_ttl wpis wygasa od razu po ttl
+    assert profiles.get("a") == (None, MISS)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    profiles = TTLCache(max_size=3, name="test")
+    for key in "abc":
+        profiles.set(key, key, ttl=60)
+    # Odczyt odświeża pozycję "a", więc usunięty zostaje "b"
+    assert profiles.get("a") == ("a", FRESH)
+    profiles.set("d", "d", ttl=60)
+
+    assert len(profiles) == 3
+    assert profiles.evictions == 1
+    assert profiles.get("b") == (None, MISS)
+    assert [profiles.get(key)[1] for key in "acd"] == [FRESH, FRESH, FRESH]
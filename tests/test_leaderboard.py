@@ -0,0 +1,110 @@
+import random
+
+from utils.activity import DAY, HOUR, MINUTE, ActivitySeries
+from utils.leaderboard import GuildLeaderboard, RankIndex, WindowRankIndex
+
+
+def brute_rank(counts, user_id):
+    count = counts.get(user_id, 0)
+    if not count:
+        return None
+    return 1 + sum(1 for other in counts.values() if other > count)
+
+
+def assert_matches(index, counts):
+    counts = {user_id: count for user_id, count in counts.items() if count}
+    assert index.counts == counts
+    assert len(index) == len(counts)
+    assert [index.counts[user_id] for user_id in index.order] == sorted(counts.values(), reverse=True)
+    for position, user_id in enumerate(index.order):
+        assert index.position[user_id] == position
+        assert index.rank(user_id) == brute_rank(counts, user_id)
+
+
+def test_rank_index_matches_brute_force():
+    rng = random.Random(24)
+    index = RankIndex()
+    counts = {}
+    for step in range(20000):
+        user_id = rng.randrange(1, 300)
+        delta = 1 if not counts.get(user_id) or rng.random() < 0.55 else -1
+        counts[user_id] = counts.get(user_id, 0) + delta
+        index.add(user_id, delta)
+
+        assert index.count(user_id) == counts[user_id]
+        assert index.rank(user_id) == brute_rank(counts, user_id)
+        if step % 500 == 0:
+            assert_matches(index, counts)
+    assert_matches(index, counts)
+
+    top = index.top(10)
+    assert [count for _, _, count in top] == sorted(counts.values(), reverse=True)[:10]
+    assert all(place == brute_rank(counts, user_id) for place, user_id, _ in top)
+
+
+def test_rank_index_load_and_around():
+    counts = {1: 5, 2: 3, 3: 3, 4: 1, 5: 0}
+    index = RankIndex()
+    index.load(counts)
+    assert_matches(index, counts)
+    assert index.rank(5) is None
+    assert [user_id for _, user_id, _ in index.around(1, 1)] == index.order[:2]
+    assert index.around(5, 2) == []
+
+    index.add(4, 3)
+    index.add(1, -5)
+    assert_matches(index, {2: 3, 3: 3, 4: 4})
+
+
+def test_window_rank_index_expires_old_buckets():
+    rng = random.Random(7)
+    width, size = MINUTE, 60
+    index = WindowRankIndex(width, size)
+    messages = []
+    now = 1_700_000_000
+    for step in range(5000):
+        # Przeważnie krótkie odstępy, czasem długa przerwa, po której całe okno wygasa
+        now += rng.choice((0, 1, 5, 30, 90)) if rng.random() > 0.002 else 3 * width * size
+        user_id = rng.randrange(1, 40)
+        timestamp = now - rng.randrange(0, 2 * width * size) if rng.random() < 0.1 else now
+        messages.append((user_id, timestamp))
+        index.add_message(user_id, timestamp, now)
+
+        if step % 50 == 0:
+            threshold = now // width - size
+            expected = {}
+            for other, sent in messages:
+                if sent // width > threshold:
+                    expected[other] = expected.get(other, 0) + 1
+            index.advance(now)
+            assert_matches(index, expected)
+
+    index.advance(now + width * size)
+    assert len(index) == 0
+    assert index.schedule == {}
+
+
+def test_guild_leaderboard_windows_match_activity_series():
+    rng = random.Random(3)
+    leaderboard = GuildLeaderboard()
+    series = {}
+    counts = {}
+    now = 1_700_000_000
+    for _ in range(3000):
+        now += rng.randrange(0, 600)
+        user_id = rng.randrange(1, 25)
+        series.setdefault(user_id, ActivitySeries()).add(now)
+        counts[user_id] = counts.get(user_id, 0) + 1
+        leaderboard.add_message(user_id, now, now)
+
+    for name, seconds in (("24h", DAY), ("7d", 7 * DAY)):
+        expected = {user_id: s.last(seconds, now) for user_id, s in series.items()}
+        assert_matches(leaderboard.scope(name, now), expected)
+    assert_matches(leaderboard.scope("all", now), counts)
+
+    # Po restarcie rankingi okien są odtwarzane z buforów i dalej wygasają tak samo
+    restored = GuildLeaderboard()
+    restored.load(counts, series, now)
+    later = now + 20 * HOUR
+    for name in ("all", "24h", "7d"):
+        assert_matches(restored.scope(name, later), leaderboard.scope(name, later).counts)
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+from utils.ratelimit import PRIORITY_BULK, PRIORITY_INTERACTIVE, TokenBucketScheduler, parse_retry_after
+
+
+def test_burst_then_rate():
+    async def scenario():
+        scheduler = TokenBucketScheduler("test", rate=50, burst=3)
+        started = time.monotonic()
+        for _ in range(3):
+            await scheduler.acquire()
+        burst = time.monotonic() - started
+        # Kolejne 5 zapytań czeka na tokeny: 5 / 50 = 0,1 s
+        await asyncio.gather(*[scheduler.acquire() for _ in range(5)])
+        return burst, time.monotonic() - started, scheduler.queue_depth
+
+    burst, total, depth = asyncio.run(scenario())
+    assert burst < 0.01
+    assert 0.09 <= total < 0.5
+    assert depth == 0
+
+
+def test_interactive_requests_overtake_bulk():
+    async def scenario():
+        scheduler = TokenBucketScheduler("test", rate=100, burst=1)
+        await scheduler.acquire()
+        order = []
+
+        async def request(name, priority):
+            await scheduler.acquire(priority)
+            order.append(name)
+
+        await asyncio.gather(
+            request("bulk-1", PRIORITY_BULK),
+            request("bulk-2", PRIORITY_BULK),
+            request("interactive", PRIORITY_INTERACTIVE)
+        )
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "bulk-1", "bulk-2"]
+
+
+def test_retry_after_blocks_all_requests():
+    async def scenario():
+        scheduler = TokenBucketScheduler("test", rate=1000, burst=10)
+        scheduler.retry_after(0.1)
+        assert scheduler.blocked_for > 0.05
+        started = time.monotonic()
+        await scheduler.acquire()
+        return time.monotonic() - started, scheduler.throttled
+
+    waited, throttled = asyncio.run(scenario())
+    assert waited >= 0.09
+    assert throttled == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3", 10) == 3.0
+    assert parse_retry_after("-5", 10) == 0.0
+    assert parse_retry_after(None, 10) == 10
+    assert parse_retry_after("wkrótce", 10) == 10
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", 10) == 0.0
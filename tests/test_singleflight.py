@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_request():
+    async def scenario():
+        group = SingleFlight("test")
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"name": "Postac"}
+
+        results = await asyncio.gather(*[group.do("postac", fetch) for _ in range(5)])
+        other = await group.do("inna", fetch)
+        return group, calls, results, other
+
+    group, calls, results, other = asyncio.run(scenario())
+    assert calls == 2
+    assert all(result is results[0] for result in results)
+    assert other == {"name": "Postac"}
+    assert group.stats() == {"in_flight": 0, "leaders": 2, "followers": 4}
+
+
+def test_cancelled_waiter_does_not_cancel_others():
+    async def scenario():
+        group = SingleFlight("test")
+        started = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            await asyncio.sleep(0.02)
+            return 42
+
+        first = asyncio.create_task(group.do("key", fetch))
+        second = asyncio.create_task(group.do("key", fetch))
+        await started.wait()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, len(group)
+
+    assert asyncio.run(scenario()) == (42, 0)
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    async def scenario():
+        group = SingleFlight("test")
+        attempts = 0
+
+        async def fetch():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0.01)
+            if attempts == 1:
+                raise RuntimeError("upstream")
+            return "ok"
+
+        results = await asyncio.gather(*[group.do("key", fetch) for _ in range(3)], return_exceptions=True)
+        # Po błędzie kolejne wywołanie wykonuje zapytanie ponownie
+        return results, await group.do("key", fetch), attempts
+
+    results, retried, attempts = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert (retried, attempts) == ("ok", 2)
@@ -0,0 +1,95 @@
+import random
+
+from utils.activity import DAY
+from utils.sketches import CountMinSketch, GuildSketches, HyperLogLog
+
+
+def test_hyperloglog_round_trip_and_error():
+    sketch = HyperLogLog(12)
+    for value in range(1, 50001):
+        sketch.add(value * 7919)
+    assert abs(sketch.count() - 50000) <= 4 * sketch.error * 50000
+
+    restored = HyperLogLog.from_bytes(sketch.to_bytes(), 12)
+    assert restored.registers == sketch.registers
+    assert restored.count() == sketch.count()
+    assert HyperLogLog.from_bytes(sketch.to_bytes(), 10) is None
+
+
+def test_count_min_sketch_round_trip():
+    rng = random.Random(25)
+    sketch = CountMinSketch(256, 4, 5)
+    truth = {}
+    for _ in range(20000):
+        # Kilku bardzo aktywnych użytkowników i długi ogon
+        key = rng.randrange(1, 6) if rng.random() < 0.5 else rng.randrange(10, 5000)
+        key += 10 ** 17
+        sketch.add(key)
+        truth[key] = truth.get(key, 0) + 1
+
+    assert sketch.total == 20000
+    for key, count in truth.items():
+        assert sketch.estimate(key) >= count
+    heaviest = sorted(truth, key=truth.__getitem__, reverse=True)[:5]
+    assert {key for key, _ in sketch.top(5)} == set(heaviest)
+
+    restored = CountMinSketch.from_bytes(sketch.to_bytes(), 256, 4, 5)
+    assert restored.total == sketch.total
+    assert restored.table == sketch.table
+    assert restored.top(5) == sketch.top(5)
+    assert all(restored.estimate(key) == sketch.estimate(key) for key in truth)
+
+
+def test_count_min_sketch_rejects_other_parameters():
+    sketch = CountMinSketch(256, 4, 5)
+    for key in range(100):
+        sketch.add(key)
+    data = sketch.to_bytes()
+
+    # 512 x 2 i 128 x 8 mają tablicę tej samej wielkości - odróżnia je tylko nagłówek
+    assert CountMinSketch.from_bytes(data, 512, 2, 5) is None
+    assert CountMinSketch.from_bytes(data, 128, 8, 5) is None
+    assert CountMinSketch.from_bytes(data, 128, 4, 5) is None
+    assert CountMinSketch.from_bytes(data + b"\0", 256, 4, 5) is None
+    assert CountMinSketch.from_bytes(data, 256, 4, 3).top(5) == sketch.top(3)
+
+
+def test_guild_sketches_round_trip():
+    now = 1_700_000_000
+    sketches = GuildSketches(precision=10, width=256, depth=4, heavy_hitters=5)
+    for user_id in range(1, 301):
+        sketches.add(100 + user_id % 3, user_id, now, now)
+        sketches.add(100, 1, now, now)
+    # Wiadomość z poprzedniego dnia nie trafia do szkiców bieżącego okresu
+    sketches.add(100, 999, now - DAY, now)
+
+    rows = sketches.rows()
+    assert sketches.rows() == []
+    restored = GuildSketches(precision=10, width=256, depth=4, heavy_hitters=5)
+    for channel_id, kind, period, data in rows:
+        restored.load(channel_id, kind, period, GuildSketches.unpack(GuildSketches.pack(data)))
+
+    for kind in ("day", "week"):
+        assert restored.distinct(kind, now) == sketches.distinct(kind, now)
+        assert restored.users(kind, now).top(5) == sketches.users(kind, now).top(5)
+    assert restored.users("day", now).estimate(1) >= 301
+    assert restored.users("day", now + DAY) is None
+
+    # Szkice zapisane z innymi parametrami są pomijane
+    other = GuildSketches(precision=12, width=128, depth=4, heavy_hitters=5)
+    for channel_id, kind, period, data in rows:
+        other.load(channel_id, kind, period, data)
+    assert other.sketches == {}
+
+
+def test_guild_sketches_fold_messages_older_than_stored_period():
+    now = 1_700_000_000
+    sketches = GuildSketches(precision=10, width=256, depth=4, heavy_hitters=5)
+    sketches.add(100, 1, now, now)
+    # Zegar cofnął się o dzień: okres dnia jest starszy niż zapisany, a wiadomość nie może zginąć ani nadpisać szkicu
+    sketches.add(100, 2, now - DAY, now - DAY)
+
+    assert sketches.users("day", now).estimate(1) == 1
+    assert sketches.users("day", now).estimate(2) == 1
+    assert sketches.distinct("day", now)[0] == 2
+    assert sketches.users("day", now - DAY) is None
@@ -0,0 +1,119 @@
+import struct
+import time
+import zlib
+from array import array
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+MINUTE_BUCKETS = 1440
+HOUR_BUCKETS = 720
+DAY_BUCKETS = 366
+
+_HEADER = struct.Struct("<3q")
+
+
+class RingSeries:
+    """Liczniki w kubełkach o stałej szerokości, w buforze cyklicznym na tablicy array('I').
+
+    head to numer (czas // width) najnowszego kubełka. Kubełek numer i leży w buckets[i % size];
+    przesunięcie head zeruje kubełki, które wypadają z okna, więc pamięć jest stała."""
+
+    __slots__ = ("width", "size", "head", "buckets")
+
+    def __init__(self, width, size):
+        self.width = width
+        self.size = size
+        self.head = 0
+        self.buckets = array("I", bytes(4 * size))
+
+    def advance(self, index):
+        if index <= self.head:
+            return
+        if index - self.head >= self.size:
+            self.buckets = array("I", bytes(4 * self.size))
+        else:
+            for i in range(self.head + 1, index + 1):
+                self.buckets[i % self.size] = 0
+        self.head = index
+
+    def add(self, timestamp, amount=1):
+        index = int(timestamp) // self.width
+        self.advance(index)
+        # Wiadomości starsze niż okno bufora (np. z przeliczania historii) nie mają już kubełka
+        if index > self.head - self.size:
+            self.buckets[index % self.size] += amount
+
+    def window(self, count, now):
+        """Suma ostatnich count kubełków, łącznie z kubełkiem zawierającym now"""
+        end = min(int(now) // self.width, self.head)
+        start = max(int(now) // self.width - count + 1, self.head - self.size + 1)
+        return sum(self.buckets[i % self.size] for i in range(start, end + 1))
+
+    def items(self, now):
+        """Pary (początek kubełka, licznik) dla całego okna, od najstarszego"""
+        last = int(now) // self.width
+        for i in range(last - self.size + 1, last + 1):
+            count = self.buckets[i % self.size] if self.head - self.size < i <= self.head else 0
+            yield i * self.width, count
+
+
+class ActivitySeries:
+    """Aktywność w trzech rozdzielczościach: minuty z ostatniej doby, godziny z ostatniego miesiąca i dni
+    z ostatniego roku. Zapytanie o okno używa najdokładniejszej rozdzielczości, która je obejmuje."""
+
+    __slots__ = ("minutes", "hours", "days")
+
+    def __init__(self):
+        self.minutes = RingSeries(MINUTE, MINUTE_BUCKETS)
+        self.hours = RingSeries(HOUR, HOUR_BUCKETS)
+        self.days = RingSeries(DAY, DAY_BUCKETS)
+
+    def add(self, timestamp, amount=1):
+        self.minutes.add(timestamp, amount)
+        self.hours.add(timestamp, amount)
+        self.days.add(timestamp, amount)
+
+    def last(self, seconds, now=None):
+        """Liczba wiadomości z ostatnich seconds sekund (zaokrąglone do kubełków)"""
+        now = time.time() if now is None else now
+        for series in (self.minutes, self.hours, self.days):
+            if seconds <= series.width * series.size:
+                return series.window(-(-seconds // series.width), now)
+        return self.days.window(self.days.size, now)
+
+    def peak_hour(self, now=None):
+        """Najaktywniejsza godzina doby (UTC) w ostatnim miesiącu jako (godzina, wiadomości) lub None"""
+        now = time.time() if now is None else now
+        by_hour = [0] * 24
+        for start, count in self.hours.items(now):
+            by_hour[start // HOUR % 24] += count
+        best = max(range(24), key=by_hour.__getitem__)
+        return (best, by_hour[best]) if by_hour[best] else None
+
+    def snapshot(self):
+        """Surowe bajty serii (nagłówek z head + trzy tablice); kompresja odbywa się przy zapisie"""
+        return b"".join((
+            _HEADER.pack(self.minutes.head, self.hours.head, self.days.head),
+            self.minutes.buckets.tobytes(),
+            self.hours.buckets.tobytes(),
+            self.days.buckets.tobytes()
+        ))
+
+    @staticmethod
+    def pack(snapshot):
+        return zlib.compress(snapshot, 1)
+
+    @classmethod
+    def unpack(cls, blob):
+        data = zlib.decompress(blob)
+        series = cls()
+        heads = _HEADER.unpack_from(data)
+        offset = _HEADER.size
+        for ring, head in zip((series.minutes, series.hours, series.days), heads):
+            end = offset + 4 * ring.size
+            ring.head = head
+            ring.buckets = array("I", data[offset:end])
+            offset = end
+        return series
@@ -0,0 +1,228 @@
+import asyncio
+import time
+
+import discord
+
+from utils.sharding import in_process
+
+BACKFILL_CONCURRENCY = 4
+ALL_CHANNELS = 0
+ALL_GUILDS = 0
+
+
+class HistoryBackfill:
+    """Przelicza historię kanałów i wątków w tle, z ograniczoną liczbą kanałów naraz.
+
+    Stan to lista luk [after_id, before_id) per kanał - zakresów wiadomości, których liczniki jeszcze nie
+    obejmują. Przy każdej nowej sesji gateway dochodzi luka od ostatniej wiadomości policzonej na żywo
+    do początku sesji, więc kolejne przebiegi są przyrostowe. Zanim zostanie rozpisana na kanały, jest
+    zapisywana jako luka kanału ALL_CHANNELS jednego serwera (albo ALL_GUILDS). Dolna granica luki przesuwa się z każdą przeliczoną wiadomością i jest
+    zapisywana razem z licznikami, więc przerwany przebieg wznawia się bez podwójnego liczenia."""
+
+    def __init__(self, bot, count_message, concurrency=BACKFILL_CONCURRENCY):
+        self.bot = bot
+        self.count_message = count_message
+        self.concurrency = concurrency
+        self.gaps = {}
+        self.guilds = {}
+        self.pending = []
+        self.dirty = False
+        self.task = None
+        self._rerun = False
+        self.channels_total = 0
+        self.channels_done = 0
+        self.channels_skipped = 0
+        self.messages = 0
+        self.active = set()
+        self.started_at = None
+        self.finished_at = None
+
+    def load(self, rows):
+        for channel_id, guild_id, after_id, before_id in rows:
+            if channel_id == ALL_CHANNELS:
+                self.pending.append((guild_id, after_id, before_id))
+                continue
+            self.gaps.setdefault(channel_id, []).append([after_id, before_id])
+            self.guilds[channel_id] = guild_id
+
+    def rows(self):
+        self.dirty = False
+        return [
+            *((ALL_CHANNELS, guild_id, after_id, before_id) for guild_id, after_id, before_id in self.pending),
+            *((channel_id, self.guilds[channel_id], after_id, before_id)
+              for channel_id, gaps in self.gaps.items()
+              for after_id, before_id in gaps)
+        ]
+
+    def add_pending(self, since, until, guild_id=ALL_GUILDS):
+        """Luka (since, until) dla wszystkich kanałów serwera guild_id (domyślnie wszystkich serwerów);
+        rozpisywana na kanały przy następnym start()"""
+        if since < until:
+            self.pending.append((guild_id, since, until))
+            self.dirty = True
+
+    def add_gap(self, channel_id, guild_id, after_id, before_id):
+        if after_id < before_id:
+            self.gaps.setdefault(channel_id, []).append([after_id, before_id])
+            self.guilds[channel_id] = guild_id
+            self.dirty = True
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def start(self):
+        """Uruchamia przeliczanie wszystkich luk w tle; w trakcie przebiegu luki dodane później trafią do kolejnego"""
+        if not self.running:
+            self.task = asyncio.create_task(self._run())
+        elif self.pending:
+            self._rerun = True
+
+    async def stop(self):
+        if self.running:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        self.started_at = time.time()
+        self.finished_at = None
+        self._rerun = False
+        await self._run_once()
+        while self._rerun and self.pending:
+            self._rerun = False
+            await self._run_once()
+        self.finished_at = time.time()
+        print(f"✅ Przeliczanie historii zakończone: {self.messages} wiadomości w "
+              f"{self.finished_at - self.started_at:.0f}s, pominięte kanały: {self.channels_skipped}.")
+
+    async def _split_pending(self):
+        """Rozpisuje luki ALL_CHANNELS na kanały; luki serwerów jeszcze niedostępnych (shard po ponownym
+        połączeniu przed GUILD_CREATE) czekają na kolejny przebieg"""
+        channels = {}
+        pending = list(self.pending)
+        waiting = []
+        for guild_id, after_id, before_id in pending:
+            guild = self.bot.get_guild(guild_id) if guild_id != ALL_GUILDS else None
+            if guild is not None and guild.unavailable:
+                waiting.append((guild_id, after_id, before_id))
+
+        for guild in self.bot.guilds:
+            # Serwery innych procesów (SHARD_IDS) liczą ich własne bazy; historia jest pobierana przez HTTP,
+            # więc serwer sharda, który akurat łączy się ponownie, nie traci luki
+            if guild.unavailable or not in_process(self.bot, guild.id):
+                continue
+            gaps = [(after_id, before_id) for guild_id, after_id, before_id in pending
+                    if guild_id in (ALL_GUILDS, guild.id)]
+            if not gaps:
+                continue
+            async for channel in self._readable_channels(guild, min(after_id for after_id, _ in gaps)):
+                channels[channel.id] = channel
+                for after_id, before_id in gaps:
+                    self.add_gap(channel.id, guild.id, after_id, before_id)
+        # Luki są już per kanał; zapisują się w tej samej transakcji, w której znika luka ogólna
+        self.pending = waiting + self.pending[len(pending):]
+        self.dirty = True
+        return channels
+
+    async def _run_once(self):
+        channels = await self._split_pending()
+
+        for channel_id in list(self.gaps):
+            if channel_id not in channels:
+                channel = await self._resolve_channel(channel_id)
+                if channel is not None:
+                    channels[channel_id] = channel
+
+        queue = asyncio.Queue()
+        for channel_id in self.gaps:
+            if channel_id in channels:
+                queue.put_nowait(channels[channel_id])
+        self.channels_total = queue.qsize()
+        self.channels_done = 0
+        print(f"📜 Przeliczanie historii: {self.channels_total} kanałów, do {self.concurrency} naraz.")
+
+        await asyncio.gather(*(self._worker(queue) for _ in range(self.concurrency)))
+
+    async def _readable_channels(self, guild, since):
+        def readable(channel):
+            permissions = channel.permissions_for(guild.me)
+            return permissions.view_channel and permissions.read_message_history
+
+        for channel in [*guild.text_channels, *guild.voice_channels, *guild.threads]:
+            if readable(channel):
+                yield channel
+
+        # Zarchiwizowane wątki są zwracane od najpóźniej zarchiwizowanych; starsze niż since nie mają nowych wiadomości
+        since_time = discord.utils.snowflake_time(since) if since else None
+        for channel in [*guild.text_channels, *guild.forums]:
+            if not readable(channel):
+                continue
+            try:
+                async for thread in channel.archived_threads(limit=None):
+                    if since_time and thread.archive_timestamp < since_time:
+                        break
+                    yield thread
+            except discord.HTTPException as e:
+                print(f"⚠️ Nie udało się pobrać archiwalnych wątków kanału {channel.name}: {e}")
+
+    async def _resolve_channel(self, channel_id):
+        """Kanał z luką spoza cache (np. zarchiwizowany wątek); usuwa luki kanałów, które już nie istnieją"""
+        guild_id = self.guilds[channel_id]
+        if not in_process(self.bot, guild_id):
+            return None
+        try:
+            return await self.bot.fetch_channel(channel_id)
+        except discord.NotFound:
+            del self.gaps[channel_id]
+            self.dirty = True
+        except discord.HTTPException:
+            pass
+        return None
+
+    async def _worker(self, queue):
+        while not queue.empty():
+            channel = queue.get_nowait()
+            self.active.add(channel.id)
+            try:
+                await self._backfill_channel(channel)
+            except discord.HTTPException as e:
+                # Luka zostaje i zostanie ponowiona przy następnym starcie
+                self.channels_skipped += 1
+                print(f"⚠️ Pominięto przeliczanie kanału {channel.name}: {e}")
+            finally:
+                self.active.discard(channel.id)
+                self.channels_done += 1
+
+    async def _backfill_channel(self, channel):
+        gaps = self.gaps.get(channel.id, [])
+        while gaps:
+            gap = gaps[0]
+            after = discord.Object(gap[0]) if gap[0] else None
+            async for message in channel.history(limit=None, after=after, before=discord.Object(gap[1]),
+                                                 oldest_first=True):
+                if message.author != self.bot.user:
+                    self.count_message(message)
+                gap[0] = message.id
+                self.messages += 1
+                self.dirty = True
+            gaps.pop(0)
+            self.dirty = True
+
+        self.gaps.pop(channel.id, None)
+
+    def progress(self):
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            "running": self.running,
+            "channels_done": self.channels_done,
+            "channels_total": self.channels_total,
+            "channels_skipped": self.channels_skipped,
+            "active_channels": len(self.active),
+            "pending_gaps": sum(len(gaps) for gaps in self.gaps.values()),
+            "messages": self.messages,
+            "elapsed": elapsed,
+            "rate": self.messages / elapsed if elapsed else 0.0
+        }
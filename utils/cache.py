@@ -0,0 +1,82 @@
+import time
+import weakref
+from collections import OrderedDict
+
+from utils.metrics import REGISTRY
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+_CACHES = weakref.WeakSet()
+
+CACHE_LOOKUPS = REGISTRY.counter(
+    "cache_lookups_total", "Odczyty cache w pamięci według wyniku", ("cache", "result"),
+    func=lambda: {(cache.name, result): count for cache in list(_CACHES)
+                  for result, count in ((FRESH, cache.hits), (STALE, cache.stale_hits), (MISS, cache.misses))})
+CACHE_EVICTIONS = REGISTRY.counter(
+    "cache_evictions_total", "Wpisy usunięte z cache po przekroczeniu rozmiaru", ("cache",),
+    func=lambda: {(cache.name,): cache.evictions for cache in list(_CACHES)})
+CACHE_ENTRIES = REGISTRY.gauge(
+    "cache_entries", "Liczba wpisów w cache", ("cache",),
+    func=lambda: {(cache.name,): len(cache) for cache in list(_CACHES)})
+
+
+class TTLCache:
+    """Ograniczony cache LRU z czasem życia wpisów i oknem stale-while-revalidate"""
+
+    def __init__(self, max_size=512, name="default"):
+        self.name = name
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _CACHES.add(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Zwraca krotkę (wartość, stan), gdzie stan to FRESH, STALE albo MISS"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, MISS
+
+        value, fresh_until, stale_until = entry
+        now = time.monotonic()
+        if now >= stale_until:
+            del self._entries[key]
+            self.misses += 1
+            return None, MISS
+
+        self._entries.move_to_end(key)
+        if now < fresh_until:
+            self.hits += 1
+            return value, FRESH
+
+        self.stale_hits += 1
+        return value, STALE
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        now = time.monotonic()
+        self._entries[key] = (value, now + ttl, now + ttl + stale_ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,88 @@
+import asyncio
+import itertools
+import time
+
+from utils.metrics import MESSAGE_HANDLER_ERRORS, MESSAGE_HANDLER_LATENCY
+
+
+class MessageHandler:
+    def __init__(self, name, callback, channels, has_attachments, is_reply, mentions_bot):
+        self.name = name
+        self.callback = callback
+        self.channels = frozenset(channels) if channels is not None else None
+        self.has_attachments = has_attachments
+        self.is_reply = is_reply
+        self.mentions_bot = mentions_bot
+
+    def matches(self, has_attachments, is_reply, mentions_bot):
+        return ((self.has_attachments is None or self.has_attachments == has_attachments) and
+                (self.is_reply is None or self.is_reply == is_reply) and
+                (self.mentions_bot is None or self.mentions_bot == mentions_bot))
+
+
+class MessageDispatcher:
+    """Rozdziela wiadomości do handlerów zarejestrowanych z filtrami.
+
+    Filtry są kompilowane do tablicy (kanał, ma_załączniki, jest_odpowiedzią, wspomina_bota) -> handlery,
+    więc dla każdej wiadomości wykonuje się jedno wyszukiwanie w słowniku i tylko pasujące handlery,
+    uruchamiane równolegle. Czas wykonania każdego handlera jest mierzony."""
+
+    def __init__(self):
+        self.handlers = []
+        self._table = None
+        self._channels = frozenset()
+
+    def handler(self, *, channels=None, has_attachments=None, is_reply=None, mentions_bot=None, name=None):
+        """Dekorator rejestrujący handler; filtr None oznacza dowolną wartość"""
+        def decorator(callback):
+            self.handlers.append(MessageHandler(
+                name or callback.__name__, callback, channels, has_attachments, is_reply, mentions_bot
+            ))
+            self._table = None
+            return callback
+        return decorator
+
+    def set_channels(self, name, channels):
+        """Zmienia filtr kanałów handlera, np. po przeładowaniu konfiguracji; tablica kompiluje się ponownie"""
+        for handler in self.handlers:
+            if handler.name == name:
+                handler.channels = frozenset(channels) if channels is not None else None
+        self._table = None
+
+    def compile(self):
+        channels = frozenset(itertools.chain.from_iterable(
+            handler.channels for handler in self.handlers if handler.channels is not None
+        ))
+        table = {}
+        for channel_id in itertools.chain(channels, [None]):
+            for flags in itertools.product((False, True), repeat=3):
+                table[(channel_id, *flags)] = tuple(
+                    handler for handler in self.handlers
+                    if (handler.channels is None or channel_id in handler.channels) and handler.matches(*flags)
+                )
+        self._channels = channels
+        self._table = table
+
+    async def dispatch(self, message, bot_user):
+        if self._table is None:
+            self.compile()
+
+        channel_id = message.channel.id if message.channel.id in self._channels else None
+        key = (channel_id, bool(message.attachments), message.reference is not None,
+               str(bot_user.id) in message.content)
+        handlers = self._table[key]
+
+        if len(handlers) == 1:
+            await self._run(handlers[0], message)
+        elif handlers:
+            await asyncio.gather(*(self._run(handler, message) for handler in handlers))
+
+    async def _run(self, handler, message):
+        started = time.perf_counter()
+        try:
+            await handler.callback(message)
+        except Exception as e:
+            MESSAGE_HANDLER_ERRORS.inc(handler=handler.name)
+            print(f"❌ Błąd w obsłudze wiadomości ({handler.name}): {e}")
+        finally:
+            MESSAGE_HANDLER_LATENCY.observe(time.perf_counter() - started, handler=handler.name)
@@ -0,0 +1,117 @@
+import importlib
+import json
+import os
+import time
+
+from discord import InteractionType
+
+from utils.singleflight import SingleFlight
+
+EXTENSION_MANIFEST_FILE = "data/lazy_commands.json"
+
+
+class ExtensionLoader:
+    """Ładuje cogi jako rozszerzenia discord.ext według listy z konfiguracji.
+
+    Rozszerzenia leniwe nie są ładowane przy starcie - ich komendy są rejestrowane w Discordzie na podstawie
+    manifestu zapisanego przy poprzednim załadowaniu, a sam moduł ładuje się przy pierwszym użyciu komendy.
+    Leniwe rozszerzenie bez wpisu w manifeście jest ładowane od razu, żeby manifest powstał.
+    Dla każdego rozszerzenia mierzony jest czas importu i czas setup()."""
+
+    def __init__(self, bot, extensions, lazy_extensions=(), manifest_file=EXTENSION_MANIFEST_FILE):
+        self.bot = bot
+        self.extensions = list(extensions)
+        self.lazy_extensions = [name for name in lazy_extensions if name not in self.extensions]
+        self.manifest_file = manifest_file
+        self.manifest = self._load_manifest()
+        self.timings = {}
+        self.failed = {}
+        self._loading = SingleFlight("extensions")
+        self._lazy_commands = {}
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self):
+        os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+        with open(self.manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=4, sort_keys=True)
+
+    async def load_all(self):
+        for name in self.extensions:
+            await self.load(name)
+
+        for name in self.lazy_extensions:
+            if name in self.manifest:
+                for command in self.manifest[name]:
+                    self._lazy_commands[command["name"]] = name
+            else:
+                await self.load(name)
+
+    async def load(self, name):
+        if name in self.bot.extensions:
+            return True
+
+        started = time.perf_counter()
+        try:
+            # Import osobno, żeby oddzielić czas ładowania zależności od czasu setup(); load_extension
+            # wykonuje później tylko ciało modułu z już zaimportowanymi zależnościami
+            importlib.import_module(name)
+            imported = time.perf_counter()
+            await self.bot.load_extension(name)
+        except Exception as e:
+            self.failed[name] = e
+            print(f"❌ Nie udało się załadować rozszerzenia {name}: {e}")
+            return False
+
+        self.timings[name] = (imported - started, time.perf_counter() - imported)
+        self.failed.pop(name, None)
+
+        if name in self.lazy_extensions:
+            self._remember_commands(name)
+        return True
+
+    def _remember_commands(self, name):
+        commands = [command.to_dict(self.bot.tree) for command in self.bot.tree.get_commands()
+                    if command.module == name]
+        for command in commands:
+            self._lazy_commands.pop(command["name"], None)
+        if self.manifest.get(name) != commands:
+            self.manifest[name] = commands
+            self._save_manifest()
+
+    async def load_for_interaction(self, interaction):
+        """Ładuje leniwe rozszerzenie, do którego należy wywoływana komenda"""
+        if interaction.type not in (InteractionType.application_command, InteractionType.autocomplete):
+            return
+
+        name = self._lazy_commands.get((interaction.data or {}).get("name"))
+        if name is None:
+            return
+
+        started = time.perf_counter()
+        if await self._loading.do(name, lambda: self.load(name)):
+            print(f"📦 Załadowano leniwe rozszerzenie {name} w {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+    def pending_commands(self):
+        """Definicje komend leniwych rozszerzeń, które nie zostały jeszcze załadowane"""
+        return [
+            command
+            for name in self.lazy_extensions if name not in self.bot.extensions
+            for command in self.manifest.get(name, [])
+        ]
+
+    def report(self):
+        print("📦 Rozszerzenia:")
+        for name in self.extensions + self.lazy_extensions:
+            if name in self.timings:
+                import_time, setup_time = self.timings[name]
+                print(f"  {name:<24} import {import_time * 1000:>7.1f} ms   setup {setup_time * 1000:>7.1f} ms")
+            elif name in self.failed:
+                print(f"  {name:<24} błąd: {self.failed[name]}")
+            else:
+                print(f"  {name:<24} leniwe, ładowane przy pierwszym użyciu")
@@ -0,0 +1,122 @@
+import json
+import os
+
+GUILD_CONFIG_FILE = "data/guild_config.json"
+GUILD_CONFIG_EXAMPLE = "data/guild_config.example.json"
+DEFAULT_SECTION = "default"
+
+
+class GuildConfigError(Exception):
+    pass
+
+
+class GuildConfigStore:
+    """Konfiguracja serwerów (kanały, role) wczytywana z pliku JSON do pamięci.
+
+    Plik ma sekcję "default" dla serwerów bez własnego wpisu i sekcje z ID serwera, które nadpisują jej
+    pojedyncze klucze. Kanały i role (klucze *_id) są zawsze per serwer: w sekcji "default" to pozostałość
+    po starym formacie pliku z jednym serwerem (legacy) i nie są dziedziczone - adopt_legacy() przenosi je
+    do sekcji serwera, do którego należą. Odczyt po ID serwera to O(1). reload() podmienia całą
+    konfigurację naraz, a przy błędzie zostawia poprzednią."""
+
+    def __init__(self, path=GUILD_CONFIG_FILE):
+        self.path = path
+        self._default = {}
+        self._guilds = {}
+        self._values = {}
+        self._listeners = []
+        self.legacy = {}
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        if not isinstance(raw, dict):
+            raise GuildConfigError("plik konfiguracji musi zawierać obiekt JSON")
+
+        default = self._parse_section(DEFAULT_SECTION, raw.get(DEFAULT_SECTION, {}))
+        legacy = {key: value for key, value in default.items() if key.endswith("_id")}
+        default = {key: value for key, value in default.items() if key not in legacy}
+        guilds = {}
+        for key, section in raw.items():
+            if key == DEFAULT_SECTION:
+                continue
+            try:
+                guild_id = int(key)
+            except ValueError:
+                raise GuildConfigError(f"nieprawidłowe ID serwera: {key!r}")
+            guilds[guild_id] = {**default, **self._parse_section(key, section)}
+
+        values = {}
+        for section in [default, *guilds.values()]:
+            for key, value in section.items():
+                values.setdefault(key, set()).add(value)
+
+        self._default = default
+        self._guilds = guilds
+        self._values = {key: frozenset(ids) for key, ids in values.items()}
+        self.legacy = legacy
+
+        for listener in self._listeners:
+            listener(self)
+
+    def reload(self):
+        """Wczytuje plik ponownie; zwraca None albo opis błędu, przy którym konfiguracja się nie zmienia"""
+        try:
+            self.load()
+        except FileNotFoundError:
+            print(f"⚠️ Brak pliku {self.path}, serwery nie mają skonfigurowanych kanałów ani ról "
+                  f"(wzór w {GUILD_CONFIG_EXAMPLE}).")
+            return f"brak pliku {self.path}"
+        except (OSError, ValueError, GuildConfigError) as e:
+            print(f"❌ Błąd wczytywania konfiguracji serwerów: {e}")
+            return str(e)
+        print(f"✅ Wczytano konfigurację {len(self._guilds)} serwerów z {self.path}.")
+        return None
+
+    @staticmethod
+    def _parse_section(name, section):
+        if not isinstance(section, dict):
+            raise GuildConfigError(f"sekcja {name!r} musi być obiektem")
+        parsed = {}
+        for key, value in section.items():
+            if key.endswith("_id"):
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    raise GuildConfigError(f"{name}.{key}: oczekiwano ID, otrzymano {value!r}")
+            parsed[key] = value
+        return parsed
+
+    def add_listener(self, callback):
+        """Rejestruje funkcję wywoływaną po każdym udanym wczytaniu konfiguracji"""
+        self._listeners.append(callback)
+
+    def get(self, guild_id, key, default=None):
+        return self._guilds.get(guild_id, self._default).get(key, default)
+
+    def values(self, key):
+        """Wszystkie wartości klucza we wszystkich serwerach, np. kanały do obsługi w zadaniach w tle"""
+        return self._values.get(key, frozenset())
+
+    def adopt_legacy(self, guild_id):
+        """Przenosi kanały i role z sekcji "default" do sekcji serwera guild_id (bez nadpisywania jego
+        własnych wartości), zapisuje plik i wczytuje go ponownie"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        default = raw.get(DEFAULT_SECTION, {})
+        moved = {key: value for key, value in default.items() if key.endswith("_id")}
+        raw[DEFAULT_SECTION] = {key: value for key, value in default.items() if key not in moved}
+        raw[str(guild_id)] = {**moved, **raw.get(str(guild_id), {})}
+
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(raw, f, indent=4)
+        os.replace(temporary, self.path)
+        self.load()
+        print(f"✅ Przeniesiono {len(moved)} kanałów i ról z sekcji \"default\" do serwera {guild_id}.")
+
+    def stats(self):
+        return {
+            "guilds": len(self._guilds),
+            "channels": sum(len(ids) for key, ids in self._values.items() if key.endswith("_channel_id"))
+        }
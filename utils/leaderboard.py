@@ -0,0 +1,199 @@
+from utils.activity import HOUR, MINUTE, MINUTE_BUCKETS
+
+# Okna rankingów: (szerokość kubełka, liczba kubełków) - takie same jak ActivitySeries.last() dla 24h i 7d
+LEADERBOARD_WINDOWS = {
+    "24h": (MINUTE, MINUTE_BUCKETS),
+    "7d": (HOUR, 168),
+}
+
+
+class RankIndex:
+    """Ranking użytkowników aktualizowany przy każdej wiadomości.
+
+    order to lista użytkowników posortowana malejąco po liczniku, a użytkownicy z tym samym licznikiem
+    tworzą ciągłą grupę [start[count], end[count]). Zmiana licznika o 1 przenosi użytkownika na brzeg
+    jego grupy zamianą z innym użytkownikiem i przesuwa granicę grupy, więc aktualizacja, pozycja
+    i top N nie wymagają sortowania. Miejsce w rankingu to liczba użytkowników z większym licznikiem + 1."""
+
+    def __init__(self):
+        self.order = []
+        self.position = {}
+        self.counts = {}
+        self.start = {}
+        self.end = {}
+
+    def __len__(self):
+        return len(self.order)
+
+    def load(self, counts):
+        """Buduje ranking od zera z {user_id: licznik} jednym sortowaniem"""
+        self.counts = {user_id: count for user_id, count in counts.items() if count > 0}
+        self.order = sorted(self.counts, key=self.counts.__getitem__, reverse=True)
+        self.position = {user_id: position for position, user_id in enumerate(self.order)}
+        self.start, self.end = {}, {}
+        for position, user_id in enumerate(self.order):
+            count = self.counts[user_id]
+            self.start.setdefault(count, position)
+            self.end[count] = position + 1
+
+    def _swap(self, i, j):
+        if i != j:
+            order = self.order
+            order[i], order[j] = order[j], order[i]
+            self.position[order[i]] = i
+            self.position[order[j]] = j
+
+    def _increment(self, user_id):
+        count = self.counts.get(user_id, 0)
+        if not count:
+            self.position[user_id] = len(self.order)
+            self.order.append(user_id)
+            self.counts[user_id] = 1
+            # Grupa 1 zawsze jest na końcu listy
+            if 1 in self.start:
+                self.end[1] += 1
+            else:
+                self.start[1], self.end[1] = len(self.order) - 1, len(self.order)
+            return
+
+        first = self.start[count]
+        self._swap(self.position[user_id], first)
+        self._shrink(count, first + 1, self.end[count])
+        if count + 1 in self.start:
+            self.end[count + 1] = first + 1
+        else:
+            self.start[count + 1], self.end[count + 1] = first, first + 1
+        self.counts[user_id] = count + 1
+
+    def _decrement(self, user_id):
+        count = self.counts[user_id]
+        last = self.end[count] - 1
+        self._swap(self.position[user_id], last)
+        self._shrink(count, self.start[count], last)
+        if count == 1:
+            # Grupa 1 jest ostatnia, więc użytkownik jest teraz na końcu listy
+            self.order.pop()
+            del self.position[user_id]
+            del self.counts[user_id]
+            return
+
+        if count - 1 in self.start:
+            self.start[count - 1] = last
+        else:
+            self.start[count - 1], self.end[count - 1] = last, last + 1
+        self.counts[user_id] = count - 1
+
+    def _shrink(self, count, start, end):
+        if start < end:
+            self.start[count], self.end[count] = start, end
+        else:
+            del self.start[count]
+            del self.end[count]
+
+    def add(self, user_id, delta=1):
+        for _ in range(delta):
+            self._increment(user_id)
+        for _ in range(-delta):
+            self._decrement(user_id)
+
+    def count(self, user_id):
+        return self.counts.get(user_id, 0)
+
+    def rank(self, user_id):
+        """Miejsce użytkownika (remisy dzielą miejsce) lub None, jeśli nie ma wiadomości"""
+        count = self.counts.get(user_id)
+        return self.start[count] + 1 if count else None
+
+    def top(self, size):
+        """Lista (miejsce, user_id, licznik) pierwszych size użytkowników"""
+        return [(self.start[self.counts[user_id]] + 1, user_id, self.counts[user_id]) for user_id in self.order[:size]]
+
+    def around(self, user_id, radius):
+        """Lista (miejsce, user_id, licznik) użytkowników do radius pozycji wokół user_id"""
+        position = self.position.get(user_id)
+        if position is None:
+            return []
+        neighbours = self.order[max(0, position - radius):position + radius + 1]
+        return [(self.start[self.counts[other]] + 1, other, self.counts[other]) for other in neighbours]
+
+
+class WindowRankIndex(RankIndex):
+    """RankIndex licznika wiadomości z ostatnich size kubełków o szerokości width sekund.
+
+    Wiadomości są zapamiętywane w harmonogramie {kubełek: {user_id: liczba}}; advance() odejmuje
+    kubełki, które wypadły z okna, więc ranking okna jest aktualizowany przyrostowo jak ranking całkowity."""
+
+    def __init__(self, width, size):
+        super().__init__()
+        self.width = width
+        self.size = size
+        self.schedule = {}
+        self.expired_through = None
+
+    def add_message(self, user_id, timestamp, now, amount=1):
+        self.advance(now)
+        # Wiadomość "z przyszłości" (różnica zegarów z Discordem) trafia do bieżącego kubełka
+        bucket = min(int(timestamp), int(now)) // self.width
+        if bucket <= self.expired_through:
+            return
+        bucket_counts = self.schedule.setdefault(bucket, {})
+        bucket_counts[user_id] = bucket_counts.get(user_id, 0) + amount
+        self.add(user_id, amount)
+
+    def advance(self, now):
+        threshold = int(now) // self.width - self.size
+        if self.expired_through is None:
+            self.expired_through = threshold
+            return
+        if threshold <= self.expired_through:
+            return
+
+        if threshold - self.expired_through <= len(self.schedule):
+            expired = range(self.expired_through + 1, threshold + 1)
+        else:
+            # Długa przerwa (np. bot był wyłączony) - taniej przejrzeć harmonogram niż wszystkie kubełki
+            expired = sorted(bucket for bucket in self.schedule if bucket <= threshold)
+        for bucket in expired:
+            for user_id, amount in self.schedule.pop(bucket, {}).items():
+                self.add(user_id, -amount)
+        self.expired_through = threshold
+
+    def load_rings(self, rings, now):
+        """Odtwarza okno z {user_id: RingSeries} o tej samej szerokości kubełka (po restarcie)"""
+        self.schedule = {}
+        self.expired_through = int(now) // self.width - self.size
+        totals = {}
+        for user_id, ring in rings.items():
+            for start, amount in ring.items(now):
+                bucket = start // self.width
+                if amount and bucket > self.expired_through:
+                    self.schedule.setdefault(bucket, {})[user_id] = amount
+                    totals[user_id] = totals.get(user_id, 0) + amount
+        self.load(totals)
+
+
+class GuildLeaderboard:
+    """Rankingi jednego serwera: całkowity ("all") i okna z windows (domyślnie LEADERBOARD_WINDOWS)"""
+
+    def __init__(self, windows=LEADERBOARD_WINDOWS):
+        self.windows = windows
+        self.scopes = {"all": RankIndex()}
+        self.scopes.update((name, WindowRankIndex(width, size)) for name, (width, size) in windows.items())
+
+    def load(self, counts, series, now):
+        """Buduje rankingi z liczników {user_id: licznik} i serii {user_id: ActivitySeries}"""
+        self.scopes["all"].load(counts)
+        for name, (width, _) in self.windows.items():
+            resolution = "minutes" if width == MINUTE else "hours"
+            self.scopes[name].load_rings({user_id: getattr(s, resolution) for user_id, s in series.items()}, now)
+
+    def add_message(self, user_id, timestamp, now):
+        self.scopes["all"].add(user_id)
+        for name in self.windows:
+            self.scopes[name].add_message(user_id, timestamp, now)
+
+    def scope(self, name, now):
+        index = self.scopes[name]
+        if isinstance(index, WindowRankIndex):
+            index.advance(now)
+        return index
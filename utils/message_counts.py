@@ -0,0 +1,185 @@
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.activity import ActivitySeries
+from utils.sketches import GuildSketches
+
+COUNTS_FILE = "data/yapping.sqlite3"
+
+
+class MessageCountStore:
+    """Trwałe liczniki wiadomości w SQLite (tryb WAL).
+
+    Jak ResponseStore: wszystkie operacje na bazie wykonuje jeden wątek w tle, a zapis to jedna
+    transakcja z paczką wierszy, więc pętla zdarzeń nigdy nie czeka na dysk."""
+
+    def __init__(self, path=COUNTS_FILE):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="message-counts")
+        self._connection = None
+        self.writes = 0
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self):
+        await self._run(self._open)
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS message_counts (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (guild_id, user_id)
+            ) WITHOUT ROWID
+        """)
+        self._create_gaps_table(connection)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS activity_series (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (guild_id, user_id)
+            ) WITHOUT ROWID
+        """)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS activity_sketches (
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                period INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (guild_id, channel_id, kind)
+            ) WITHOUT ROWID
+        """)
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        connection.commit()
+        self._connection = connection
+
+    @staticmethod
+    def _create_gaps_table(connection):
+        # Luki ALL_CHANNELS są per serwer i mają wspólne before_id (początek sesji), więc guild_id należy do klucza
+        primary_key = [row[1] for row in connection.execute("PRAGMA table_info(backfill_gaps)") if row[5]]
+        if primary_key and "guild_id" not in primary_key:
+            connection.execute("ALTER TABLE backfill_gaps RENAME TO backfill_gaps_old")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS backfill_gaps (
+                channel_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                after_id INTEGER NOT NULL,
+                before_id INTEGER NOT NULL,
+                PRIMARY KEY (channel_id, guild_id, before_id)
+            ) WITHOUT ROWID
+        """)
+        if primary_key and "guild_id" not in primary_key:
+            connection.execute("INSERT INTO backfill_gaps SELECT channel_id, guild_id, after_id, before_id "
+                               "FROM backfill_gaps_old")
+            connection.execute("DROP TABLE backfill_gaps_old")
+
+    async def close(self):
+        if self._connection:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=False)
+
+    async def load_counts(self):
+        """Wszystkie liczniki jako lista (guild_id, user_id, count)"""
+        return await self._run(self._load_counts)
+
+    def _load_counts(self):
+        return self._connection.execute("SELECT guild_id, user_id, count FROM message_counts").fetchall()
+
+    async def load_series(self):
+        """Serie aktywności jako lista (guild_id, user_id, ActivitySeries); user_id 0 to cały serwer"""
+        return await self._run(self._load_series)
+
+    def _load_series(self):
+        rows = self._connection.execute("SELECT guild_id, user_id, data FROM activity_series").fetchall()
+        return [(guild_id, user_id, ActivitySeries.unpack(data)) for guild_id, user_id, data in rows]
+
+    async def load_sketches(self):
+        """Szkice trybu przybliżonego jako lista (guild_id, channel_id, okres, numer okresu, bajty)"""
+        return await self._run(self._load_sketches)
+
+    def _load_sketches(self):
+        rows = self._connection.execute(
+            "SELECT guild_id, channel_id, kind, period, data FROM activity_sketches"
+        ).fetchall()
+        return [(*row[:4], GuildSketches.unpack(row[4])) for row in rows]
+
+    async def load_gaps(self):
+        """Nieprzeliczone zakresy historii jako lista (channel_id, guild_id, after_id, before_id)"""
+        return await self._run(self._load_gaps)
+
+    def _load_gaps(self):
+        return self._connection.execute(
+            "SELECT channel_id, guild_id, after_id, before_id FROM backfill_gaps ORDER BY channel_id, before_id"
+        ).fetchall()
+
+    async def load_meta(self):
+        return await self._run(self._load_meta)
+
+    def _load_meta(self):
+        return dict(self._connection.execute("SELECT key, value FROM meta").fetchall())
+
+    async def reset_counts(self):
+        await self._run(self._reset_counts)
+
+    def _reset_counts(self):
+        with self._connection:
+            self._connection.execute("DELETE FROM message_counts")
+            self._connection.execute("DELETE FROM backfill_gaps")
+            self._connection.execute("DELETE FROM activity_series")
+            self._connection.execute("DELETE FROM activity_sketches")
+            # Punkty wznowienia starych liczników nie mogą przesunąć początku pełnego przeliczania
+            self._connection.execute("DELETE FROM meta WHERE key LIKE 'live_until%'")
+
+    async def save(self, counts, gaps=None, meta=None, series=(), sketches=()):
+        """Zapisuje w jednej transakcji bezwzględne liczniki (guild_id, user_id, count), opcjonalnie pełną
+        listę luk historii, wartości meta, migawki serii aktywności (guild_id, user_id, snapshot) i szkiców
+        (guild_id, channel_id, okres, numer okresu, snapshot) - dzięki temu liczniki, serie i punkty
+        wznowienia są zawsze spójne"""
+        await self._run(self._save, counts, gaps, meta, series, sketches)
+
+    def _save(self, counts, gaps, meta, series, sketches):
+        # Kompresja w wątku bazy, żeby nie obciążać pętli zdarzeń
+        series = [(guild_id, user_id, ActivitySeries.pack(snapshot)) for guild_id, user_id, snapshot in series]
+        sketches = [(*row[:4], GuildSketches.pack(row[4])) for row in sketches]
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO message_counts (guild_id, user_id, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (guild_id, user_id) DO UPDATE SET count = excluded.count",
+                counts
+            )
+            self._connection.executemany(
+                "INSERT INTO activity_series (guild_id, user_id, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (guild_id, user_id) DO UPDATE SET data = excluded.data",
+                series
+            )
+            self._connection.executemany(
+                "INSERT INTO activity_sketches (guild_id, channel_id, kind, period, data) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (guild_id, channel_id, kind) DO UPDATE SET period = excluded.period, data = excluded.data",
+                sketches
+            )
+            if gaps is not None:
+                self._connection.execute("DELETE FROM backfill_gaps")
+                self._connection.executemany(
+                    "INSERT INTO backfill_gaps (channel_id, guild_id, after_id, before_id) VALUES (?, ?, ?, ?)",
+                    gaps
+                )
+            if meta:
+                self._connection.executemany(
+                    "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                    meta.items()
+                )
+        self.writes += len(counts)
@@ -0,0 +1,42 @@
+from collections import deque
+
+import discord
+
+BOT_MESSAGE_INDEX_SIZE = 5000
+
+
+class MessageIdIndex:
+    """Ograniczony indeks ID wiadomości wysłanych przez bota (bufor cykliczny + zbiór).
+
+    floor to najmniejsze ID, od którego indeks jest kompletny: ID >= floor, którego nie ma w indeksie,
+    na pewno nie należy do bota. O starsze wiadomości trzeba zapytać API."""
+
+    def __init__(self, max_size=BOT_MESSAGE_INDEX_SIZE):
+        self.max_size = max_size
+        self._order = deque()
+        self._ids = set()
+        self.floor = discord.utils.time_snowflake(discord.utils.utcnow())
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, message_id):
+        return message_id in self._ids
+
+    def add(self, message_id):
+        if message_id in self._ids:
+            return
+
+        self._order.append(message_id)
+        self._ids.add(message_id)
+        if len(self._order) > self.max_size:
+            evicted = self._order.popleft()
+            self._ids.discard(evicted)
+            self.floor = max(self.floor, evicted + 1)
+
+    def covers(self, message_id):
+        return message_id >= self.floor
+
+    def mark_gap(self):
+        """Wywoływane po nowej sesji gateway - wiadomości z czasu rozłączenia mogły zostać pominięte"""
+        self.floor = max(self.floor, discord.utils.time_snowflake(discord.utils.utcnow()))
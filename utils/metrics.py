@@ -0,0 +1,219 @@
+import bisect
+import contextlib
+import time
+from collections import defaultdict
+
+from aiohttp import web
+from discord import app_commands
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+METRICS_HOST = "127.0.0.1"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [*zip(labelnames, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), func=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.func = func
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _current(self):
+        """Wartości do eksportu; func zwraca liczbę albo, dla metryki z etykietami, {wartości etykiet: liczba}"""
+        if self.func is None:
+            return self.values
+        values = self.func()
+        if not self.labelnames:
+            return {(): values}
+        return {tuple(str(value) for value in key): value for key, value in values.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(Metric):
+    """Licznik; z funkcją odczytuje licznik prowadzony przez obiekt dopiero przy eksporcie"""
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=(), func=None):
+        super().__init__(name, documentation, labelnames, func)
+        self.values = defaultdict(float)
+
+    def inc(self, amount=1, **labels):
+        self.values[self._key(labels)] += amount
+
+    def _samples(self):
+        for key, value in sorted(self._current().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Gauge(Metric):
+    """Wartość bieżąca; z funkcją odczytywana dopiero przy eksporcie"""
+    type = "gauge"
+
+    def set(self, value, **labels):
+        self.values[self._key(labels)] = value
+
+    def _samples(self):
+        for key, value in sorted(self._current().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram(Metric):
+    """Histogram o stałych kubełkach; observe() to wyszukiwanie binarne i dwa dodawania"""
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels):
+        """Liczności kubełków (nieskumulowane), suma i liczba obserwacji dla jednego zestawu etykiet"""
+        counts, total = self.series.get(self._key(labels), [[0] * (len(self.buckets) + 1), 0.0])
+        return list(counts), total, sum(counts)
+
+    def _samples(self):
+        for key, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", bound)])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"metryka {metric.name} jest już zarejestrowana")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=(), func=None):
+        return self._register(Counter(name, documentation, labelnames, func))
+
+    def gauge(self, name, documentation, labelnames=(), func=None):
+        return self._register(Gauge(name, documentation, labelnames, func))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+COMMAND_LATENCY = REGISTRY.histogram(
+    "discord_app_command_duration_seconds", "Czas obsługi komendy aplikacji", ("command", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "upstream_http_request_duration_seconds", "Czas zapytań HTTP do zewnętrznych API", ("host", "status"))
+MESSAGES = REGISTRY.counter(
+    "discord_messages_total", "Wiadomości obsłużone przez on_message")
+MESSAGE_HANDLER_LATENCY = REGISTRY.histogram(
+    "discord_message_handler_duration_seconds", "Czas handlerów wiadomości", ("handler",))
+MESSAGE_HANDLER_ERRORS = REGISTRY.counter(
+    "discord_message_handler_errors_total", "Wyjątki w handlerach wiadomości", ("handler",))
+TASK_DURATION = REGISTRY.histogram(
+    "background_task_duration_seconds", "Czas jednego przebiegu zadania w tle", ("task",))
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """Drzewo komend mierzące czas każdej komendy aplikacji od sprawdzenia interakcji do zakończenia"""
+
+    def __init__(self, client, *args, **kwargs):
+        super().__init__(client, *args, **kwargs)
+        client.add_listener(self._on_completion, "on_app_command_completion")
+
+    async def interaction_check(self, interaction):
+        interaction.extras["metrics_started"] = time.perf_counter()
+        return True
+
+    def _observe(self, interaction, status):
+        started = interaction.extras.get("metrics_started")
+        if started is not None and interaction.command is not None:
+            COMMAND_LATENCY.observe(time.perf_counter() - started,
+                                    command=interaction.command.qualified_name, status=status)
+
+    async def _on_completion(self, interaction, command):
+        self._observe(interaction, "ok")
+
+    async def on_error(self, interaction, error):
+        self._observe(interaction, "error")
+        await super().on_error(interaction, error)
+
+
+class MetricsServer:
+    """Lokalny endpoint /metrics w formacie tekstowym Prometheusa"""
+
+    def __init__(self, port, registry=REGISTRY, host=METRICS_HOST):
+        self.port = port
+        self.host = host
+        self.registry = registry
+        self.runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, self.host, self.port).start()
+        except OSError as e:
+            # Zajęty port (np. drugi proces z SHARD_IDS) nie może zatrzymać bota - działa dalej bez metryk
+            print(f"❌ Nie udało się uruchomić endpointu metryk na porcie {self.port}, metryki wyłączone: {e}")
+            await self.close()
+            return
+        print(f"📈 Metryki dostępne pod http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_metrics(self, request):
+        return web.Response(body=self.registry.render().encode(),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
@@ -0,0 +1,43 @@
+import os
+
+RAIDS_FILE = "data/raids.txt"
+
+
+class RaidCatalog:
+    """Lista raidów z pliku raids.txt, wczytywana raz i przeładowywana tylko po zmianie pliku"""
+
+    def __init__(self, path=RAIDS_FILE):
+        self.path = path
+        self.mtime = None
+        self.slugs = []
+        self.names = {}
+        self.curve_fields = ""
+
+    def __len__(self):
+        return len(self.slugs)
+
+    def reload_if_changed(self):
+        """Przeładowuje katalog, jeśli zmienił się czas modyfikacji pliku. Zwraca True po przeładowaniu."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            if self.mtime is not None:
+                print(f"❌ Plik {self.path} zniknął, zachowuję ostatnią listę raidów.")
+            return False
+
+        if mtime == self.mtime:
+            return False
+
+        with open(self.path, 'r') as f:
+            raids_line = f.readline().strip()
+
+        slugs = [slug for slug in raids_line.split(':')[1:] if slug]
+        self.slugs = slugs
+        self.names = {slug: slug.replace("-", " ").title() for slug in slugs}
+        self.curve_fields = "raid_achievement_curve:" + ":".join(slugs) if slugs else ""
+        self.mtime = mtime
+        print(f"✅ Wczytano {len(slugs)} raidów z {self.path}.")
+        return True
+
+    def display_name(self, slug):
+        return self.names.get(slug) or slug.replace("-", " ").title()
@@ -0,0 +1,126 @@
+import asyncio
+import datetime
+import heapq
+import itertools
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+
+from utils.metrics import REGISTRY
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+# Wszystkie żywe limitery; metryki czytają je przy eksporcie, więc przeładowany cog nie zostawia starych wpisów
+_SCHEDULERS = weakref.WeakSet()
+
+
+def _per_host(attribute):
+    return lambda: {(scheduler.name,): getattr(scheduler, attribute) for scheduler in list(_SCHEDULERS)}
+
+
+UPSTREAM_QUEUE_DEPTH = REGISTRY.gauge(
+    "upstream_queue_depth", "Zapytania czekające na token limitu zewnętrznego API", ("host",),
+    func=_per_host("queue_depth"))
+UPSTREAM_TOKENS = REGISTRY.gauge(
+    "upstream_rate_limit_tokens", "Dostępne tokeny limitu zewnętrznego API", ("host",),
+    func=_per_host("available_tokens"))
+UPSTREAM_BLOCKED = REGISTRY.gauge(
+    "upstream_rate_limit_blocked_seconds", "Pozostały czas wstrzymania zapytań po odpowiedzi 429", ("host",),
+    func=_per_host("blocked_for"))
+UPSTREAM_THROTTLED = REGISTRY.counter(
+    "upstream_rate_limit_throttled_total", "Wstrzymania zapytań po odpowiedzi 429", ("host",),
+    func=_per_host("throttled"))
+
+
+def parse_retry_after(value, default):
+    """Zamienia nagłówek Retry-After (sekundy albo data HTTP) na liczbę sekund"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class TokenBucketScheduler:
+    """Kolejka zapytań do jednego zewnętrznego API z limitem token bucket i priorytetami"""
+
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.throttled = 0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters = []
+        self._counter = itertools.count()
+        self._pump = None
+        _SCHEDULERS.add(self)
+
+    @property
+    def queue_depth(self):
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    @property
+    def available_tokens(self):
+        elapsed = time.monotonic() - self._updated
+        return min(self.burst, self.tokens + max(0.0, elapsed) * self.rate)
+
+    @property
+    def blocked_for(self):
+        return max(0.0, self._blocked_until - time.monotonic())
+
+    async def acquire(self, priority=PRIORITY_INTERACTIVE):
+        """Czeka na wolny token; zapytania interaktywne wyprzedzają masowe"""
+        now = self._refill()
+        if not self._waiters and now >= self._blocked_until and self.tokens >= 1:
+            self.tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run())
+        await future
+
+    def retry_after(self, seconds):
+        """Wstrzymuje wszystkie zapytania do API na podany czas, np. po odpowiedzi 429"""
+        self.throttled += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._updated = self._blocked_until
+        self.tokens = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        if now > self._updated:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+        return now
+
+    async def _run(self):
+        while self._waiters:
+            _, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+
+            now = self._refill()
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+                continue
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+
+            self.tokens -= 1
+            heapq.heappop(self._waiters)
+            future.set_result(None)
@@ -0,0 +1,88 @@
+import os
+from collections import Counter, defaultdict
+
+import discord
+
+NO_GUILD = None
+
+
+def shard_for_guild(guild_id, shard_count):
+    """Numer sharda obsługującego serwer, wg wzoru z dokumentacji Discorda"""
+    return (guild_id >> 22) % (shard_count or 1)
+
+
+def in_process(bot, guild_id):
+    """Czy serwer należy do shardów tego procesu (SHARD_IDS), niezależnie od stanu połączenia"""
+    if not isinstance(bot, discord.AutoShardedClient) or bot.shard_ids is None:
+        return True
+    return shard_for_guild(guild_id, bot.shard_count) in bot.shard_ids
+
+
+def owns_guild(bot, guild_id):
+    """Czy serwer należy do sharda obsługiwanego przez ten proces i czy shard jest połączony.
+
+    W trybie bez shardów zawsze True. Pozwala zadaniom w tle pomijać serwery innych procesów
+    i serwery shardów, które właśnie łączą się ponownie."""
+    if not isinstance(bot, discord.AutoShardedClient):
+        return True
+    if not in_process(bot, guild_id):
+        return False
+    shard = bot.get_shard(shard_for_guild(guild_id, bot.shard_count))
+    return shard is not None and not shard.is_closed()
+
+
+def process_data_path(bot, path):
+    """Plik danych tego procesu. Gdy SHARD_IDS dzieli shardy między procesy, każdy proces ma własne pliki
+    (np. data/yapping.shards-0-1-of-4.sqlite3), żeby procesy nie nadpisywały sobie nawzajem danych."""
+    if not isinstance(bot, discord.AutoShardedClient) or bot.shard_ids is None:
+        return path
+    root, extension = os.path.splitext(path)
+    shards = "-".join(str(shard_id) for shard_id in sorted(bot.shard_ids))
+    return f"{root}.shards-{shards}-of-{bot.shard_count}{extension}"
+
+
+class ShardEventCounter:
+    """Liczy zdarzenia gateway per shard; shard wyznaczany jest z serwera, którego dotyczy zdarzenie"""
+
+    def __init__(self):
+        self.events = defaultdict(Counter)
+
+    def record(self, bot, event_name, args):
+        self.events[self._shard_of(bot, args)][event_name] += 1
+
+    @staticmethod
+    def _shard_of(bot, args):
+        if not args:
+            return NO_GUILD
+
+        arg = args[0]
+        guild = arg if isinstance(arg, discord.Guild) else getattr(arg, "guild", None)
+        if isinstance(guild, discord.Guild):
+            return guild.shard_id
+
+        guild_id = getattr(arg, "guild_id", None)
+        if guild_id is not None:
+            return shard_for_guild(guild_id, bot.shard_count)
+        return NO_GUILD
+
+    def stats(self, bot):
+        """Opóźnienie, liczba serwerów i zdarzeń dla każdego sharda tego procesu"""
+        if isinstance(bot, discord.AutoShardedClient):
+            latencies = dict(bot.latencies)
+        else:
+            latencies = {bot.shard_id or 0: bot.latency}
+
+        guilds = Counter(guild.shard_id for guild in bot.guilds)
+        return {
+            shard_id: {
+                "latency_ms": latency * 1000,
+                "guilds": guilds[shard_id],
+                "events": sum(self.events[shard_id].values()),
+                "top_events": self.events[shard_id].most_common(3)
+            }
+            for shard_id, latency in sorted(latencies.items())
+        }
+
+    def unassigned(self):
+        """Zdarzenia niezwiązane z żadnym serwerem (np. wiadomości prywatne, zdarzenia klienta)"""
+        return sum(self.events[NO_GUILD].values())
@@ -0,0 +1,56 @@
+import asyncio
+import weakref
+
+from utils.metrics import REGISTRY
+
+_GROUPS = weakref.WeakSet()
+
+SINGLEFLIGHT_CALLS = REGISTRY.counter(
+    "singleflight_calls_total", "Wywołania SingleFlight: leader wykonuje zapytanie, follower dołącza do trwającego",
+    ("group", "role"),
+    func=lambda: {(group.name, role): count for group in list(_GROUPS)
+                  for role, count in (("leader", group.leaders), ("follower", group.followers))})
+SINGLEFLIGHT_IN_FLIGHT = REGISTRY.gauge(
+    "singleflight_in_flight", "Zapytania w locie", ("group",),
+    func=lambda: {(group.name,): len(group) for group in list(_GROUPS)})
+
+class SingleFlight:
+    """Łączy równoczesne wywołania o tym samym kluczu w jedno zapytanie w locie"""
+
+    def __init__(self, name="default"):
+        self.name = name
+        self._calls = {}
+        self.leaders = 0
+        self.followers = 0
+        _GROUPS.add(self)
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, func):
+        """Wywołuje func() albo dołącza do już trwającego wywołania z tym samym kluczem"""
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.followers += 1
+
+        # shield: anulowanie jednego z oczekujących nie przerywa zapytania pozostałym
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Odczyt wyjątku, żeby asyncio nie logował go, gdy wszyscy oczekujący zostali anulowani
+            task.exception()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "followers": self.followers
+        }
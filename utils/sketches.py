@@ -0,0 +1,232 @@
+import hashlib
+import math
+import struct
+import zlib
+from array import array
+
+from utils.activity import DAY
+
+HLL_PRECISION = 12
+CMS_WIDTH = 2048
+CMS_DEPTH = 4
+HEAVY_HITTERS = 20
+
+# Okresy szkiców: numer okresu dla znacznika czasu (UTC); tygodnie zaczynają się w poniedziałek
+SKETCH_PERIODS = {
+    "day": lambda timestamp: int(timestamp) // DAY,
+    "week": lambda timestamp: (int(timestamp) // DAY + 3) // 7,
+}
+
+
+def _hash(value, size):
+    return hashlib.blake2b(value.to_bytes(8, "little"), digest_size=size).digest()
+
+
+class HyperLogLog:
+    """Przybliżona liczba różnych wartości w 2^precision bajtach.
+
+    Względny błąd standardowy to 1.04 / sqrt(2^precision), np. 1.6% dla precision 12 (4 KB)."""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @property
+    def error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, value):
+        hashed = int.from_bytes(_hash(value, 8), "little")
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Mała liczność: zliczanie liniowe jest dokładniejsze
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data, precision=HLL_PRECISION):
+        sketch = cls(precision)
+        if len(data) != len(sketch.registers):
+            return None
+        sketch.registers = bytearray(data)
+        return sketch
+
+
+class CountMinSketch:
+    """Przybliżone liczniki per klucz w tablicy depth x width oraz lista heavy_hitters największych kluczy.
+
+    Oszacowanie nigdy nie jest mniejsze od prawdziwej wartości, a z prawdopodobieństwem 1 - δ zawyża ją
+    najwyżej o ε·N, gdzie ε = e / width, δ = e^-depth, N to suma wszystkich liczników."""
+
+    # Nagłówek: suma liczników, width, depth
+    _HEADER = struct.Struct("<qII")
+    _HITTER = struct.Struct("<qq")
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH, heavy_hitters=HEAVY_HITTERS):
+        self.width = width
+        self.depth = depth
+        self.size = heavy_hitters
+        self.table = array("I", bytes(4 * width * depth))
+        self.total = 0
+        self.hitters = {}
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    def _cells(self, key):
+        rows = struct.unpack(f"<{self.depth}I", _hash(key, 4 * self.depth))
+        return [row * self.width + hashed % self.width for row, hashed in enumerate(rows)]
+
+    def add(self, key, amount=1):
+        cells = self._cells(key)
+        table = self.table
+        for cell in cells:
+            table[cell] += amount
+        self.total += amount
+
+        estimate = min(table[cell] for cell in cells)
+        if key in self.hitters or len(self.hitters) < self.size:
+            self.hitters[key] = estimate
+        else:
+            smallest = min(self.hitters, key=self.hitters.__getitem__)
+            if estimate > self.hitters[smallest]:
+                del self.hitters[smallest]
+                self.hitters[key] = estimate
+
+    def estimate(self, key):
+        return min(self.table[cell] for cell in self._cells(key))
+
+    def top(self, size):
+        """Lista (klucz, oszacowanie) największych kluczy spośród śledzonych"""
+        return sorted(self.hitters.items(), key=lambda item: item[1], reverse=True)[:size]
+
+    def to_bytes(self):
+        return b"".join((
+            self._HEADER.pack(self.total, self.width, self.depth),
+            self.table.tobytes(),
+            *(self._HITTER.pack(key, count) for key, count in self.hitters.items())
+        ))
+
+    @classmethod
+    def from_bytes(cls, data, width=CMS_WIDTH, depth=CMS_DEPTH, heavy_hitters=HEAVY_HITTERS):
+        sketch = cls(width, depth, heavy_hitters)
+        table_end = cls._HEADER.size + 4 * width * depth
+        if len(data) < table_end or (len(data) - table_end) % cls._HITTER.size:
+            return None
+        sketch.total, stored_width, stored_depth = cls._HEADER.unpack_from(data)
+        if (stored_width, stored_depth) != (width, depth):
+            return None
+        sketch.table = array("I", data[cls._HEADER.size:table_end])
+        hitters = sorted(cls._HITTER.iter_unpack(data[table_end:]), key=lambda item: item[1], reverse=True)
+        sketch.hitters = dict(hitters[:heavy_hitters])
+        return sketch
+
+
+class GuildSketches:
+    """Szkice aktywności jednego serwera dla bieżącego dnia i tygodnia (SKETCH_PERIODS).
+
+    Każdy kanał ma HyperLogLog różnych piszących, a serwer CountMinSketch wiadomości użytkowników.
+    Po zmianie okresu szkic jest zastępowany pustym, więc pamięć zależy tylko od liczby kanałów
+    i parametrów szkiców, a nie od liczby użytkowników."""
+
+    def __init__(self, precision=HLL_PRECISION, width=CMS_WIDTH, depth=CMS_DEPTH, heavy_hitters=HEAVY_HITTERS):
+        self.precision = precision
+        self.width = width
+        self.depth = depth
+        self.heavy_hitters = heavy_hitters
+        # (channel_id, okres) -> [numer okresu, szkic]; channel_id 0 to CountMinSketch serwera
+        self.sketches = {}
+        self.dirty = set()
+
+    def _new(self, channel_id):
+        if channel_id:
+            return HyperLogLog(self.precision)
+        return CountMinSketch(self.width, self.depth, self.heavy_hitters)
+
+    def _current(self, channel_id, kind, timestamp, create=True):
+        period = SKETCH_PERIODS[kind](timestamp)
+        entry = self.sketches.get((channel_id, kind))
+        if entry is None or entry[0] < period:
+            if not create:
+                return None
+            entry = self.sketches[(channel_id, kind)] = [period, self._new(channel_id)]
+        if entry[0] > period and create:
+            # Zapisany okres jest nowszy niż zegar (cofnięty czas, szkic z innej maszyny) - wiadomość trafia
+            # do niego, zamiast zastępować go starszym okresem
+            return entry[1]
+        return entry[1] if entry[0] == period else None
+
+    def add(self, channel_id, user_id, timestamp, now):
+        for kind, period_of in SKETCH_PERIODS.items():
+            # Przeliczana historia trafia tylko do bieżącego okresu; starsze okresy nie są przechowywane
+            if period_of(timestamp) != period_of(now):
+                continue
+            self._current(channel_id, kind, now).add(user_id)
+            self._current(0, kind, now).add(user_id)
+            self.dirty.add((channel_id, kind))
+            self.dirty.add((0, kind))
+
+    def users(self, kind, now):
+        """CountMinSketch bieżącego okresu lub None"""
+        return self._current(0, kind, now, create=False)
+
+    def distinct(self, kind, now):
+        """(liczba różnych piszących na serwerze, [(channel_id, liczba)] malejąco) dla bieżącego okresu"""
+        merged = HyperLogLog(self.precision)
+        channels = []
+        for (channel_id, sketch_kind) in list(self.sketches):
+            if not channel_id or sketch_kind != kind:
+                continue
+            sketch = self._current(channel_id, kind, now, create=False)
+            if sketch is not None:
+                merged.merge(sketch)
+                channels.append((channel_id, sketch.count()))
+        channels.sort(key=lambda item: item[1], reverse=True)
+        return merged.count(), channels
+
+    def rows(self):
+        """Zmienione szkice jako (channel_id, okres, numer okresu, bajty); czyści listę zmian"""
+        dirty, self.dirty = self.dirty, set()
+        return [(channel_id, kind, *self._snapshot(channel_id, kind)) for channel_id, kind in dirty]
+
+    def _snapshot(self, channel_id, kind):
+        period, sketch = self.sketches[(channel_id, kind)]
+        return period, sketch.to_bytes()
+
+    def load(self, channel_id, kind, period, data):
+        if channel_id:
+            sketch = HyperLogLog.from_bytes(data, self.precision)
+        else:
+            sketch = CountMinSketch.from_bytes(data, self.width, self.depth, self.heavy_hitters)
+        # Szkic zapisany z innymi parametrami jest pomijany
+        if sketch is not None:
+            self.sketches[(channel_id, kind)] = [period, sketch]
+
+    @staticmethod
+    def pack(data):
+        return zlib.compress(data, 1)
+
+    @staticmethod
+    def unpack(blob):
+        return zlib.decompress(blob)
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import REGISTRY
+
+STORE_FILE = "data/api_cache.sqlite3"
+STORE_MAX_ROWS = 20000
+
+_STORES = weakref.WeakSet()
+
+
+def _per_store(value):
+    return lambda: {(os.path.basename(store.path), *key): amount
+                    for store in list(_STORES) for key, amount in value(store).items()}
+
+
+STORE_READS = REGISTRY.counter(
+    "response_store_reads_total", "Odczyty trwałego cache odpowiedzi według wyniku", ("store", "result"),
+    func=_per_store(lambda store: {("hit",): store.read_hits, ("miss",): store.reads - store.read_hits}))
+STORE_WRITES = REGISTRY.counter(
+    "response_store_writes_total", "Wiersze zapisane do trwałego cache odpowiedzi", ("store",),
+    func=_per_store(lambda store: {(): store.writes}))
+STORE_PENDING = REGISTRY.gauge(
+    "response_store_pending_writes", "Zapisy buforowane w pamięci do najbliższego flush()", ("store",),
+    func=_per_store(lambda store: {(): len(store._pending)}))
+STORE_PRUNED = REGISTRY.counter(
+    "response_store_pruned_total", "Wiersze usunięte z trwałego cache odpowiedzi", ("store",),
+    func=_per_store(lambda store: {(): store.pruned}))
+
+
+class ResponseStore:
+    """Trwały cache odpowiedzi zewnętrznych API w SQLite (tryb WAL).
+
+    Wszystkie operacje na bazie wykonuje jeden wątek w tle, więc pętla zdarzeń nigdy nie czeka na dysk.
+    Zapisy są buforowane w pamięci i zrzucane paczkami przez flush()."""
+
+    def __init__(self, path=STORE_FILE, max_rows=STORE_MAX_ROWS):
+        self.path = path
+        self.max_rows = max_rows
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-store")
+        self._connection = None
+        self._pending = {}
+        self.reads = 0
+        self.read_hits = 0
+        self.writes = 0
+        self.pruned = 0
+        _STORES.add(self)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self):
+        await self._run(self._open)
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                endpoint TEXT NOT NULL,
+                params TEXT NOT NULL,
+                body TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                stale_until REAL NOT NULL,
+                PRIMARY KEY (endpoint, params)
+            ) WITHOUT ROWID
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS responses_stale_until ON responses (stale_until)")
+        connection.commit()
+        self._connection = connection
+
+    async def close(self):
+        await self.flush()
+        if self._connection:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=False)
+
+    async def get(self, endpoint, params):
+        """Zwraca (wartość, expires_at, stale_until) z czasem uniksowym albo None, jeśli wpisu nie ma lub wygasł"""
+        self.reads += 1
+        row = self._pending.get((endpoint, params))
+        if row is None and self._connection:
+            row = await self._run(self._get, endpoint, params)
+
+        if row is None or row[5] <= time.time():
+            return None
+
+        self.read_hits += 1
+        return json.loads(row[2]), row[4], row[5]
+
+    def _get(self, endpoint, params):
+        return self._connection.execute(
+            "SELECT endpoint, params, body, fetched_at, expires_at, stale_until FROM responses "
+            "WHERE endpoint = ? AND params = ?",
+            (endpoint, params)
+        ).fetchone()
+
+    def put(self, endpoint, params, value, ttl, stale_ttl=0):
+        """Buforuje zapis w pamięci; trafi na dysk przy najbliższym flush()"""
+        now = time.time()
+        self._pending[(endpoint, params)] = (
+            endpoint, params, json.dumps(value), now, now + ttl, now + ttl + stale_ttl
+        )
+
+    async def flush(self):
+        if not self._pending or not self._connection:
+            return 0
+
+        batch = dict(self._pending)
+        await self._run(self._write, list(batch.values()))
+        for key, row in batch.items():
+            # Wpis mógł zostać nadpisany w trakcie zapisu - wtedy zostaje w buforze do kolejnego flush()
+            if self._pending.get(key) is row:
+                del self._pending[key]
+        self.writes += len(batch)
+        return len(batch)
+
+    def _write(self, rows):
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO responses (endpoint, params, body, fetched_at, expires_at, stale_until) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    async def load(self, endpoint, limit):
+        """Zwraca najświeższe niewygasłe wpisy danego endpointu jako listy (params, wartość, expires_at, stale_until)"""
+        if not self._connection:
+            return []
+
+        rows = await self._run(self._load, endpoint, limit)
+        return [(params, json.loads(body), expires_at, stale_until) for params, body, expires_at, stale_until in rows]
+
+    def _load(self, endpoint, limit):
+        return self._connection.execute(
+            "SELECT params, body, expires_at, stale_until FROM responses "
+            "WHERE endpoint = ? AND stale_until > ? ORDER BY fetched_at DESC LIMIT ?",
+            (endpoint, time.time(), limit)
+        ).fetchall()
+
+    async def clear(self):
+        """Usuwa wszystkie wpisy z bufora i z bazy"""
+        self._pending.clear()
+        if self._connection:
+            await self._run(self._clear)
+
+    def _clear(self):
+        with self._connection:
+            self._connection.execute("DELETE FROM responses")
+
+    async def prune(self):
+        """Usuwa wygasłe wpisy i najstarsze wiersze ponad limit max_rows"""
+        if not self._connection:
+            return 0
+
+        removed = await self._run(self._prune)
+        self.pruned += removed
+        return removed
+
+    def _prune(self):
+        with self._connection:
+            removed = self._connection.execute(
+                "DELETE FROM responses WHERE stale_until <= ?", (time.time(),)
+            ).rowcount
+            removed += self._connection.execute(
+                "DELETE FROM responses WHERE (endpoint, params) IN ("
+                "SELECT endpoint, params FROM responses ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,)
+            ).rowcount
+        self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import os
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from utils.metrics import HTTP_LATENCY, REGISTRY
+
+TELEGRAM_HOST = "api.telegram.org"
+TELEGRAM_API_URL = f"https://{TELEGRAM_HOST}"
+TELEGRAM_MESSAGE_LIMIT = 4096
+TELEGRAM_QUEUE_SIZE = 500
+TELEGRAM_BATCH_WINDOW = 1.0
+TELEGRAM_MAX_RETRIES = 5
+TELEGRAM_MAX_BACKOFF = 60
+TELEGRAM_SPILL_FILE = "data/telegram_spill.jsonl"
+
+_BRIDGES = weakref.WeakSet()
+
+TELEGRAM_MESSAGES = REGISTRY.counter(
+    "telegram_messages_total",
+    "Wiadomości Telegram: sent - wysłane, merged - dołączone do innej, failed - nieudane, spilled - zrzucone na dysk",
+    ("result",),
+    func=lambda: {(result,): sum(getattr(bridge, result) for bridge in list(_BRIDGES))
+                  for result in ("sent", "merged", "failed", "spilled")})
+TELEGRAM_QUEUE_DEPTH = REGISTRY.gauge(
+    "telegram_queue_depth", "Wiadomości czekające w kolejce do wysłania na Telegram",
+    func=lambda: sum(bridge.queue.qsize() for bridge in list(_BRIDGES)))
+
+
+class TelegramBridge:
+    """Asynchroniczna kolejka wiadomości wysyłanych na Telegram.
+
+    enqueue() tylko dokłada tekst do kolejki. Worker w tle łączy wiadomości z krótkiego okna w jedną
+    (do limitu długości Telegrama), ponawia wysyłkę z backoffem, a gdy kolejka jest pełna albo
+    wysyłka się nie powiedzie, zrzuca wiadomości do pliku, z którego są wczytywane przy kolejnym starcie."""
+
+    def __init__(self, token, chat_id, queue_size=TELEGRAM_QUEUE_SIZE, spill_file=TELEGRAM_SPILL_FILE):
+        self.url = f"{TELEGRAM_API_URL}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.spill_file = spill_file
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.session = None
+        self._worker = None
+        self._carry = None
+        self._spill_pending = False
+        # Operacje na pliku zrzutu w jednym wątku w tle: pętla nie czeka na dysk, a zapisy nie przeplatają się
+        self._spill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="telegram-spill")
+        self.sent = 0
+        self.merged = 0
+        self.failed = 0
+        self.spilled = 0
+        _BRIDGES.add(self)
+
+    async def start(self):
+        if self._worker and not self._worker.done():
+            return
+
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+        self._worker = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        remaining = [self._carry] if self._carry else []
+        self._carry = None
+        while not self.queue.empty():
+            remaining.append(self.queue.get_nowait())
+        if remaining:
+            await self._run_spill(self._spill, remaining)
+        self._spill_executor.shutdown(wait=False)
+
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def enqueue(self, text):
+        """Dodaje wiadomość do kolejki bez czekania; przy przepełnieniu zrzuca ją na dysk w tle"""
+        try:
+            self.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self._spill_pending = True
+            self._run_spill(self._spill, [text])
+
+    def _run_spill(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self._spill_executor, func, *args)
+
+    def _spill(self, texts):
+        try:
+            directory = os.path.dirname(self.spill_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.spill_file, 'a', encoding='utf-8') as f:
+                for text in texts:
+                    f.write(json.dumps(text) + "\n")
+            self.spilled += len(texts)
+            print(f"⚠️ Zapisano {len(texts)} wiadomości Telegram do {self.spill_file}.")
+        except OSError as e:
+            print(f"❌ Nie udało się zapisać wiadomości Telegram na dysk, odrzucam {len(texts)}: {e}")
+
+    def _take_spilled(self):
+        try:
+            with open(self.spill_file, 'r', encoding='utf-8') as f:
+                texts = [json.loads(line) for line in f if line.strip()]
+            os.remove(self.spill_file)
+            return texts
+        except FileNotFoundError:
+            return []
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"❌ Błąd odczytu zaległych wiadomości Telegram: {e}")
+            return []
+
+    async def _run(self):
+        await self._send_spilled()
+
+        while True:
+            # Wiadomości zrzucone przy przepełnieniu lub po nieudanej wysyłce wysyłamy, gdy tylko kolejka się opróżni
+            if self._spill_pending and self.queue.empty():
+                self._spill_pending = False
+                await self._send_spilled()
+
+            batch = await self._collect()
+            await self._send(batch)
+
+    async def _send_spilled(self):
+        spilled = await self._run_spill(self._take_spilled)
+        if spilled:
+            print(f"📨 Wysyłam {len(spilled)} zaległych wiadomości Telegram.")
+            batches = list(self._pack(spilled))
+            for index, batch in enumerate(batches):
+                if not await self._send(batch):
+                    # Telegram nadal nie odpowiada - reszta wraca na dysk bez kolejnych ponowień
+                    if batches[index + 1:]:
+                        await self._run_spill(self._spill, batches[index + 1:])
+                    return
+
+    async def _collect(self):
+        """Czeka na wiadomość i dołącza kolejne z okna TELEGRAM_BATCH_WINDOW, dopóki mieszczą się w limicie"""
+        if self._carry is not None:
+            texts = [self._carry]
+            self._carry = None
+        else:
+            texts = [await self.queue.get()]
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + TELEGRAM_BATCH_WINDOW
+        length = len(texts[0])
+
+        while length < TELEGRAM_MESSAGE_LIMIT:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                text = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+
+            if length + len(text) + 2 > TELEGRAM_MESSAGE_LIMIT:
+                self._carry = text
+                break
+            texts.append(text)
+            length += len(text) + 2
+
+        self.merged += len(texts) - 1
+        return "\n\n".join(texts)
+
+    @staticmethod
+    def _pack(texts):
+        batch = ""
+        for text in texts:
+            if batch and len(batch) + len(text) + 2 > TELEGRAM_MESSAGE_LIMIT:
+                yield batch
+                batch = ""
+            batch = f"{batch}\n\n{text}" if batch else text
+        if batch:
+            yield batch
+
+    async def _send(self, text):
+        """Wysyła tekst w częściach do limitu Telegrama; nieudane części zrzuca na dysk do ponownej wysyłki"""
+        delivered = True
+        for start in range(0, len(text), TELEGRAM_MESSAGE_LIMIT):
+            chunk = text[start:start + TELEGRAM_MESSAGE_LIMIT]
+            if not await self._send_chunk(chunk):
+                self.failed += 1
+                delivered = False
+                self._spill_pending = True
+                await self._run_spill(self._spill, [chunk])
+        return delivered
+
+    async def _send_chunk(self, text):
+        payload = {
+            "chat_id": self.chat_id,
+            "text": text,
+        }
+
+        for attempt in range(TELEGRAM_MAX_RETRIES):
+            delay = min(TELEGRAM_MAX_BACKOFF, 2 ** attempt)
+            started = time.perf_counter()
+            try:
+                async with self.session.post(self.url, json=payload) as response:
+                    HTTP_LATENCY.observe(time.perf_counter() - started, host=TELEGRAM_HOST, status=response.status)
+                    if response.status == 200:
+                        self.sent += 1
+                        print(f"✅ Wiadomość wysłana na Telegram: {text}")
+                        return True
+
+                    body = await response.text()
+                    if response.status == 429:
+                        try:
+                            delay = json.loads(body)["parameters"]["retry_after"]
+                        except (ValueError, KeyError, TypeError):
+                            pass
+                    elif response.status < 500:
+                        # Błędy 4xx (poza 429) nie znikną po ponowieniu
+                        print(f"❌ Błąd podczas wysyłania wiadomości na Telegram: {body}")
+                        self.failed += 1
+                        return True
+
+                    print(f"❌ Błąd podczas wysyłania wiadomości na Telegram ({response.status}), "
+                          f"ponawiam za {delay}s")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                HTTP_LATENCY.observe(time.perf_counter() - started, host=TELEGRAM_HOST, status="error")
+                print(f"❌ Błąd połączenia z Telegram API: {e}, ponawiam za {delay}s")
+
+            await asyncio.sleep(delay)
+
+        return False
@@ -0,0 +1,103 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from utils.metrics import REGISTRY
+
+WATCHDOG_THRESHOLD = 0.25
+WATCHDOG_INTERVAL = 0.5
+WATCHDOG_KEEP_STALLS = 10
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds", "Opóźnienie pętli zdarzeń mierzone z wątku watchdoga", buckets=LAG_BUCKETS)
+LOOP_STALLS = REGISTRY.counter(
+    "event_loop_stalls_total", "Blokady pętli zdarzeń dłuższe niż próg watchdoga")
+
+
+class LoopWatchdog:
+    """Wykrywa blokowanie pętli zdarzeń z osobnego wątku.
+
+    Wątek co WATCHDOG_INTERVAL wrzuca do pętli callback przez call_soon_threadsafe i mierzy, po jakim
+    czasie zostanie wykonany. Jeśli nie wykona się w czasie progu, zrzuca stos wątku pętli - czyli kod,
+    który ją w tej chwili blokuje. Opóźnienia trafiają do histogramu LOOP_LAG."""
+
+    def __init__(self, threshold=WATCHDOG_THRESHOLD, interval=WATCHDOG_INTERVAL):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls = deque(maxlen=WATCHDOG_KEEP_STALLS)
+        self.max_lag = 0.0
+        self._loop = None
+        self._loop_thread_id = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Uruchamia watchdoga dla bieżącej pętli; wywoływać z wnętrza pętli"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="loop-watchdog", daemon=True)
+        self._thread.start()
+        print(f"🐕 Watchdog pętli zdarzeń włączony (próg {self.threshold * 1000:.0f} ms).")
+
+    def stop(self):
+        if not self.running:
+            return
+        # Bez join: czekanie na wątek blokowałoby pętlę, którą watchdog ma pilnować; wątek kończy się sam
+        self._stop.set()
+        self._thread = None
+        print("🐕 Watchdog pętli zdarzeń wyłączony.")
+
+    def _run(self, stop):
+        while not stop.is_set():
+            executed = threading.Event()
+            sent = time.perf_counter()
+            try:
+                self._loop.call_soon_threadsafe(executed.set)
+            except RuntimeError:
+                # Pętla została zamknięta
+                return
+
+            stalled = False
+            while not executed.wait(self.interval if stalled else self.threshold):
+                if stop.is_set():
+                    return
+                if not stalled:
+                    stalled = True
+                    self._report_stall(time.perf_counter() - sent)
+
+            lag = time.perf_counter() - sent
+            LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if stalled:
+                print(f"🐕 Pętla zdarzeń odblokowana po {lag * 1000:.0f} ms.")
+            stop.wait(self.interval)
+
+    def _report_stall(self, lag):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame else "(brak stosu wątku pętli)\n"
+        LOOP_STALLS.inc()
+        self.stalls.append((time.time(), lag, stack))
+        print(f"⚠️ Pętla zdarzeń zablokowana od ponad {lag * 1000:.0f} ms, stos wątku pętli:\n{stack}", end="")
+
+    def stats(self):
+        counts, total, observed = LOOP_LAG.snapshot()
+        return {
+            "running": self.running,
+            "threshold_ms": self.threshold * 1000,
+            "checks": observed,
+            "avg_lag_ms": total / observed * 1000 if observed else 0.0,
+            "max_lag_ms": self.max_lag * 1000,
+            "stalls": int(LOOP_STALLS.values[()]),
+            "histogram": list(zip((*LAG_BUCKETS, float("inf")), counts))
+        }
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import aiohttp
+
+WCL_TOKEN_URL = "https://www.warcraftlogs.com/oauth/token"
+WCL_GRAPHQL_URL = "https://www.warcraftlogs.com/api/v2/client"
+TOKEN_EXPIRY_MARGIN = 5 * 60
+
+WCL_CLASSES = {
+    1: "Death Knight",
+    2: "Druid",
+    3: "Hunter",
+    4: "Mage",
+    5: "Monk",
+    6: "Paladin",
+    7: "Priest",
+    8: "Rogue",
+    9: "Shaman",
+    10: "Warlock",
+    11: "Warrior",
+    12: "Demon Hunter",
+    13: "Evoker"
+}
+
+
+class WarcraftLogsError(Exception):
+    pass
+
+
+class WarcraftLogsClient:
+    """Klient Warcraft Logs API v2 (GraphQL) z cache tokenu OAuth.
+
+    Zapytania wysyła przez przekazaną funkcję request_json(method, url, priority, **kwargs),
+    dzięki czemu korzystają z tej samej sesji HTTP i limitów co reszta cogu."""
+
+    def __init__(self, request_json, client_id, client_secret):
+        self.request_json = request_json
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+
+    async def access_token(self, priority):
+        async with self._token_lock:
+            if self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+
+            payload = await self.request_json(
+                "POST", WCL_TOKEN_URL, priority,
+                data={"grant_type": "client_credentials"},
+                auth=aiohttp.BasicAuth(self.client_id, self.client_secret)
+            )
+            self._token = payload["access_token"]
+            self._token_expires_at = time.monotonic() + payload.get("expires_in", 3600) - TOKEN_EXPIRY_MARGIN
+            return self._token
+
+    async def query(self, query, variables, priority):
+        for attempt in range(2):
+            token = await self.access_token(priority)
+            try:
+                payload = await self.request_json(
+                    "POST", WCL_GRAPHQL_URL, priority,
+                    json={"query": query, "variables": variables},
+                    headers={"Authorization": f"Bearer {token}"}
+                )
+            except aiohttp.ClientResponseError as e:
+                # Token mógł zostać unieważniony przed czasem - pobieramy nowy i próbujemy raz jeszcze
+                if e.status == 401 and attempt == 0:
+                    self._token = None
+                    continue
+                raise
+            break
+
+        if payload.get("errors") and not payload.get("data"):
+            raise WarcraftLogsError("; ".join(error.get("message", "") for error in payload["errors"]))
+        return payload.get("data") or {}
+
+    async def character_rankings(self, characters, difficulties, priority, region="EU"):
+        """Pobiera rankingi wielu postaci i poziomów trudności jednym zapytaniem z aliasami.
+
+        characters to lista par (nick, serwer). Zwraca listę w tej samej kolejności: dla każdej postaci
+        słownik z kluczami name, class, server i rankings ({difficulty: zoneRankings}) albo None,
+        jeśli WCL nie zna postaci."""
+        variables = {"region": region}
+        declarations = ["$region: String"]
+        selections = []
+        ranking_fields = " ".join(
+            f"d{difficulty}: zoneRankings(difficulty: {difficulty}, timeframe: Historical)"
+            for difficulty in difficulties
+        )
+
+        for index, (name, server) in enumerate(characters):
+            variables[f"n{index}"] = name
+            variables[f"s{index}"] = server.lower()
+            declarations.append(f"$n{index}: String, $s{index}: String")
+            selections.append(
+                f"c{index}: character(name: $n{index}, serverSlug: $s{index}, serverRegion: $region) "
+                f"{{ name classID server {{ name }} {ranking_fields} }}"
+            )
+
+        query = f"query({', '.join(declarations)}) {{ characterData {{ {' '.join(selections)} }} }}"
+        data = await self.query(query, variables, priority)
+        character_data = data.get("characterData") or {}
+
+        results = []
+        for index in range(len(characters)):
+            character = character_data.get(f"c{index}")
+            if not character:
+                results.append(None)
+                continue
+
+            results.append({
+                "name": character.get("name"),
+                "class": WCL_CLASSES.get(character.get("classID"), "Nieznana klasa"),
+                "server": (character.get("server") or {}).get("name"),
+                "rankings": {difficulty: character.get(f"d{difficulty}") or {} for difficulty in difficulties}
+            })
+        return results
@@ -0,0 +1,264 @@
+import asyncio
+import itertools
+import multiprocessing
+import weakref
+from collections import Counter
+
+import discord
+from discord.ext import commands
+
+from utils.extensions import ExtensionLoader
+from utils.guild_config import GuildConfigStore
+from utils.metrics import REGISTRY, InstrumentedCommandTree, MetricsServer
+from utils.telegram import TelegramBridge
+
+WORKER_START_TIMEOUT = 60
+WORKER_STOP_TIMEOUT = 10
+WORKER_CHECK_SECONDS = 5
+TELEGRAM_WORKER = 0
+
+_POOLS = weakref.WeakSet()
+
+WORKER_ALIVE = REGISTRY.gauge(
+    "worker_processes_alive", "Działające procesy robocze",
+    func=lambda: sum(pool.alive for pool in list(_POOLS)))
+WORKER_RESTARTS = REGISTRY.counter(
+    "worker_restarts_total", "Ponowne uruchomienia martwych procesów roboczych",
+    func=lambda: sum(pool.restarts for pool in list(_POOLS)))
+WORKER_JOBS = REGISTRY.counter(
+    "worker_jobs_submitted_total", "Zdarzenia przekazane do procesów roboczych", ("worker",),
+    func=lambda: {(index,): count for pool in list(_POOLS) for index, count in pool.submitted.items()})
+
+
+class WorkerPool:
+    """Pula procesów roboczych, do których proces gateway przekazuje zdarzenia.
+
+    Proces gateway utrzymuje tylko połączenie z Discordem. Surowe zdarzenia INTERACTION_CREATE dla komend
+    z rozszerzeń robotów (i opcjonalnie MESSAGE_CREATE) trafiają przez kolejki multiprocessing do robotów,
+    które przetwarzają je własnym ConnectionState i odpowiadają przez token interakcji po HTTP. Cogi nie
+    wiedzą, w którym procesie działają. Martwe procesy są uruchamiane ponownie z tą samą kolejką zadań."""
+
+    def __init__(self, processes, extensions, telegram=False, forward_messages=False, metrics_port=None):
+        self.size = processes
+        self.extensions = list(extensions)
+        self.telegram = telegram
+        self.forward_messages = forward_messages
+        self.metrics_port = metrics_port
+        self.commands = {}
+        self.submitted = Counter()
+        self.restarts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._queues = [self._context.Queue() for _ in range(processes)]
+        self._processes = [None] * processes
+        self._round_robin = itertools.cycle(range(processes))
+        self._ready = None
+        # Wywoływane, gdy pierwszy robot zgłosi gotowość dopiero po upływie WORKER_START_TIMEOUT
+        self.on_late_ready = None
+        self._reader = None
+        self._monitor = None
+        self._closing = False
+        _POOLS.add(self)
+
+    @property
+    def ready(self):
+        """Czy co najmniej jeden robot zgłosił gotowość, czyli czy commands zawiera komendy robotów"""
+        return self._ready is not None and self._ready.is_set()
+
+    @property
+    def alive(self):
+        return sum(1 for process in self._processes if process and process.is_alive())
+
+    async def start(self):
+        self._ready = asyncio.Event()
+        for index in range(self.size):
+            self._spawn(index)
+        self._reader = asyncio.create_task(self._read_results())
+        self._monitor = asyncio.create_task(self._watch())
+
+        # Definicje komend robotów są potrzebne do synchronizacji drzewa komend, więc czekamy na pierwszego
+        try:
+            await asyncio.wait_for(self._ready.wait(), WORKER_START_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"❌ Żaden proces roboczy nie zgłosił gotowości w {WORKER_START_TIMEOUT}s.")
+
+    def _spawn(self, index):
+        process = self._context.Process(
+            target=run_worker,
+            args=(index, self.size, self.extensions, self.telegram and index == TELEGRAM_WORKER,
+                  self._queues[index], self._results,
+                  self.metrics_port + 1 + index if self.metrics_port else None),
+            name=f"worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+        print(f"🔧 Uruchomiono proces roboczy {index} (pid {process.pid}).")
+
+    async def _read_results(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await loop.run_in_executor(None, self._results.get)
+            if message is None:
+                return
+
+            kind, index, payload = message
+            if kind == "ready":
+                self.commands.update((command["name"], command) for command in payload)
+                print(f"✅ Proces roboczy {index} gotowy ({len(payload)} komend).")
+                if not self._ready.is_set() and self.on_late_ready:
+                    asyncio.create_task(self.on_late_ready())
+                self._ready.set()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(WORKER_CHECK_SECONDS)
+            for index, process in enumerate(self._processes):
+                if not process.is_alive() and not self._closing:
+                    print(f"❌ Proces roboczy {index} zakończył się (kod {process.exitcode}), uruchamiam ponownie.")
+                    self.restarts += 1
+                    self._spawn(index)
+
+    async def close(self):
+        self._closing = True
+        if self._monitor:
+            self._monitor.cancel()
+
+        for job_queue in self._queues:
+            job_queue.put(None)
+        loop = asyncio.get_running_loop()
+        for process in self._processes:
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, WORKER_STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+
+        self._results.put(None)
+        if self._reader:
+            await self._reader
+
+    def submit(self, index, job):
+        self._queues[index].put(job)
+        self.submitted[index] += 1
+
+    def broadcast(self, job):
+        """Wysyła zadanie do każdego robota, np. ponowne wczytanie konfiguracji serwerów"""
+        for index in range(self.size):
+            self.submit(index, job)
+
+    def attach(self, bot):
+        """Przekierowuje zdarzenia gateway obsługiwane przez roboty; wywołać przed połączeniem z Discordem"""
+        state = bot._connection
+        parse_interaction = state.parsers["INTERACTION_CREATE"]
+        parse_message = state.parsers["MESSAGE_CREATE"]
+
+        def parse_interaction_create(data):
+            # Typ 2 to komenda, 4 to autouzupełnianie; komponenty i modale zostają w gateway
+            if data["type"] in (2, 4) and data["data"]["name"] in self.commands:
+                self._add_guild_data(state, data)
+                self.submit(next(self._round_robin), ("INTERACTION_CREATE", data))
+            else:
+                parse_interaction(data)
+
+        def parse_message_create(data):
+            parse_message(data)
+            if "guild_id" in data:
+                # Wiadomości z jednego kanału zawsze trafiają do tego samego robota, żeby zachować kolejność
+                self.submit(int(data["channel_id"]) % self.size, ("MESSAGE_CREATE", data))
+
+        state.parsers["INTERACTION_CREATE"] = parse_interaction_create
+        if self.forward_messages:
+            state.parsers["MESSAGE_CREATE"] = parse_message_create
+
+    @staticmethod
+    def _add_guild_data(state, data):
+        # Robot nie ma cache serwerów, więc dokładamy nazwę i ikonę, z których korzystają embedy komend
+        guild = state._get_guild(discord.utils._get_as_snowflake(data, "guild_id"))
+        if guild is not None:
+            data["guild"] = {
+                **data.get("guild", {}),
+                "name": guild.name,
+                "icon": guild.icon.key if guild.icon else None
+            }
+
+
+class WorkerTelegramBridge:
+    """Zamiennik TelegramBridge w procesie gateway: wiadomości wysyła robot z prawdziwym TelegramBridge"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def enqueue(self, text):
+        self.pool.submit(TELEGRAM_WORKER, ("telegram", text))
+
+
+class WorkerBot(commands.Bot):
+    """Bot procesu roboczego: loguje się tylko przez HTTP i przetwarza zdarzenia przekazane z gateway.
+
+    Każdy robot ma własne limitery zapytań, więc cogi dzielą limity zewnętrznych API przez rate_limit_share -
+    inaczej N robotów wysyłałoby N razy więcej zapytań, niż pozwala limit."""
+
+    def __init__(self, processes):
+        super().__init__(command_prefix=commands.when_mentioned, intents=discord.Intents.none(),
+                         tree_cls=InstrumentedCommandTree)
+        self.guild_config = GuildConfigStore()
+        self.rate_limit_share = 1 / processes
+
+    async def setup_hook(self):
+        self.guild_config.reload()
+
+
+def run_worker(index, processes, extensions, telegram, jobs, results, metrics_port):
+    asyncio.run(_worker_main(index, processes, extensions, telegram, jobs, results, metrics_port))
+
+
+async def _worker_main(index, processes, extensions, telegram, jobs, results, metrics_port):
+    from config import TOKEN, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+
+    bot = WorkerBot(processes)
+    loader = ExtensionLoader(bot, extensions)
+    bridge = TelegramBridge(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID) if telegram else None
+    metrics_server = MetricsServer(metrics_port) if metrics_port else None
+    loop = asyncio.get_running_loop()
+
+    async with bot:
+        await bot.login(TOKEN)
+        # Robot nie dostanie READY z gateway; bez tego pętle w tle czekające na wait_until_ready nigdy by nie ruszyły.
+        # _ready to prywatne asyncio.Event klienta discord.py 2.x (sprawdzone na 2.7.1) - do weryfikacji po aktualizacji
+        bot._ready.set()
+        await loader.load_all()
+        loader.report()
+        if bridge:
+            await bridge.start()
+        if metrics_server:
+            await metrics_server.start()
+
+        results.put(("ready", index, [command.to_dict(bot.tree) for command in bot.tree.get_commands()]))
+        try:
+            while True:
+                job = await loop.run_in_executor(None, jobs.get)
+                if job is None:
+                    break
+
+                kind, payload = job
+                try:
+                    if kind == "telegram":
+                        bridge.enqueue(payload)
+                    elif kind == "reload_config":
+                        bot.guild_config.reload()
+                    else:
+                        bot._connection.parsers[kind](payload)
+                except Exception as e:
+                    print(f"❌ Błąd procesu roboczego {index} przy zadaniu {kind}: {e}")
+        finally:
+            if bridge:
+                await bridge.close()
+            if metrics_server:
+                await metrics_server.close()